@@ -1 +1,11 @@
-from .knowledge_engine import kb_manager, KnowledgeBaseManager
+from .knowledge_engine import (
+    KnowledgeBaseManager, reindex_knowledge_base, get_kb_manager, get_collection
+)
+from .ingest_service import ingest_service, IngestionService
+
+
+def __getattr__(name):
+    # kb_manager 首次访问时才创建（导入本包不初始化 Chroma）
+    if name == "kb_manager":
+        return get_kb_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
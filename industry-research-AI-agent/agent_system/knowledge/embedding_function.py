@@ -0,0 +1,35 @@
+# agent_system/knowledge/embedding_function.py
+"""
+chromadb 向量函数适配器（依赖 chromadb，由 knowledge_engine 按需导入）
+"""
+
+from chromadb.utils import embedding_functions
+
+from config.embedding import embedding_service
+
+
+class SharedEmbeddingFunction(embedding_functions.SentenceTransformerEmbeddingFunction):
+    """
+    chromadb 向量函数适配器：沿用 SentenceTransformerEmbeddingFunction 的类型与配置
+    （已有集合登记的向量函数不变），推理转给共享的 embedding_service
+    """
+
+    def __init__(self, service=embedding_service):
+        # 不调用父类初始化：父类会在构造时加载一份独立的模型
+        self.service = service
+        self.model_name = service.model_name
+        self.device = service.device or "cpu"
+        self.normalize_embeddings = False
+        self._normalize_embeddings = False
+        self.kwargs = {}
+
+    @property
+    def _model(self):
+        return self.service.model
+
+    def __call__(self, input):
+        return self.service.encode(input, normalize=self.normalize_embeddings)
+
+    def embed_query(self, input):
+        # 新版 chromadb 对 query_texts 调用 embed_query：走查询向量缓存
+        return self.service.encode_queries(input)
@@ -0,0 +1,310 @@
+# agent_system/knowledge/ingest_service.py
+"""
+知识库后台入库服务（目录监听 + 有界工作线程池）
+
+上传组件只负责保存文件并投递任务，向量化在后台线程中进行，不阻塞界面：
+- 监听线程定期扫描研报目录（mtime + 大小），发现新增/变化的 PDF 自动排队；
+  文件连续两次扫描大小和 mtime 都不变才入队，避免读到拷贝到一半的文件
+- 文件从目录删除时清理其切片和表格索引
+- 同一文件排队中不重复入队；处理过程中再次变化则处理完后重新排队
+- 工作线程数有上限（KB_INGEST_WORKERS），批量放入几十份研报也只按上限并发
+- get_status() 返回队列深度、进行中任务的页数/切片进度和最近结果，供界面展示
+
+是否需要重新向量化仍由入库清单按内容哈希判断，重复投递的成本只是一次哈希
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ingestion.pdf_parser import list_pdfs
+
+
+# 并发入库的文件数（每个任务内部还会按批向量化，通常 1~2 即可吃满 CPU/GPU）
+INGEST_WORKERS = int(os.getenv("KB_INGEST_WORKERS", "2"))
+
+# 目录扫描间隔（秒）
+WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "5"))
+
+# 保留的最近完成任务数
+RECENT_JOBS = 50
+
+
+@dataclass
+class IngestJob:
+    """一个文件的入库任务"""
+    file_path: str
+    state: str = "queued"  # queued / running / done / failed
+    queued_at: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    pages: int = 0
+    chunks: int = 0
+    status: str = ""  # 入库结果：new / changed / unchanged / duplicate
+    error: str = ""
+
+    @property
+    def file(self) -> str:
+        return os.path.basename(self.file_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["file"] = self.file
+        return data
+
+
+class IngestionService:
+    """
+    后台入库服务
+    start() 可重复调用（Streamlit 每次重跑脚本都会执行到），只会启动一次
+    """
+
+    def __init__(self, ingest: Optional[Callable[..., Dict[str, Any]]] = None,
+                 remove_missing: Optional[Callable[[str], int]] = None,
+                 max_workers: int = INGEST_WORKERS, interval: float = WATCH_INTERVAL):
+        """
+        初始化服务
+
+        Args:
+            ingest: 入库函数 ingest(file_path, progress=...)，默认 kb_manager.ingest_pdf
+            remove_missing: 清理已删除文件的函数 remove_missing(folder)，默认 kb_manager.remove_missing
+            max_workers: 并发入库的文件数
+            interval: 目录扫描间隔（秒）
+        """
+        self._ingest = ingest
+        self._remove_missing = remove_missing
+        self.max_workers = max(1, max_workers)
+        self.interval = interval
+        self.folder: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._jobs: Dict[str, IngestJob] = {}  # 排队中 / 进行中，按绝对路径
+        self._rerun: set = set()  # 处理中又发生变化、需要重新排队的文件
+        self._recent: Deque[IngestJob] = deque(maxlen=RECENT_JOBS)
+        self._seen: Dict[str, Tuple[int, int]] = {}  # 已投递的文件 -> (mtime_ns, 大小)
+        self._pending: Dict[str, Tuple[int, int]] = {}  # 上次扫描看到、尚未稳定的文件
+
+        self.stats = {"done": 0, "failed": 0, "chunks": 0, "removed_chunks": 0}
+
+    # ------------------ 生命周期 ------------------
+
+    def _resolve_backend(self):
+        # 在工作线程里首次用到时才初始化知识库，不拖慢启动
+        if self._ingest is None or self._remove_missing is None:
+            from agent_system.knowledge.knowledge_engine import get_kb_manager
+            kb_manager = get_kb_manager()
+            self._ingest = self._ingest or kb_manager.ingest_pdf
+            self._remove_missing = self._remove_missing or kb_manager.remove_missing
+
+    def start(self, folder: Optional[str] = None, watch: bool = True):
+        """
+        启动工作线程池和目录监听
+
+        Args:
+            folder: 监听的研报目录，默认知识库目录
+            watch: 是否启动目录监听（False 时只处理手动投递的文件）
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            if folder is None:
+                from agent_system.knowledge.knowledge_engine import KNOWLEDGE_BASE_DIR
+                folder = KNOWLEDGE_BASE_DIR
+            self.folder = os.path.abspath(folder)
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="kb-ingest")
+            if watch:
+                self._watcher = threading.Thread(target=self._watch_loop, name="kb-watcher", daemon=True)
+                self._watcher.start()
+        print(f"👀 [IngestionService] 已启动: {self.folder} "
+              f"(工作线程 {self.max_workers}, 扫描间隔 {self.interval}s)")
+
+    def stop(self, wait: bool = True):
+        """停止监听；排队中的任务取消，进行中的任务执行完"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            watcher, self._watcher = self._watcher, None
+            self._stop.set()
+            for path in [p for p, job in self._jobs.items() if job.state == "queued"]:
+                del self._jobs[path]
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        if watcher is not None and wait:
+            watcher.join(timeout=self.interval + 1)
+        print("🛑 [IngestionService] 已停止")
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    # ------------------ 投递 ------------------
+
+    def enqueue(self, file_path: str) -> bool:
+        """
+        投递一个文件
+
+        Returns:
+            bool: 是否新入队（已在队列中返回 False；处理中则标记为完成后重新排队）
+        """
+        path = os.path.abspath(file_path)
+        with self._lock:
+            if self._executor is None:
+                raise RuntimeError("IngestionService 未启动，请先调用 start()")
+            try:
+                stat = os.stat(path)
+                self._seen[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+            self._pending.pop(path, None)
+
+            job = self._jobs.get(path)
+            if job is not None:
+                if job.state == "running":
+                    self._rerun.add(path)
+                return False
+
+            job = IngestJob(file_path=path, queued_at=time.time())
+            self._jobs[path] = job
+            self._executor.submit(self._process, job)
+        return True
+
+    def _process(self, job: IngestJob):
+        with self._lock:
+            job.state = "running"
+            job.started_at = time.time()
+
+        def progress(pages: int, chunks: int):
+            job.pages, job.chunks = pages, chunks
+
+        try:
+            self._resolve_backend()
+            result = self._ingest(job.file_path, progress=progress)
+            job.status = result.get("status", "")
+            job.pages = result.get("pages", job.pages)
+            job.chunks = result.get("chunks", job.chunks)
+            job.state = "done"
+        except Exception as e:
+            print(f"⚠️ [IngestionService] 入库失败: {job.file} - {e}")
+            job.error = str(e)
+            job.state = "failed"
+        job.finished_at = time.time()
+
+        with self._lock:
+            self._jobs.pop(job.file_path, None)
+            self._recent.appendleft(job)
+            if job.state == "done":
+                self.stats["done"] += 1
+                self.stats["chunks"] += job.chunks
+            else:
+                self.stats["failed"] += 1
+            rerun = job.file_path in self._rerun
+            self._rerun.discard(job.file_path)
+        if rerun and self.running and os.path.exists(job.file_path):
+            self.enqueue(job.file_path)
+
+    # ------------------ 目录监听 ------------------
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"⚠️ [IngestionService] 扫描目录失败: {e}")
+            self._stop.wait(self.interval)
+
+    def scan(self) -> int:
+        """
+        扫描一次目录：新增/变化且已稳定的文件入队，已删除的文件清理索引
+
+        Returns:
+            int: 本次入队的文件数
+        """
+        if not self.folder or not os.path.isdir(self.folder):
+            return 0
+
+        current: Dict[str, Tuple[int, int]] = {}
+        for path in list_pdfs(self.folder):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            current[os.path.abspath(path)] = (stat.st_mtime_ns, stat.st_size)
+
+        ready = []
+        with self._lock:
+            for path, signature in current.items():
+                if self._seen.get(path) == signature:
+                    continue
+                # 连续两次扫描一致才认为写入完成
+                if self._pending.get(path) == signature:
+                    ready.append(path)
+                else:
+                    self._pending[path] = signature
+            removed = [path for path in self._seen if path not in current]
+            for path in removed:
+                del self._seen[path]
+            for path in [p for p in self._pending if p not in current]:
+                del self._pending[path]
+
+        queued = sum(1 for path in ready if self.enqueue(path))
+        if removed:
+            self._resolve_backend()
+            removed_chunks = self._remove_missing(self.folder)
+            with self._lock:
+                self.stats["removed_chunks"] += removed_chunks
+            print(f"🧹 [IngestionService] {len(removed)} 个文件已删除，清理 {removed_chunks} 个切片")
+        return queued
+
+    # ------------------ 状态 ------------------
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        队列状态
+
+        Returns:
+            dict: running、folder、queue_depth（排队数）、in_progress（进行中任务及页数/切片进度）、
+                  queued（排队文件名）、recent（最近完成的任务）、done/failed/chunks 累计
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+            recent = [job.to_dict() for job in self._recent]
+            stats = dict(self.stats)
+        queued = [job for job in jobs if job.state == "queued"]
+        running = [job for job in jobs if job.state == "running"]
+        now = time.time()
+        return {
+            "running": self.running,
+            "folder": self.folder,
+            "workers": self.max_workers,
+            "queue_depth": len(queued),
+            "queued": [job.file for job in sorted(queued, key=lambda j: j.queued_at)],
+            "in_progress": [
+                {**job.to_dict(), "elapsed": round(now - job.started_at, 1)} for job in running
+            ],
+            "recent": recent,
+            **stats
+        }
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待队列清空（脚本/命令行批量入库时使用）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._jobs:
+                    return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.2)
+
+
+# 全局实例
+ingest_service = IngestionService()
@@ -1,11 +1,17 @@
 # 新建一个文件专门管理知识库。这个模块负责把文本变成向量存起来，以及把向量查出来
 # knowledge_engine.py
 import os
-import chromadb
-from chromadb.utils import embedding_functions
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from pypdf import PdfReader
-import pdfplumber
+import re
+import threading
+import time
+
+from config.embedding import embedding_service
+from ingestion.ingest_manifest import IngestManifest, chunk_ids
+from ingestion.pdf_parser import parse_folder_parallel, list_pdfs
+from ingestion.artifact_store import artifact_store
+from ingestion.table_index import table_index
+from ingestion.keyword_index import keyword_index
+from agent_system.rag.agentic_rag import RetrievedChunk, hybrid_searcher, self_reflective_rag
 
 # ===============================
 # 1. 计算项目根目录
@@ -24,69 +30,361 @@ CHROMA_DATA_PATH = os.path.join(PROJECT_ROOT, "chroma_db")
 os.makedirs(CHROMA_DATA_PATH, exist_ok=True)
 
 # ===============================
-# 3. 初始化 Chroma Client
+# 3. Chroma Client / 向量模型 / 集合（首次使用时初始化）
+# 导入本模块不加载 chromadb，也不连接数据库；
+# 向量模型与记忆系统共用进程内同一个 BAAI/bge-m3 实例（config.embedding），首次向量化时才加载
 # ===============================
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+_init_lock = threading.RLock()
+_client = None
+_emb_fn = None
+_collection = None
+_kb_manager = None
 
-# 2. 设置向量模型 (使用开源免费的 huggingface 模型，支持中文)
-# 第一次运行会自动下载模型，约 500MB
-emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="BAAI/bge-m3" # 这是一个非常强大的支持中英文的 Embedding 模型
-)
 
-# 3. 获取或创建集合 (Collection)
-collection = client.get_or_create_collection(
-    name="industry_research_db",
-    embedding_function=emb_fn
-)
+def get_client():
+    """Chroma 持久化客户端"""
+    global _client
+    with _init_lock:
+        if _client is None:
+            import chromadb
+            _client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+        return _client
+
+
+def get_embedding_function():
+    """chromadb 向量函数（推理转给共享的 embedding_service）"""
+    global _emb_fn
+    with _init_lock:
+        if _emb_fn is None:
+            from agent_system.knowledge.embedding_function import SharedEmbeddingFunction
+            _emb_fn = SharedEmbeddingFunction()
+        return _emb_fn
+
+
+def get_collection():
+    """获取或创建集合 (Collection)"""
+    global _collection
+    with _init_lock:
+        if _collection is None:
+            _collection = get_client().get_or_create_collection(
+                name="industry_research_db",
+                embedding_function=get_embedding_function()
+            )
+        return _collection
+
+
+def get_kb_manager():
+    """知识库管理器单例"""
+    global _kb_manager
+    with _init_lock:
+        if _kb_manager is None:
+            _kb_manager = KnowledgeBaseManager()
+        return _kb_manager
+
+
+# 兼容旧的模块级名称：from knowledge_engine import collection / kb_manager 时才初始化
+_LAZY_GLOBALS = {
+    "client": get_client,
+    "emb_fn": get_embedding_function,
+    "collection": get_collection,
+    "kb_manager": get_kb_manager,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_GLOBALS:
+        return _LAZY_GLOBALS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 每批写入（并向量化）的切片数；越大吞吐越高，峰值内存也越高
+EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+
+# 研报目录与入库清单（内容哈希 -> 切片ID，用于增量入库）
+KNOWLEDGE_BASE_DIR = os.path.join(PROJECT_ROOT, "knowledge_base")
+INGEST_MANIFEST_PATH = os.path.join(CHROMA_DATA_PATH, "ingest_manifest.json")
+
+
+def _table_to_text(tables) -> str:
+    """把 pdfplumber 提取的表格转成文本，供切片使用"""
+    parts = []
+    for table in tables:
+        # 简单处理：过滤 None，转字符串
+        cleaned_table = [[str(cell) if cell else "" for cell in row] for row in table]
+        parts.append(f"\n[表格数据]: {str(cleaned_table)}\n")
+    return "".join(parts)
 
 class KnowledgeBaseManager:
     def __init__(self):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        
+        self.chunk_overlap = 50
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,  # 每个切片500字
-            chunk_overlap=50 # 切片之间重叠50字，防止语义断裂
+            chunk_overlap=self.chunk_overlap # 切片之间重叠50字，防止语义断裂
         )
+        self.manifest = IngestManifest(INGEST_MANIFEST_PATH)
+        self._keyword_index_checked = False
+    
+    @staticmethod
+    def _delete_ids(ids, batch_size=5000):
+        """按批删除切片（向量库与关键词索引同步删除）"""
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            get_collection().delete(ids=batch)
+            keyword_index.delete(batch)
+    
+    @staticmethod
+    def _delete_legacy_chunks(filename):
+        """删除清单建立前入库的旧切片（ID 形如 <文件名>_<序号>），避免与新切片重复"""
+        legacy_pattern = re.compile(rf"^{re.escape(filename)}_\d+$")
+        existing = get_collection().get(where={"source": filename}, include=[])
+        legacy_ids = [i for i in existing.get("ids", []) if legacy_pattern.match(i)]
+        if legacy_ids:
+            KnowledgeBaseManager._delete_ids(legacy_ids)
+            print(f"   🧹 已清理 {len(legacy_ids)} 个旧版切片")
         
     # --- 核心功能：让 Agent 变聪明的“吃书”过程 ---
     # 废弃通用的 read_pdf 用于“寻找数据”。将 read_pdf 改造成 get_table_of_contents (读取目录) 工具。
     # Agent 先看目录，知道哪一章讲财务，然后再用 RAG 去搜那一章的细节。
-    def ingest_pdf(self, file_path):
-        """读取PDF -> 切片 -> 向量化 -> 存入DB"""
+    def ingest_pdf(self, file_path, batch_size=None, parallel=False, max_workers=None, progress=None):
+        """
+        读取PDF -> 切片 -> 向量化 -> 存入DB（流式、增量）
+        逐页解析、逐页切片，切片攒满一批就写入 Chroma，
+        内存占用只与单页内容和批大小有关，与文件总页数无关
+        
+        按内容哈希去重：内容未变（或同内容换了文件名）直接跳过；
+        内容变化时写入新切片后删除该文件的旧切片；
+        同内容的另一个文件正在入库时等待其完成，随后只登记为别名
+
+        Args:
+            file_path: PDF 路径
+            batch_size: 每批写入的切片数，默认 EMBED_BATCH_SIZE
+            parallel: 是否按页码区间多进程并行解析（大文档适用）
+            max_workers: 并行解析的进程数
+            progress: 进度回调 progress(已处理页数, 已生成切片数)，每页调用一次
+
+        Returns:
+            dict: status（new/changed/unchanged/duplicate）、页数、切片数、批次数、耗时与吞吐
+        """
+        plan = self.manifest.plan(file_path)
+        if not plan.needs_ingest:
+            return self._skip(plan, file_path)
+        
         print(f"📥 正在深度解析文件 (含表格): {file_path} ...")
-        full_text = ""
+        try:
+            # 已解析过的内容直接读取解析结果，否则解析并同时写入存储
+            pages = artifact_store.iter_pages(file_path, plan.content_hash, parallel, max_workers)
+            return self._ingest_pages(plan, file_path, pages, batch_size, progress)
+        finally:
+            # 成功时 commit 已释放；失败时释放内容预留，等待同内容的文件重新规划
+            self.manifest.release(plan)
+    
+    def _skip(self, plan, file_path):
+        """内容未变化：同内容另存为新文件名时只登记别名；该文件名原先对应别的内容则清理旧切片"""
+        filename = os.path.basename(file_path)
+        self._delete_ids(plan.stale_ids)
+        self.manifest.commit(plan)
+        print(f"⏭️ 内容未变化，跳过入库: {filename} ({plan.status})")
+        return {"file": filename, "status": plan.status, "chunks": 0}
+    
+    def _ingest_pages(self, plan, file_path, pages, batch_size=None, progress=None):
+        """
+        把逐页解析结果切片、分批写入 Chroma
+        
+        Args:
+            plan: 入库计划（IngestManifest.plan 的结果）
+            file_path: PDF 路径
+            pages: PageRecord 序列（按页码顺序，可以是生成器）
+            batch_size: 每批写入的切片数
+            progress: 进度回调 progress(已处理页数, 已生成切片数)
+        """
+        batch_size = batch_size or EMBED_BATCH_SIZE
+        filename = os.path.basename(file_path)
+        
+        # 首次写入前先补齐关键词索引，否则新切片写入后索引非空，旧切片再也不会补建
+        self.ensure_keyword_index()
+        
+        if plan.status == "new":
+            self._delete_legacy_chunks(filename)
+        
+        started = time.perf_counter()
+        page_count = 0
+        batches = 0
+        chunk_count = 0
+        table_cells = 0
+        batch_docs, batch_ids, batch_metas = [], [], []
         
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # 1. 提取纯文本
-                text = page.extract_text() or ""
+        def flush():
+            # 存入 ChromaDB (会自动调用 embedding 模型转向量)，同时写入关键词索引
+            nonlocal batches, batch_docs, batch_ids, batch_metas
+            if not batch_docs:
+                return
+            get_collection().add(documents=batch_docs, ids=batch_ids, metadatas=batch_metas)
+            keyword_index.add(batch_ids, batch_docs, batch_metas)
+            batches += 1
+            batch_docs, batch_ids, batch_metas = [], [], []
+        
+        # 上一页末尾的重叠部分，避免跨页语义断裂
+        overlap = self.chunk_overlap
+        carry = ""
+        
+        try:
+            for record in pages:
+                # 1. 纯文本 + 表格 (表格是 pypdf 做不到的)
+                page_text = record.text + "\n" + _table_to_text(record.tables)
+                page_count += 1
                 
-                # 2. 提取表格 (这是 pypdf 做不到的)
-                tables = page.extract_tables()
-                table_text = ""
-                for table in tables:
-                    # 将表格转换为 Markdown 格式，方便 LLM 理解
-                    # 简单处理：过滤 None，转字符串
-                    cleaned_table = [[str(cell) if cell else "" for cell in row] for row in table]
-                    # 这里可以写一个函数把 list 转 markdown table string
-                    table_text += f"\n[表格数据]: {str(cleaned_table)}\n"
+                # 表格同时写入数值索引（指标 + 年份精确查询）
+                table_cells += self._index_tables(file_path, plan.content_hash, record)
                 
-                full_text += text + "\n" + table_text
+                # 2. 文本切片（逐页）
+                for chunk in self.text_splitter.split_text(carry + page_text):
+                    # 3. 构造元数据 (Metadata)，方便后续过滤
+                    batch_docs.append(chunk)
+                    batch_ids.append(f"{plan.id_prefix}_{chunk_count}")
+                    batch_metas.append({"source": filename, "type": "report", "page": record.page_number})
+                    chunk_count += 1
+                    if len(batch_docs) >= batch_size:
+                        flush()
+                carry = page_text[-overlap:] if overlap else ""
+                if progress:
+                    progress(page_count, chunk_count)
+                
+                if page_count % 50 == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"   ⏳ {page_count} 页, {chunk_count} 个片段, "
+                          f"{chunk_count / elapsed:.1f} chunks/s")
+            flush()
+        except Exception:
+            # 入库中断：回滚已写入的新切片，旧切片保持不动
+            self._delete_ids(chunk_ids(plan.id_prefix, chunk_count))
+            table_index.remove_file(file_path, content_hash=plan.content_hash)
+            raise
         
-        # 2. 文本切片
-        chunks = self.text_splitter.split_text(full_text)
+        # 新切片全部写入后再删除旧切片，并登记清单
+        self._delete_ids(plan.stale_ids)
+        table_index.remove_file(file_path, keep_hash=plan.content_hash)
+        self.manifest.commit(plan, chunk_count)
         
-        # 3. 构造元数据 (Metadata)，方便后续过滤
-        filename = os.path.basename(file_path)
-        ids = [f"{filename}_{i}" for i in range(len(chunks))]
-        metadatas = [{"source": filename, "type": "report"} for _ in range(len(chunks))]
-        
-        # 4. 存入 ChromaDB (会自动调用 embedding 模型转向量)
-        collection.add(
-            documents=chunks,
-            ids=ids,
-            metadatas=metadatas
-        )
-        print(f"✅ 已存入 {len(chunks)} 个知识片段。")
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        stats = {
+            "file": filename,
+            "status": plan.status,
+            "pages": page_count,
+            "chunks": chunk_count,
+            "batches": batches,
+            "batch_size": batch_size,
+            "table_cells": table_cells,
+            "seconds": round(elapsed, 2),
+            "chunks_per_sec": round(chunk_count / elapsed, 2),
+            "pages_per_sec": round(page_count / elapsed, 2)
+        }
+        print(f"✅ 已存入 {chunk_count} 个知识片段（{page_count} 页, {batches} 批, "
+              f"{stats['chunks_per_sec']} chunks/s, {stats['pages_per_sec']} pages/s）。")
+        return stats
+    
+    @staticmethod
+    def _index_tables(file_path, content_hash, record):
+        """写入一页表格的数值索引；索引失败不影响文本入库"""
+        if not record.tables:
+            return 0
+        try:
+            return table_index.add_tables(file_path, content_hash, record.page_number, record.tables)
+        except Exception as e:
+            print(f"   ⚠️ 第 {record.page_number} 页表格索引失败: {e}")
+            return 0
+    
+    def remove_missing(self, folder=None):
+        """已删除的文件：移除其切片和表格索引，返回删除的切片数"""
+        folder = folder or KNOWLEDGE_BASE_DIR
+        removed_ids = self.manifest.remove_missing(folder)
+        self._delete_ids(removed_ids)
+        table_index.remove_missing(folder)
+        return len(removed_ids)
+    
+    def reindex_knowledge_base(self, folder=None, batch_size=None, parallel=False, max_workers=None):
+        """
+        增量重建知识库：只处理新增/变化的文件，并清理已删除文件的切片
+        
+        Args:
+            folder: 研报目录，默认项目根目录下的 knowledge_base
+            batch_size: 每批写入的切片数
+            parallel: 是否多进程并行解析（每个文档一个进程，主进程边解析边入库）
+            max_workers: 并行解析的进程数
+        
+        Returns:
+            dict: 各状态的文件数、新增切片数、删除切片数、失败文件
+        """
+        folder = folder or KNOWLEDGE_BASE_DIR
+        self.ensure_keyword_index()
+        summary = {"new": 0, "changed": 0, "unchanged": 0, "duplicate": 0,
+                   "chunks_added": 0, "chunks_removed": 0, "failed": []}
+        
+        pdf_files = list_pdfs(folder)
+        print(f"🔄 增量重建知识库: {folder} ({len(pdf_files)} 个PDF)")
+        
+        # 先按内容哈希筛出需要入库的文件，只解析增量部分；
+        # 与本批（或后台入库中）文件同内容的文件暂缓，等首个文件入库后再登记为别名
+        plans = {}
+        deferred = []
+        for file_path in pdf_files:
+            plan = self.manifest.plan(file_path, wait=False)
+            if plan.status == "pending":
+                deferred.append(file_path)
+            elif plan.needs_ingest:
+                plans[file_path] = plan
+            else:
+                self._skip(plan, file_path)
+                summary[plan.status] += 1
+        
+        def record(file_path, ingest):
+            try:
+                result = ingest()
+            except Exception as e:
+                print(f"⚠️ 入库失败: {file_path} - {e}")
+                summary["failed"].append(file_path)
+                return
+            summary[result["status"]] += 1
+            summary["chunks_added"] += result["chunks"]
+        
+        try:
+            if parallel:
+                # 已有解析结果的文件不再进入进程池
+                to_parse = [path for path, plan in plans.items() if not artifact_store.has(plan.content_hash)]
+                for file_path in plans:
+                    if file_path not in to_parse:
+                        plan = plans[file_path]
+                        record(file_path, lambda: self._ingest_pages(
+                            plan, file_path, artifact_store.read(plan.content_hash), batch_size))
+                
+                for file_path, pages, error in parse_folder_parallel(to_parse, max_workers=max_workers):
+                    if error is not None:
+                        print(f"⚠️ 解析失败: {file_path} - {error}")
+                        summary["failed"].append(file_path)
+                        self.manifest.release(plans[file_path])
+                        continue
+                    plan = plans[file_path]
+                    artifact_store.put(plan.content_hash, pages)
+                    record(file_path, lambda: self._ingest_pages(plan, file_path, pages, batch_size))
+            else:
+                for file_path, plan in plans.items():
+                    record(file_path, lambda: self._ingest_pages(
+                        plan, file_path, artifact_store.iter_pages(file_path, plan.content_hash), batch_size))
+        finally:
+            # 失败/中断的文件释放内容预留（已 commit 的不受影响）
+            for plan in plans.values():
+                self.manifest.release(plan)
+        
+        # 暂缓的同内容文件：首个文件已入库则登记别名，否则（首个失败）由它重新入库
+        for file_path in deferred:
+            record(file_path, lambda: self.ingest_pdf(file_path, batch_size))
+        
+        summary["chunks_removed"] = self.remove_missing(folder)
+        
+        print(f"✅ 重建完成: 新增 {summary['new']}, 更新 {summary['changed']}, "
+              f"跳过 {summary['unchanged'] + summary['duplicate']}, "
+              f"清理切片 {summary['chunks_removed']}")
+        return summary
 
     # --- 核心功能：让 Agent 变聪明的“回忆”过程 ---
    # 你使用了 BAAI/bge-m3 进行向量检索。向量检索是基于“语义相似度”的。 问题：
@@ -100,27 +398,103 @@ class KnowledgeBaseManager:
         根据问题，在数据库中寻找最相关的证据
         keyword_filter: 强制要求结果中包含特定词（如年份、指标名）
         增加关键词过滤能力
-        """
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results * 2 # 多取一点用来过滤
-        )
         
-        docs = results['documents'][0]
-        metadatas = results['metadatas'][0]
+        向量检索与 BM25 关键词检索按倒数排名加权融合（HybridSearcher），
+        "CR5 2024"这类精确数字/实体查询即使不在向量 top-k 里也能命中
+        """
+        # 多取一点用来过滤
+        chunks = self.retrieve_many([query], n_results=n_results * 2)[0]
         
         final_results = []
-        for doc, meta in zip(docs, metadatas):
+        for chunk in chunks:
             # 简单的硬过滤：如果指定了关键词，必须包含
-            if keyword_filter and keyword_filter not in doc:
+            if keyword_filter and keyword_filter not in chunk.content:
                 continue
             
             # 拼凑引用来源，解决信任问题（痛点二）
-            source_info = f"[来源: {meta['source']}]" 
-            final_results.append(f"{source_info}\n{doc}")
+            source_info = f"[来源: {chunk.source}]" 
+            final_results.append(f"{source_info}\n{chunk.content}")
             
         return "\n\n".join(final_results[:n_results])
+    
+    def retrieve_many(self, queries, n_results=5):
+        """
+        批量检索：所有查询一次向量化（命中查询向量缓存的不再推理）、一次 collection.query，
+        再逐条与 BM25 结果融合
+        
+        Args:
+            queries: 查询列表（重复的查询只检索一次）
+            n_results: 每条查询返回的片段数
+        
+        Returns:
+            List[List[RetrievedChunk]]: 与 queries 一一对应
+        """
+        queries = [(q or "").strip() for q in queries]
+        unique = list(dict.fromkeys(q for q in queries if q))
+        if not unique:
+            return [[] for _ in queries]
+        
+        self.ensure_keyword_index()
+        query_embeddings = embedding_service.encode_queries(unique)
+        results = get_collection().query(query_embeddings=query_embeddings, n_results=n_results)
+        
+        by_query = {}
+        for query, ids, docs, metas in zip(unique, results['ids'], results['documents'], results['metadatas']):
+            vector_chunks = [
+                RetrievedChunk(content=doc, source=(meta or {}).get("source", ""), score=0.0,
+                               metadata={**(meta or {}), "id": chunk_id})
+                for chunk_id, doc, meta in zip(ids, docs, metas)
+            ]
+            by_query[query] = hybrid_searcher.search(query, vector_chunks, top_k=n_results)
+        return [by_query.get(q, []) for q in queries]
+    
+    def reflective_query(self, query, n_results=5, max_iterations=2):
+        """
+        自省式检索（查询改写 → 检索 → 重排 → 自省 → 补充检索）
+        每轮的全部子查询走 retrieve_many，一轮只有一次向量化和一次向量库查询
+        
+        Returns:
+            RAGResult
+        """
+        return self_reflective_rag.retrieve_with_reflection(
+            query,
+            max_iterations=max_iterations,
+            batch_retriever_func=lambda queries: self.retrieve_many(queries, n_results=n_results)
+        )
+    
+    def ensure_keyword_index(self):
+        """
+        关键词索引与向量库切片数不一致（索引建立前入库的数据、索引中途被删等）时，
+        从向量库全量补建一次；每个进程只检查一次，所有写入路径在首次写入前调用
+        """
+        if self._keyword_index_checked:
+            return
+        with _init_lock:
+            if not self._keyword_index_checked:
+                indexed, stored = keyword_index.count(), get_collection().count()
+                if indexed != stored:
+                    print(f"🔤 关键词索引 {indexed} 个片段，向量库 {stored} 个，需要补建")
+                    self.rebuild_keyword_index()
+                self._keyword_index_checked = True
+    
+    def rebuild_keyword_index(self, batch_size=1000):
+        """从向量库全量重建关键词索引，返回索引的切片数"""
+        print("🔤 正在从向量库重建关键词索引 ...")
+        keyword_index.clear()
+        indexed = 0
+        offset = 0
+        while True:
+            page = get_collection().get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            keyword_index.add(ids, [doc or "" for doc in page["documents"]], page["metadatas"])
+            indexed += len(ids)
+            offset += len(ids)
+        print(f"✅ 关键词索引已重建: {indexed} 个片段")
+        return indexed
 
-# 实例化
-kb_manager = KnowledgeBaseManager()
+def reindex_knowledge_base(folder=None, batch_size=None, parallel=False, max_workers=None):
+    """增量重建知识库（只处理变化的文件）"""
+    return get_kb_manager().reindex_knowledge_base(folder, batch_size, parallel, max_workers)
 
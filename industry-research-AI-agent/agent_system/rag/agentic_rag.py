@@ -11,10 +11,14 @@ Agentic RAG 模块
 """
 
 import re
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Sequence, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
+from ingestion.keyword_index import keyword_index
+
 
 @dataclass
 class RetrievedChunk:
@@ -160,10 +164,122 @@ class QueryRewriter:
         return expanded
 
 
+# 字符类别表（按 Unicode 码位索引，首次批量打分时构建）
+_CHAR_DIGIT = 1  # 与正则 \d 一致
+_CHAR_SPACE = 2  # 与 str.split() 的空白一致
+_char_table: Optional[np.ndarray] = None
+
+
+def _get_char_table() -> np.ndarray:
+    global _char_table
+    if _char_table is None:
+        chars = np.arange(0x110000, dtype=np.uint32).tobytes().decode("utf-32-le", "surrogatepass")
+        table = np.zeros(0x110000, dtype=np.uint8)
+        table[[m.start() for m in re.finditer(r"\d", chars)]] |= _CHAR_DIGIT
+        table[[m.start() for m in re.finditer(r"\s", chars)]] |= _CHAR_SPACE
+        _char_table = table
+    return _char_table
+
+
+class TextBatch:
+    """
+    一批文本的数组表示：用换行拼接后的码位数组，以及每个位置属于第几段文本
+    匹配、计数都在数组上完成，不再逐段文本循环
+    """
+    
+    def __init__(self, texts: Sequence[str]):
+        self.size = len(texts)
+        # 末尾多拼一个换行，向后取字符时不会越界
+        joined = "\n".join(texts) + "\n"
+        # 码位转成索引类型，后续查表（take）不再逐次转换
+        self.codes = np.frombuffer(joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.intp)
+        lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=self.size)
+        self.rows = np.repeat(np.arange(self.size, dtype=np.int32), lengths)
+        self._classes: Optional[np.ndarray] = None
+    
+    @property
+    def classes(self) -> np.ndarray:
+        """每个位置的字符类别位（_CHAR_DIGIT / _CHAR_SPACE）"""
+        if self._classes is None:
+            self._classes = _get_char_table().take(self.codes)
+        return self._classes
+    
+    def _per_text(self, positions: np.ndarray) -> np.ndarray:
+        return np.bincount(self.rows[positions], minlength=self.size)
+    
+    def count_words(self) -> np.ndarray:
+        """每段文本的空白分隔词数（同 len(text.split())）"""
+        space = (self.classes & _CHAR_SPACE).astype(bool)
+        starts = ~space
+        starts[1:] &= space[:-1]
+        return self._per_text(np.flatnonzero(starts))
+    
+    def count_numbers(self) -> np.ndarray:
+        """每段文本中数字的个数（同 len(re.findall(r'\\d+\\.?\\d*', text))）"""
+        digit = (self.classes & _CHAR_DIGIT).astype(bool)
+        edges = np.diff(np.concatenate(([False], digit, [False])).astype(np.int8))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        if not len(starts):
+            return np.zeros(self.size, dtype=np.int64)
+        # "12.5" 中小数点后的数字段被前一个匹配吞掉；"1.2.3" 这样的链条里隔一段吞一段
+        linked = np.zeros(len(starts), dtype=bool)
+        linked[1:] = (ends[:-1] == starts[1:] - 1) & (self.codes[starts[1:] - 1] == ord("."))
+        run = np.arange(len(starts))
+        chain_start = np.maximum.accumulate(np.where(linked, 0, run))
+        consumed = (run - chain_start) % 2 == 1
+        return self._per_text(starts[~consumed])
+
+
+class LiteralMatcher:
+    """
+    多模式字面量匹配（预编译）
+    模式首字符编成查找表，一次查表筛出所有候选位置，再逐模式在候选位置上比对后续字符，
+    得出每段文本包含哪些模式；结果与逐个 `in` 判断一致（模式中不能含换行）
+    """
+    
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self.index = {p: i for i, p in enumerate(self.patterns)}
+        
+        # 首字符查找表：首字符相同的模式（如 "2023"、"2024"）共用一次候选筛选
+        self._by_first: Dict[str, List[int]] = {}
+        for column, pattern in enumerate(self.patterns):
+            self._by_first.setdefault(pattern[0], []).append(column)
+        # 表长只到最大码位 + 1，超出的码位截断到最后一项（恒为 0），查找表小、常驻 CPU 缓存
+        firsts = [ord(ch) for ch in self._by_first]
+        self._lookup = np.zeros(max(firsts, default=0) + 2, dtype=np.uint16)
+        self._lookup[firsts] = np.arange(1, len(firsts) + 1)
+    
+    def presence(self, batch: TextBatch) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: bool 矩阵 [文本数, 模式数]，(i, j) 表示第 i 段文本包含第 j 个模式
+        """
+        found = np.zeros((batch.size, len(self.patterns)), dtype=bool)
+        if not batch.size or not self.patterns:
+            return found
+        codes = batch.codes
+        symbols = self._lookup.take(codes, mode="clip")
+        candidates = np.flatnonzero(symbols)
+        first_symbols = symbols[candidates]
+        for first, columns in self._by_first.items():
+            heads = candidates[first_symbols == self._lookup[ord(first)]]
+            for column in columns:
+                starts = heads
+                for offset, ch in enumerate(self.patterns[column][1:], 1):
+                    if not len(starts):
+                        break
+                    starts = starts[codes.take(starts + offset, mode="clip") == ord(ch)]
+                found[batch.rows[starts], column] = True
+        return found
+
+
 class ChunkReranker:
     """
     文档片段重排序器
     使用多种策略对检索结果进行重排序
+    所有候选片段一次批量打分：关键词/年份/查询字符用预编译的多模式匹配一次扫描，
+    各项特征与权重在 NumPy 数组上相乘，候选池扩大到上万条时重排耗时仍可忽略
     """
     
     def __init__(self):
@@ -195,6 +311,15 @@ class ChunkReranker:
             "年报": 1.5,
             "招股书": 1.5,
         }
+        
+        # 时效性：包含 current_year-2 ~ current_year+1 之间的年份即加权
+        self.current_year = 2025
+        
+        # 权重表编译结果（权重表修改后按需重建）
+        self._compiled_key = None
+        self._source_matcher: Optional[LiteralMatcher] = None
+        self._source_weight_array: Optional[np.ndarray] = None
+        self._source_cache: Dict[str, float] = {}
     
     def rerank(self, chunks: List[RetrievedChunk], 
                query: str, top_k: int = 5) -> List[RetrievedChunk]:
@@ -212,51 +337,83 @@ class ChunkReranker:
         if not chunks:
             return []
         
-        # 计算综合得分
-        scored_chunks = []
-        for chunk in chunks:
-            score = self._calculate_score(chunk, query)
-            scored_chunks.append((chunk, score))
-        
-        # 按得分排序
-        scored_chunks.sort(key=lambda x: x[1], reverse=True)
+        # 计算综合得分，按得分降序（同分保持原顺序）
+        scores = self.score_batch(chunks, query)
+        order = np.argsort(-scores, kind="stable")[:top_k]
         
-        # 返回top_k
-        return [c[0] for c in scored_chunks[:top_k]]
+        return [chunks[i] for i in order]
     
     def _calculate_score(self, chunk: RetrievedChunk, query: str) -> float:
-        """计算综合得分"""
-        score = chunk.score  # 基础分数（向量相似度）
+        """计算单个片段的综合得分"""
+        return float(self.score_batch([chunk], query)[0])
+    
+    def _compile(self):
+        key = (tuple(self.keyword_weights.items()), tuple(self.source_weights.items()))
+        if key != self._compiled_key:
+            sources = {}
+            for src, weight in self.source_weights.items():
+                sources.setdefault(src.lower(), weight)  # 与逐个匹配一致：先出现的优先
+            self._source_matcher = LiteralMatcher(list(sources))
+            self._source_weight_array = np.array(list(sources.values()), dtype=float)
+            self._source_cache = {}
+            self._compiled_key = key
+    
+    def _source_multipliers(self, chunks: Sequence[RetrievedChunk]) -> np.ndarray:
+        """来源加权：按来源字符串缓存，同一来源的片段只匹配一次"""
+        cache = self._source_cache
+        pending = list(dict.fromkeys(c.source for c in chunks if c.source not in cache))
+        if pending:
+            found = self._source_matcher.presence(TextBatch([src.lower() for src in pending]))
+            first = found.argmax(axis=1)
+            weights = np.where(found.any(axis=1), self._source_weight_array[first], 1.0) \
+                if found.shape[1] else np.ones(len(pending))
+            cache.update(zip(pending, weights.tolist()))
+        return np.fromiter((cache[c.source] for c in chunks), dtype=float, count=len(chunks))
+    
+    def score_batch(self, chunks: Sequence[RetrievedChunk], query: str) -> np.ndarray:
+        """
+        批量计算综合得分
+        
+        Args:
+            chunks: 候选片段
+            query: 原始查询
+        
+        Returns:
+            np.ndarray: 与 chunks 一一对应的得分
+        """
+        self._compile()
+        n = len(chunks)
+        batch = TextBatch([c.content for c in chunks])
+        score = np.fromiter((c.score for c in chunks), dtype=float, count=n)  # 基础分数（向量相似度）
+        
+        # 关键词、年份、查询字符合并为一个匹配器，全部候选一次扫描
+        keywords = list(self.keyword_weights)
+        years = [str(y) for y in range(self.current_year - 2, self.current_year + 2)]
+        # 原实现拿查询词集合与片段的字符集合求交，只有单字查询词可能命中
+        query_terms = set(query.replace("，", " ").replace(",", " ").split())
+        query_chars = [t for t in query_terms if len(t) == 1]
+        matcher = LiteralMatcher(keywords + years + query_chars)
+        found = matcher.presence(batch)
+        
+        def columns(patterns):
+            return [matcher.index[p] for p in patterns]
         
         # 1. 关键词加权
-        for keyword, weight in self.keyword_weights.items():
-            if keyword in chunk.content:
-                score *= weight
+        keyword_weights = np.array(list(self.keyword_weights.values()), dtype=float)
+        score *= np.where(found[:, columns(keywords)], keyword_weights, 1.0).prod(axis=1)
         
         # 2. 来源加权
-        source = chunk.source.lower()
-        for src, weight in self.source_weights.items():
-            if src.lower() in source:
-                score *= weight
-                break
+        score *= self._source_multipliers(chunks)
         
         # 3. 查询词匹配度
-        query_terms = set(query.replace("，", " ").replace(",", " ").split())
-        content_terms = set(chunk.content)
-        overlap = len(query_terms & content_terms)
-        score *= (1 + overlap * 0.1)
+        overlap = found[:, columns(query_chars)].sum(axis=1)
+        score *= 1 + overlap * 0.1
         
         # 4. 数据密度（包含数字的比例）
-        numbers = re.findall(r'\d+\.?\d*', chunk.content)
-        data_density = len(numbers) / max(len(chunk.content.split()), 1)
-        score *= (1 + data_density * 0.5)
+        score *= 1 + batch.count_numbers() / np.maximum(batch.count_words(), 1) * 0.5
         
         # 5. 时效性（如果包含近年份）
-        current_year = 2025
-        for year in range(current_year - 2, current_year + 2):
-            if str(year) in chunk.content:
-                score *= 1.2
-                break
+        score *= np.where(found[:, columns(years)].any(axis=1), 1.2, 1.0)
         
         return score
 
@@ -326,20 +483,36 @@ class SelfReflectiveRAG:
             "confidence": coverage_rate
         }
     
+    @staticmethod
+    def _retrieve(sub_queries: List[str], retriever_func, batch_retriever_func) -> List[RetrievedChunk]:
+        """执行一轮检索：有批量检索函数时所有子查询一次完成，否则逐条检索"""
+        if batch_retriever_func is not None:
+            return [chunk for chunks in batch_retriever_func(sub_queries) for chunk in chunks]
+        chunks = []
+        for sub_query in sub_queries:
+            chunks.extend(retriever_func(sub_query))
+        return chunks
+    
     def retrieve_with_reflection(self, query: str, 
-                                  retriever_func, 
-                                  max_iterations: int = 2) -> RAGResult:
+                                  retriever_func=None, 
+                                  max_iterations: int = 2,
+                                  batch_retriever_func=None) -> RAGResult:
         """
         带自省的检索流程
         
         Args:
             query: 原始查询
-            retriever_func: 检索函数
+            retriever_func: 检索函数 retriever_func(query) -> List[RetrievedChunk]，每个子查询调用一次
             max_iterations: 最大迭代次数
+            batch_retriever_func: 批量检索函数 batch_retriever_func(queries) -> List[List[RetrievedChunk]]，
+                每轮的全部子查询（含自省生成的补充查询）一次向量化、一次向量库查询；提供时优先使用
         
         Returns:
             RAGResult: 检索结果
         """
+        if retriever_func is None and batch_retriever_func is None:
+            raise ValueError("retriever_func 与 batch_retriever_func 至少提供一个")
+        
         # 1. 查询改写
         sub_queries = self.rewriter.rewrite(query)
         
@@ -347,9 +520,7 @@ class SelfReflectiveRAG:
         
         for iteration in range(max_iterations):
             # 2. 执行检索
-            for sub_query in sub_queries:
-                chunks = retriever_func(sub_query)
-                all_chunks.extend(chunks)
+            all_chunks.extend(self._retrieve(sub_queries, retriever_func, batch_retriever_func))
             
             # 3. 去重
             seen = set()
@@ -398,20 +569,39 @@ class HybridSearcher:
     结合向量检索和关键词检索
     """
     
-    def __init__(self, vector_weight: float = 0.7, keyword_weight: float = 0.3):
+    def __init__(self, vector_weight: float = 0.7, keyword_weight: float = 0.3, keyword_index=None):
         """
         初始化混合检索器
         
         Args:
             vector_weight: 向量检索权重
             keyword_weight: 关键词检索权重
+            keyword_index: BM25 关键词索引（ingestion.keyword_index.KeywordIndex）
         """
         self.vector_weight = vector_weight
         self.keyword_weight = keyword_weight
+        self.keyword_index = keyword_index
+    
+    def keyword_search(self, query: str, k: int = 10, source: Optional[str] = None) -> List[RetrievedChunk]:
+        """
+        关键词检索（BM25）
+        
+        Args:
+            query: 查询
+            k: 返回数量
+            source: 只检索文件名包含该关键词的文档
+        """
+        if self.keyword_index is None:
+            return []
+        return [
+            RetrievedChunk(content=hit["content"], source=hit["source"], score=hit["score"],
+                           metadata={**hit["metadata"], "id": hit["id"]})
+            for hit in self.keyword_index.search(query, k=k, source=source)
+        ]
     
     def search(self, query: str, 
                vector_results: List[RetrievedChunk],
-               keyword_results: List[RetrievedChunk],
+               keyword_results: Optional[List[RetrievedChunk]] = None,
                top_k: int = 5) -> List[RetrievedChunk]:
         """
         混合检索
@@ -419,12 +609,15 @@ class HybridSearcher:
         Args:
             query: 查询
             vector_results: 向量检索结果
-            keyword_results: 关键词检索结果
+            keyword_results: 关键词检索结果（不传时查询 keyword_index）
             top_k: 返回数量
         
         Returns:
             List[RetrievedChunk]: 混合结果
         """
+        if keyword_results is None:
+            keyword_results = self.keyword_search(query, k=top_k * 2)
+        
         # 建立内容到分数的映射
         scores = {}
         
@@ -469,4 +662,5 @@ class HybridSearcher:
 query_rewriter = QueryRewriter()
 chunk_reranker = ChunkReranker()
 self_reflective_rag = SelfReflectiveRAG(query_rewriter, chunk_reranker)
-hybrid_searcher = HybridSearcher()
+# 知识库检索：关键词（BM25）与向量等权，精确数字/实体命中的片段与向量首位并列
+hybrid_searcher = HybridSearcher(vector_weight=0.5, keyword_weight=0.5, keyword_index=keyword_index)
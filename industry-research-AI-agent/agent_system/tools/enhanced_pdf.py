@@ -12,11 +12,27 @@
 
 import os
 import re
-from typing import List, Dict, Optional, Any, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Iterable, Iterator, Optional, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 
+# 文档处理结果缓存的最大文档数（0 表示不缓存）
+PDF_CACHE_MAX_DOCS = int(os.getenv("PDF_CACHE_MAX_DOCS", "16"))
+
+# 页数少于该值时串行切分
+CHUNK_MIN_PAGES_FOR_PARALLEL = int(os.getenv("CHUNK_MIN_PAGES_FOR_PARALLEL", "64"))
+
+# 文档日期模式（按优先级）
+DATE_PATTERNS = [
+    re.compile(r'(\d{4}年\d{1,2}月\d{1,2}日)'),
+    re.compile(r'(\d{4}-\d{1,2}-\d{1,2})'),
+    re.compile(r'(\d{4}/\d{1,2}/\d{1,2})'),
+]
+
+
 @dataclass
 class PDFChunk:
     """PDF文档片段"""
@@ -52,6 +68,9 @@ class SemanticChunker:
     """
     语义切分器
     按语义边界切分文档，而非固定长度
+    
+    所有章节模式预编译为一个多分支正则：每页只扫描一遍定位标题行，
+    片段类型判断复用同一组已编译模式；多页文档可分发到进程池并行切分
     """
     
     # 章节标题模式
@@ -70,6 +89,18 @@ class SemanticChunker:
         '\n    ',  # 英文段落缩进
     ]
     
+    # 预编译：各章节模式合并为带命名分组的多分支（分组名 s0..sN 对应模式序号）
+    _SECTION_ALTERNATION = "|".join(
+        f"(?P<s{i}>{pattern.lstrip('^')})" for i, pattern in enumerate(SECTION_PATTERNS)
+    )
+    SECTION_RE = re.compile(f"(?:{_SECTION_ALTERNATION})")
+    # 整页扫描：行首（允许空白缩进）出现章节模式的整行
+    SECTION_LINE_RE = re.compile(f"^[^\\S\\n]*(?:{_SECTION_ALTERNATION}).*", re.MULTILINE)
+    # 目录提取：行首（不允许缩进）出现章节模式的整行
+    SECTION_START_RE = re.compile(f"^(?:{_SECTION_ALTERNATION}).*", re.MULTILINE)
+    SENTENCE_SPLIT_RE = re.compile(r'[。！？\n]')
+    LIST_RE = re.compile(r'[\d•\-\*]')
+    
     def __init__(self, max_chunk_size: int = 800, min_chunk_size: int = 100):
         """
         初始化语义切分器
@@ -120,32 +151,63 @@ class SemanticChunker:
         
         return chunks
     
+    def chunk_pages(self, pages: Iterable[Tuple[str, int]],
+                    max_workers: Optional[int] = None) -> List[PDFChunk]:
+        """
+        多页切分（按页码顺序返回）
+        页数较多时分批交给进程池，页数少时串行（进程开销不划算）
+        
+        Args:
+            pages: (文本, 页码) 序列
+            max_workers: 进程数，默认 CPU 核数；1 表示串行
+        """
+        pages = list(pages)
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers <= 1 or len(pages) < CHUNK_MIN_PAGES_FOR_PARALLEL:
+            return [chunk for text, page_number in pages for chunk in self.chunk(text, page_number)]
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        batch_size = max(1, -(-len(pages) // (max_workers * 4)))
+        batches = [(self.max_chunk_size, self.min_chunk_size, pages[i:i + batch_size])
+                   for i in range(0, len(pages), batch_size)]
+        chunks: List[PDFChunk] = []
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            # map 保持批次顺序
+            for batch_chunks in executor.map(_chunk_page_batch, batches):
+                chunks.extend(batch_chunks)
+        return chunks
+    
     def _split_by_sections(self, text: str) -> List[Tuple[str, str]]:
-        """按章节切分"""
+        """
+        按章节切分
+        一次 finditer 定位所有标题行，标题之间的行即章节内容
+        （与逐行 strip 后匹配的结果一致：没有内容行的章节不单独成段）
+        """
         sections = []
         current_title = ""
-        current_content = []
-        
-        lines = text.split('\n')
-        
-        for line in lines:
-            is_title = False
-            for pattern in self.SECTION_PATTERNS:
-                if re.match(pattern, line.strip()):
-                    # 保存之前的章节
-                    if current_content:
-                        sections.append((current_title, '\n'.join(current_content)))
-                    current_title = line.strip()
-                    current_content = []
-                    is_title = True
-                    break
-            
-            if not is_title:
-                current_content.append(line)
-        
-        # 保存最后一个章节
-        if current_content:
-            sections.append((current_title, '\n'.join(current_content)))
+        position = 0
+        
+        for match in self.SECTION_LINE_RE.finditer(text):
+            start = match.start()
+            # 上一个标题（或文首）到本标题之间的内容行
+            if start > position:
+                between = text[position:start]
+                # 去掉上一个标题行尾的换行和本标题行前的换行
+                if position > 0:
+                    between = between[1:]
+                line_count = between.count('\n')
+                if line_count:
+                    sections.append((current_title, between[:-1]))
+            current_title = match.group().strip()
+            position = match.end()
+        
+        # 最后一个标题之后（或没有标题时的全文）
+        tail = text[position:]
+        if position == 0:
+            sections.append((current_title, tail))
+        elif tail:
+            sections.append((current_title, tail[1:]))
         
         return sections if sections else [("", text)]
     
@@ -159,7 +221,7 @@ class SemanticChunker:
                     return [p.strip() for p in paragraphs if p.strip()]
         
         # 如果没有明显的段落分隔，按句子切分
-        sentences = re.split(r'[。！？\n]', text)
+        sentences = self.SENTENCE_SPLIT_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
     def _merge_and_split(self, paragraphs: List[str]) -> List[str]:
@@ -202,19 +264,27 @@ class SemanticChunker:
         if '|' in content and content.count('|') > 3:
             return 'table'
         
+        stripped = content.strip()
+        
         # 检测列表
-        if re.match(r'^[\d•\-\*]', content.strip()):
+        if self.LIST_RE.match(stripped):
             return 'list'
         
         # 检测标题
         if len(content) < 50 and not content.endswith('。'):
-            for pattern in self.SECTION_PATTERNS:
-                if re.match(pattern, content.strip()):
-                    return 'title'
+            if self.SECTION_RE.match(stripped):
+                return 'title'
         
         return 'text'
 
 
+def _chunk_page_batch(task: Tuple[int, int, List[Tuple[str, int]]]) -> List[PDFChunk]:
+    """进程池任务：切分一批页面"""
+    max_chunk_size, min_chunk_size, pages = task
+    chunker = SemanticChunker(max_chunk_size, min_chunk_size)
+    return [chunk for text, page_number in pages for chunk in chunker.chunk(text, page_number)]
+
+
 class TableExtractor:
     """
     表格提取器
@@ -238,24 +308,7 @@ class TableExtractor:
             
             with pdfplumber.open(pdf_path) as pdf:
                 for page_num, page in enumerate(pdf.pages, 1):
-                    page_tables = page.extract_tables()
-                    
-                    for table_idx, table in enumerate(page_tables):
-                        if table and len(table) > 1:
-                            # 清理表格数据
-                            cleaned_table = self._clean_table(table)
-                            
-                            # 转换为Markdown格式
-                            markdown = self._table_to_markdown(cleaned_table)
-                            
-                            tables.append({
-                                "page": page_num,
-                                "index": table_idx,
-                                "rows": len(cleaned_table),
-                                "cols": len(cleaned_table[0]) if cleaned_table else 0,
-                                "data": cleaned_table,
-                                "markdown": markdown
-                            })
+                    tables.extend(self._page_tables(page.extract_tables(), page_num))
         
         except ImportError:
             print("⚠️ pdfplumber未安装，无法提取表格")
@@ -264,6 +317,39 @@ class TableExtractor:
         
         return tables
     
+    def tables_from_records(self, records) -> List[Dict]:
+        """从逐页解析结果（PageRecord）构造表格列表，避免重复打开PDF"""
+        tables = []
+        for record in records:
+            tables.extend(self._page_tables(record.tables, record.page_number))
+        return tables
+    
+    def _page_tables(self, page_tables: List[List[List]], page_num: int) -> List[Dict]:
+        """单页表格 -> 表格字典（跳过只有表头的表格）"""
+        tables = []
+        for table_idx, table in enumerate(page_tables):
+            if table and len(table) > 1:
+                # 清理表格数据
+                cleaned_table = self._clean_table(table)
+                
+                # 转换为Markdown格式
+                markdown = self._table_to_markdown(cleaned_table)
+                
+                tables.append({
+                    "page": page_num,
+                    "index": table_idx,
+                    "rows": len(cleaned_table),
+                    "cols": len(cleaned_table[0]) if cleaned_table else 0,
+                    "data": cleaned_table,
+                    "markdown": markdown
+                })
+        return tables
+    
+    def to_frame(self, table: List[List]):
+        """表格 → 数值 DataFrame（行标签 × 列标签，亿/万/% 已规整，规则见 ingestion.table_index）"""
+        from ingestion.table_index import table_to_values
+        return table_to_values(table)
+    
     def _clean_table(self, table: List[List]) -> List[List[str]]:
         """清理表格数据"""
         cleaned = []
@@ -304,25 +390,80 @@ class EnhancedPDFProcessor:
     """
     增强版PDF处理器
     整合语义切分、表格提取、结构识别
+    
+    每个文档只解析一遍（文本和表格逐页同时提取），
+    处理结果按内容哈希缓存，文件未变化时重复处理/读取目录不再解析
     """
     
-    def __init__(self):
+    def __init__(self, max_cached_docs: int = PDF_CACHE_MAX_DOCS):
         self.chunker = SemanticChunker()
         self.table_extractor = TableExtractor()
+        
+        self.max_cached_docs = max_cached_docs
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # 内容哈希 -> 处理结果
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+    
+    # ------------------ 缓存 ------------------
+    
+    def _cache_get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._cache.get(content_hash)
+            if result is None:
+                self.stats["misses"] += 1
+                return None
+            self._cache.move_to_end(content_hash)
+            self.stats["hits"] += 1
+            return result
+    
+    def _cache_set(self, content_hash: str, result: Dict[str, Any]):
+        if self.max_cached_docs <= 0:
+            return
+        with self._lock:
+            self._cache[content_hash] = result
+            self._cache.move_to_end(content_hash)
+            while len(self._cache) > self.max_cached_docs:
+                self._cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """清空文档缓存"""
+        with self._lock:
+            self._cache.clear()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {**self.stats, "cached_docs": len(self._cache)}
     
-    def process(self, pdf_path: str) -> Dict[str, Any]:
+    # ------------------ 处理 ------------------
+    
+    def process(self, pdf_path: str, parallel: bool = False,
+                max_workers: Optional[int] = None, use_cache: bool = True) -> Dict[str, Any]:
         """
         处理PDF文件
         
         Args:
             pdf_path: PDF文件路径
+            parallel: 是否按页码区间多进程并行解析（大文档适用）
+            max_workers: 并行解析的进程数
+            use_cache: 是否使用文档缓存
         
         Returns:
-            Dict: 处理结果
+            Dict: 处理结果（缓存命中时与上次处理结果共享 chunks/tables 等对象，请勿原地修改）
         """
         if not os.path.exists(pdf_path):
             return {"error": f"文件不存在: {pdf_path}"}
         
+        from ingestion.artifact_store import artifact_store
+        
+        # 内容哈希按 mtime/大小复用，文件未变化时不重新计算
+        content_hash = artifact_store.content_hash(pdf_path) if use_cache else ""
+        if content_hash:
+            cached = self._cache_get(content_hash)
+            if cached is not None:
+                # 同内容不同路径时更新文件信息
+                return {**cached, "file_path": pdf_path, "file_name": os.path.basename(pdf_path)}
+        
         result = {
             "file_path": pdf_path,
             "file_name": os.path.basename(pdf_path),
@@ -333,29 +474,9 @@ class EnhancedPDFProcessor:
         }
         
         try:
-            import pdfplumber
-            
-            with pdfplumber.open(pdf_path) as pdf:
-                result["structure"].total_pages = len(pdf.pages)
-                
-                all_text = []
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # 提取文本
-                    text = page.extract_text() or ""
-                    all_text.append(text)
-                    
-                    # 语义切分
-                    chunks = self.chunker.chunk(text, page_num)
-                    result["chunks"].extend(chunks)
-                
-                result["full_text"] = "\n\n".join(all_text)
-            
-            # 提取表格
-            result["tables"] = self.table_extractor.extract_tables(pdf_path)
-            
-            # 提取文档结构
-            result["structure"] = self._extract_structure(result["full_text"])
+            # 文本和表格逐页一次提取（已解析过的内容直接读取解析结果）
+            records = artifact_store.iter_pages(pdf_path, content_hash or None, parallel, max_workers)
+            self._build_result(result, records, parallel, max_workers)
             
         except ImportError:
             # 回退到pypdf
@@ -363,7 +484,6 @@ class EnhancedPDFProcessor:
                 from pypdf import PdfReader
                 
                 reader = PdfReader(pdf_path)
-                result["structure"].total_pages = len(reader.pages)
                 
                 all_text = []
                 for page_num, page in enumerate(reader.pages, 1):
@@ -375,6 +495,7 @@ class EnhancedPDFProcessor:
                 
                 result["full_text"] = "\n\n".join(all_text)
                 result["structure"] = self._extract_structure(result["full_text"])
+                result["structure"].total_pages = len(reader.pages)
                 
             except Exception as e:
                 result["error"] = f"PDF处理失败: {e}"
@@ -382,6 +503,66 @@ class EnhancedPDFProcessor:
         except Exception as e:
             result["error"] = f"PDF处理失败: {e}"
         
+        if content_hash and "error" not in result:
+            self._cache_set(content_hash, result)
+        return result
+    
+    def iter_chunks(self, pdf_path: str, parallel: bool = False,
+                    max_workers: Optional[int] = None) -> Iterator[PDFChunk]:
+        """
+        流式处理：逐页产出语义片段和表格片段
+        不保留全文、片段列表和表格列表，适合数百页的招股书入库
+        
+        Args:
+            pdf_path: PDF文件路径
+            parallel: 是否按页码区间多进程并行解析
+            max_workers: 并行解析的进程数
+        """
+        from ingestion.artifact_store import artifact_store
+        
+        for record in artifact_store.iter_pages(pdf_path, None, parallel, max_workers):
+            yield from self.chunker.chunk(record.text, record.page_number)
+            for table in self.table_extractor.tables_from_records([record]):
+                yield PDFChunk(
+                    content=table["markdown"],
+                    chunk_type="table",
+                    page_number=record.page_number,
+                    metadata={"rows": table["rows"], "cols": table["cols"]}
+                )
+    
+    def _build_result(self, result: Dict[str, Any], records, parallel: bool = False,
+                      max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        由逐页解析结果（PageRecord）构造处理结果
+        切分、表格、结构识别共用同一份页面数据
+        parallel=True 时语义切分也交给进程池
+        """
+        all_text = []
+        total_pages = 0
+        pages = []
+        
+        for record in records:
+            total_pages += 1
+            all_text.append(record.text)
+            
+            # 语义切分
+            if parallel:
+                pages.append((record.text, record.page_number))
+            else:
+                result["chunks"].extend(self.chunker.chunk(record.text, record.page_number))
+            
+            # 表格
+            result["tables"].extend(self.table_extractor.tables_from_records([record]))
+        
+        if pages:
+            result["chunks"] = self.chunker.chunk_pages(pages, max_workers)
+        
+        result["full_text"] = "\n\n".join(all_text)
+        
+        # 提取文档结构
+        result["structure"] = self._extract_structure(result["full_text"])
+        result["structure"].total_pages = total_pages
+        result["structure"].tables = result["tables"]
         return result
     
     def _extract_structure(self, text: str) -> PDFStructure:
@@ -398,22 +579,23 @@ class EnhancedPDFProcessor:
                     break
         
         # 提取日期
-        date_patterns = [
-            r'(\d{4}年\d{1,2}月\d{1,2}日)',
-            r'(\d{4}-\d{1,2}-\d{1,2})',
-            r'(\d{4}/\d{1,2}/\d{1,2})',
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text[:2000])
+        head = text[:2000]
+        for pattern in DATE_PATTERNS:
+            match = pattern.search(head)
             if match:
                 structure.date = match.group(1)
                 break
         
-        # 提取章节目录
+        # 提取章节目录：一次扫描全文，按模式分组（保持原有的模式顺序与每类上限）
+        matches_by_pattern: Dict[str, List[str]] = {f"s{i}": [] for i in range(len(SemanticChunker.SECTION_PATTERNS))}
+        for match in SemanticChunker.SECTION_START_RE.finditer(text):
+            bucket = matches_by_pattern[match.lastgroup]
+            if len(bucket) < 20:  # 限制数量
+                bucket.append(match.group())
+        
         sections = []
-        for pattern in SemanticChunker.SECTION_PATTERNS:
-            matches = re.findall(f'{pattern}.*', text, re.MULTILINE)
-            for match in matches[:20]:  # 限制数量
+        for bucket in matches_by_pattern.values():
+            for match in bucket:
                 if len(match.strip()) < 100:
                     sections.append({"title": match.strip()})
         
@@ -431,6 +613,7 @@ class EnhancedPDFProcessor:
         Returns:
             List[str]: 目录列表
         """
+        # 文档已处理过时直接命中缓存
         result = self.process(pdf_path)
         
         if "error" in result:
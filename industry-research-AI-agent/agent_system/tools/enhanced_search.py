@@ -8,17 +8,53 @@
 2. 多轮搜索 - 自动进行补充搜索
 3. 结果验证 - 检查搜索结果质量
 4. 来源标注 - 自动标注数据来源
+5. 并发扇出 - 单次工具调用内的多条查询并发执行，结果顺序固定
 """
 
 from crewai.tools import BaseTool
-from crewai_tools import SerperDevTool
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from typing import List, Dict, Optional, Any, Tuple
+import os
 import re
+import threading
 import time
 
+from agent_system.tools.search_cache import search_cache, SEARCH_N_RESULTS
+from agent_system.tools.query_registry import get_query_registry
 
-# 初始化基础搜索工具
-serper_tool = SerperDevTool(n_results=8)
+
+# 基础搜索工具（首次使用时创建：crewai_tools 导入较重）
+_serper_tool = None
+_serper_lock = threading.Lock()
+
+
+def get_serper_tool():
+    """增强搜索共用的 Serper 搜索工具单例"""
+    global _serper_tool
+    with _serper_lock:
+        if _serper_tool is None:
+            from crewai_tools import SerperDevTool
+            _serper_tool = SerperDevTool(n_results=SEARCH_N_RESULTS)
+        return _serper_tool
+
+
+def __getattr__(name):
+    # 兼容 from enhanced_search import serper_tool（导入时才创建）
+    if name == "serper_tool":
+        return get_serper_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 共享搜索线程池：所有增强搜索工具复用同一个池，避免每次调用都新建线程
+SEARCH_POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "8"))
+_search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_POOL_SIZE,
+    thread_name_prefix="enhanced_search"
+)
+
+# 每个工具一个信号量，限制同一工具的在途查询数（跨多次并发调用生效）
+_tool_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_tool_semaphores_lock = threading.Lock()
 
 
 class EnhancedSearchBase(BaseTool):
@@ -32,12 +68,35 @@ class EnhancedSearchBase(BaseTool):
     max_retries: int = 2
     retry_delay: float = 1.0
     
+    # 并发配置
+    parallel_search: bool = True  # 是否并发执行多条查询
+    max_concurrency: int = 3  # 单个工具的最大在途查询数
+    
+    # 缓存类别（决定缓存有效期，见 search_cache.CATEGORY_TTL）
+    cache_category: str = "default"
+    
     def _safe_search(self, query: str) -> str:
-        """安全搜索，带重试机制"""
+        """安全搜索：会话内相同查询只执行一次"""
+        return get_query_registry().resolve(
+            query,
+            lambda: self._search_with_retry(query),
+            source=self.name,
+            n_results=getattr(get_serper_tool(), "n_results", None)
+        )
+    
+    def _search_with_retry(self, query: str) -> str:
+        """带磁盘缓存和重试机制的搜索"""
+        serper_tool = get_serper_tool()
+        n_results = getattr(serper_tool, "n_results", None)
+        cached = search_cache.get(query, n_results, self.cache_category)
+        if cached is not None:
+            return cached
+        
         for attempt in range(self.max_retries):
             try:
                 result = serper_tool.run(query)
                 if result and len(result) > 50:
+                    search_cache.set(query, result, n_results, self.cache_category)
                     return result
             except Exception as e:
                 if attempt < self.max_retries - 1:
@@ -46,6 +105,55 @@ class EnhancedSearchBase(BaseTool):
                 return f"搜索失败: {str(e)}"
         return "未找到相关信息"
     
+    def _get_semaphore(self) -> threading.BoundedSemaphore:
+        """获取当前工具的并发信号量"""
+        with _tool_semaphores_lock:
+            semaphore = _tool_semaphores.get(self.name)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(max(1, self.max_concurrency))
+                _tool_semaphores[self.name] = semaphore
+            return semaphore
+    
+    def _bounded_search(self, query: str) -> str:
+        """在工具并发上限内执行一次搜索"""
+        with self._get_semaphore():
+            return self._safe_search(query)
+    
+    def _multi_search(self, queries: List[str]) -> List[Tuple[str, str]]:
+        """
+        执行多条查询
+        并发模式下提交到共享线程池，结果始终按 queries 的原始顺序返回
+        
+        Args:
+            queries: 查询列表
+        
+        Returns:
+            List[Tuple[str, str]]: (查询, 结果) 列表
+        """
+        if not self.parallel_search or len(queries) <= 1:
+            return [(q, self._safe_search(q)) for q in queries]
+        
+        # 复制上下文提交，工作线程沿用本次研究运行的查询注册表
+        futures = [_search_executor.submit(contextvars.copy_context().run, self._bounded_search, q)
+                   for q in queries]
+        
+        results = []
+        for q, future in zip(queries, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = f"搜索失败: {str(e)}"
+            results.append((q, result))
+        return results
+    
+    def _collect_results(self, queries: List[str]) -> List[str]:
+        """执行多条查询并过滤无效结果"""
+        all_results = []
+        for q, result in self._multi_search(queries):
+            if result and "未找到" not in result:
+                all_results.append(f"【{q}】\n{result}")
+        return all_results
+    
     def _extract_numbers(self, text: str) -> List[Dict]:
         """从文本中提取数字和单位"""
         patterns = [
@@ -79,6 +187,7 @@ class FinancialDataSearchTool(EnhancedSearchBase):
     """
     
     name: str = "Financial Data Search"
+    cache_category: str = "financial"
     description: str = """专门搜索企业财务数据。
 输入格式: 公司名称 或 公司名称,年份
 示例: "比亚迪" 或 "比亚迪,2024"
@@ -98,11 +207,7 @@ class FinancialDataSearchTool(EnhancedSearchBase):
                 f"{company} 市值 PE PB 估值"
             ]
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {company} 的财务数据"
@@ -132,6 +237,7 @@ class PolicySearchToolEnhanced(EnhancedSearchBase):
     """
     
     name: str = "Industry Policy Search Enhanced"
+    cache_category: str = "policy"
     description: str = """专门搜索行业政策信息。
 输入格式: 行业名称 或 行业名称,省份
 示例: "人工智能" 或 "人工智能,浙江省"
@@ -157,11 +263,7 @@ class PolicySearchToolEnhanced(EnhancedSearchBase):
                     f"{province} {industry} 发展目标 十四五"
                 ])
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {industry} 行业的政策信息"
@@ -186,6 +288,7 @@ class MarketSizeSearchToolEnhanced(EnhancedSearchBase):
     """
     
     name: str = "Market Size Search Enhanced"
+    cache_category: str = "market"
     description: str = """专门搜索行业市场规模数据。
 输入格式: 行业名称 或 行业名称,地区
 示例: "人工智能" 或 "人工智能,中国"
@@ -206,11 +309,7 @@ class MarketSizeSearchToolEnhanced(EnhancedSearchBase):
                 f"{industry} 市场规模 IDC Gartner 艾瑞"  # 权威来源
             ]
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {industry} 行业的市场规模数据"
@@ -240,6 +339,7 @@ class CompetitiveAnalysisSearchTool(EnhancedSearchBase):
     """
     
     name: str = "Competitive Analysis Search"
+    cache_category: str = "competition"
     description: str = """专门搜索行业竞争格局信息。
 输入格式: 行业名称
 示例: "人工智能"
@@ -257,11 +357,7 @@ class CompetitiveAnalysisSearchTool(EnhancedSearchBase):
                 f"{industry} 新进入者 潜在竞争者"
             ]
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {industry} 行业的竞争格局信息"
@@ -283,6 +379,7 @@ class SupplyChainSearchToolEnhanced(EnhancedSearchBase):
     """
     
     name: str = "Supply Chain Search Enhanced"
+    cache_category: str = "supply_chain"
     description: str = """专门搜索产业链信息。
 输入格式: 行业名称
 示例: "人工智能"
@@ -302,11 +399,7 @@ class SupplyChainSearchToolEnhanced(EnhancedSearchBase):
                 f"{industry} 产业链 卡脖子 关键环节"
             ]
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {industry} 行业的产业链信息"
@@ -328,6 +421,7 @@ class InvestmentSearchTool(EnhancedSearchBase):
     """
     
     name: str = "Investment Information Search"
+    cache_category: str = "investment"
     description: str = """专门搜索投融资和估值信息。
 输入格式: 行业名称 或 公司名称
 示例: "人工智能" 或 "商汤科技"
@@ -345,11 +439,7 @@ class InvestmentSearchTool(EnhancedSearchBase):
                 f"{target} VC PE 投资案例"
             ]
             
-            all_results = []
-            for q in queries:
-                result = self._safe_search(q)
-                if result and "未找到" not in result:
-                    all_results.append(f"【{q}】\n{result}")
+            all_results = self._collect_results(queries)
             
             if not all_results:
                 return f"未找到 {target} 的投资信息"
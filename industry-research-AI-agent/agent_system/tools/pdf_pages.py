@@ -0,0 +1,225 @@
+# agent_system/tools/pdf_pages.py
+"""
+按页读取PDF（目录 + 页码区间 / 章节）
+
+大部头招股书、年报动辄数百页，一次返回前 N 页要么找不到关键章节、要么撑爆上下文。
+推荐用法：先看目录（带页码），再按页码或章节名读取需要的部分
+
+- 文档已完整解析过：通过解析结果的页偏移索引直接定位，只解码请求的页面
+- 文档未解析过：只从PDF解析请求的页面（不做全量解析）
+- 目录需要全文扫描一次，结果写入解析存储并按内容哈希缓存
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ingestion.artifact_store import artifact_store
+from ingestion.pdf_parser import PageRecord, count_pages, iter_page_records
+
+
+# 单次读取的最大页数（控制返回给 LLM 的 token 量）
+PDF_READ_MAX_PAGES = int(os.getenv("PDF_READ_MAX_PAGES", "10"))
+
+# 目录标题模式（只取一二级标题，数字编号类标题误报太多）
+TOC_PATTERNS = [
+    re.compile(r'^第[一二三四五六七八九十\d]+[章节部分]'),  # 第一章、第1节
+    re.compile(r'^[一二三四五六七八九十]+[、.．]'),  # 一、二、
+]
+TOC_MAX_TITLE_LEN = 40
+
+
+def parse_page_spec(spec: str, total_pages: Optional[int] = None) -> List[int]:
+    """
+    解析页码表达式
+
+    Args:
+        spec: 如 "80", "80-85", "3,5,10-12"
+        total_pages: 总页数（用于截断越界页码）
+
+    Returns:
+        List[int]: 去重排序后的页码（从 1 开始）
+    """
+    pages = set()
+    for part in re.split(r'[,，\s]+', spec.strip()):
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)\s*[-~～至到]\s*(\d+)', part)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            if start > end:
+                start, end = end, start
+            pages.update(range(start, end + 1))
+        elif part.isdigit():
+            pages.add(int(part))
+        else:
+            raise ValueError(f"无法识别的页码: {part}")
+
+    pages = {p for p in pages if p >= 1}
+    if total_pages:
+        pages = {p for p in pages if p <= total_pages}
+    return sorted(pages)
+
+
+def _page_ranges(pages: List[int]) -> List[Tuple[int, int]]:
+    """连续页码合并为 [start, end) 区间（下标从 0 开始），便于按区间打开PDF"""
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page - 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page - 1, page])
+    return [(start, end) for start, end in ranges]
+
+
+class PagedPDFReader:
+    """
+    按页读取PDF
+    目录按内容哈希缓存在内存中
+    """
+
+    def __init__(self, max_pages: int = PDF_READ_MAX_PAGES):
+        self.max_pages = max_pages
+        self._toc_cache: Dict[str, Tuple[int, List[Dict]]] = {}  # 内容哈希 -> (总页数, 目录)
+        self._lock = threading.Lock()
+
+    # ------------------ 目录 ------------------
+
+    @staticmethod
+    def _page_headings(record: PageRecord) -> List[str]:
+        headings = []
+        for line in record.text.split('\n'):
+            line = line.strip()
+            if not line or len(line) > TOC_MAX_TITLE_LEN:
+                continue
+            if any(pattern.match(line) for pattern in TOC_PATTERNS):
+                headings.append(line)
+        return headings
+
+    def toc(self, file_path: str) -> Tuple[int, List[Dict]]:
+        """
+        获取目录（带页码）
+
+        Returns:
+            (总页数, [{"title": 标题, "page": 起始页}])
+        """
+        content_hash = artifact_store.content_hash(file_path)
+        with self._lock:
+            cached = self._toc_cache.get(content_hash)
+        if cached:
+            return cached
+
+        total_pages = 0
+        entries: List[Dict] = []
+        seen = set()
+        for record in artifact_store.iter_pages(file_path, content_hash):
+            total_pages += 1
+            for title in self._page_headings(record):
+                # 页眉/页脚中重复出现的章节名只记第一次
+                if title in seen:
+                    continue
+                seen.add(title)
+                entries.append({"title": title, "page": record.page_number})
+
+        with self._lock:
+            self._toc_cache[content_hash] = (total_pages, entries)
+        return total_pages, entries
+
+    def section_pages(self, file_path: str, section: str) -> List[int]:
+        """按章节名（模糊匹配）定位页码区间：章节起始页到下一章节起始页"""
+        total_pages, entries = self.toc(file_path)
+        keyword = section.strip()
+        for i, entry in enumerate(entries):
+            if keyword and keyword in entry["title"]:
+                start = entry["page"]
+                # 下一个不同页的章节作为结束边界
+                end = total_pages
+                for following in entries[i + 1:]:
+                    if following["page"] > start:
+                        end = following["page"] - 1
+                        break
+                return list(range(start, end + 1))
+        return []
+
+    # ------------------ 读取 ------------------
+
+    def read_pages(self, file_path: str, pages: List[int]) -> List[PageRecord]:
+        """
+        读取指定页面
+
+        已完整解析过的文档按偏移索引直接读取；否则只解析请求的页面
+        """
+        if not pages:
+            return []
+        content_hash = artifact_store.content_hash(file_path)
+        if artifact_store.has(content_hash):
+            return artifact_store.read_pages(content_hash, pages)
+
+        records = []
+        for start, end in _page_ranges(pages):
+            records.extend(iter_page_records(file_path, start=start, end=end))
+        return records
+
+    def total_pages(self, file_path: str) -> int:
+        """总页数（优先使用已缓存的目录或解析结果索引）"""
+        content_hash = artifact_store.content_hash(file_path)
+        with self._lock:
+            cached = self._toc_cache.get(content_hash)
+        if cached:
+            return cached[0]
+        if artifact_store.has(content_hash):
+            return len(artifact_store.page_index(content_hash))
+        return count_pages(file_path)
+
+    def render(self, file_path: str, pages: str = "", section: str = "") -> str:
+        """
+        生成返回给 Agent 的文本
+
+        Args:
+            file_path: PDF 路径
+            pages: 页码表达式，如 "80-85"
+            section: 章节名关键词
+
+        不指定 pages/section 时返回目录；目录为空时返回前 max_pages 页
+        """
+        name = os.path.basename(file_path)
+
+        if section:
+            page_list = self.section_pages(file_path, section)
+            if not page_list:
+                total, entries = self.toc(file_path)
+                titles = "\n".join(f"- {e['title']} (p.{e['page']})" for e in entries[:50])
+                return f"Section '{section}' not found in {name}. Available sections:\n{titles}"
+        elif pages:
+            page_list = parse_page_spec(pages, self.total_pages(file_path))
+            if not page_list:
+                return f"Error: no valid pages in '{pages}' (document has {self.total_pages(file_path)} pages)."
+        else:
+            total, entries = self.toc(file_path)
+            if entries:
+                lines = [f"--- Table of Contents of {name} ({total} pages) ---"]
+                lines.extend(f"- {e['title']} (p.{e['page']})" for e in entries)
+                lines.append(
+                    "\nTo read content, call again with pages (e.g. '80-85') "
+                    "or section (e.g. a title above)."
+                )
+                return "\n".join(lines)
+            page_list = list(range(1, min(total, self.max_pages) + 1))
+            if not page_list:
+                return f"Error: {name} has no readable pages."
+
+        truncated = len(page_list) > self.max_pages
+        page_list = page_list[:self.max_pages]
+        records = self.read_pages(file_path, page_list)
+
+        body = "\n".join(f"[Page {r.page_number}]\n{r.text}" for r in records)
+        header = f"--- Content of {name}, pages {page_list[0]}-{page_list[-1]} ---"
+        if truncated:
+            header += (f"\n(Only the first {self.max_pages} pages are shown; "
+                       f"request the next range to continue from page {page_list[-1] + 1}.)")
+        return f"{header}\n{body}"
+
+
+# 全局实例
+paged_pdf_reader = PagedPDFReader()
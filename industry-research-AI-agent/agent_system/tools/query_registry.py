@@ -0,0 +1,191 @@
+# agent_system/tools/query_registry.py
+"""
+研究会话级查询注册表
+不同Agent/工具在同一次研究中发出的相同（或近似相同）查询只执行一次
+
+核心功能：
+1. 查询归一化 - 空白/全半角/同义词归一，词序无关
+2. 在途合并 - 相同查询正在执行时，后来者等待首个结果
+3. 结果复用 - 已完成的查询直接返回首个结果
+4. 计数统计 - 计划查询数 vs 实际发出查询数
+
+每次研究运行通过 start_query_session() 获得独立的注册表（contextvars 绑定），
+并发的多次运行互不清空、互不串用；工具侧统一用 get_query_registry() 取当前注册表
+"""
+
+import contextvars
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from agent_system.tools.search_cache import normalize_query
+
+
+# 同义词归一表：左侧统一映射为右侧
+QUERY_SYNONYMS: Dict[str, str] = {
+    "行业规模": "市场规模",
+    "市场空间": "市场规模",
+    "市场容量": "市场规模",
+    "增长率": "增速",
+    "同比增长": "增速",
+    "头部企业": "龙头企业",
+    "领先企业": "龙头企业",
+    "扶持政策": "扶持",
+    "扶持措施": "扶持",
+    "补贴政策": "补贴",
+    "国家政策": "产业政策",
+    "产业规划": "规划",
+    "发展规划": "规划",
+    "全景图": "图谱",
+    "产业链图谱": "产业链 图谱",
+    "市场格局": "竞争格局",
+    "竞争态势": "竞争格局",
+}
+
+
+def canonical_query(query: str) -> str:
+    """
+    生成查询的规范形式
+    归一化后做同义词替换，再按词排序去重，使词序不同的查询落到同一个键
+    """
+    text = normalize_query(query)
+    # 长词优先替换，避免短词先命中
+    for term in sorted(QUERY_SYNONYMS, key=len, reverse=True):
+        if term in text:
+            text = text.replace(term, f" {QUERY_SYNONYMS[term]} ")
+    tokens = sorted(set(text.split()))
+    return " ".join(tokens)
+
+
+def _default_reusable(result: Any) -> bool:
+    """只有有效结果才在会话内复用，失败/空结果允许后续重试"""
+    return bool(result) and len(str(result)) > 50
+
+
+class QueryRegistry:
+    """
+    会话级查询注册表
+    线程安全，可被并发的搜索线程共享
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Future] = {}
+        self.session_id: Optional[str] = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {
+            "planned": 0,           # 工具计划发出的查询总数
+            "issued": 0,            # 实际向下游（缓存/网络）发出的查询数
+            "dedup_inflight": 0,    # 合并到在途查询的次数
+            "dedup_completed": 0,   # 复用已完成结果的次数
+            "by_source": {}
+        }
+
+    def start_session(self, session_id: str = None) -> str:
+        """开始新的研究会话，清空已登记的查询"""
+        with self._lock:
+            self.session_id = session_id or uuid.uuid4().hex[:12]
+            self._entries.clear()
+            self._reset_stats()
+        return self.session_id
+
+    def resolve(self, query: str, fetch: Callable[[], Any], source: str = "",
+                reusable: Callable[[Any], bool] = _default_reusable,
+                n_results: Optional[int] = None) -> Any:
+        """
+        解析一条查询
+        首个请求者执行 fetch；相同查询的后续请求者等待并共享其结果
+
+        Args:
+            query: 原始查询
+            fetch: 实际执行查询的函数
+            source: 发起查询的工具名（用于统计）
+            reusable: 判断结果是否可在会话内复用
+            n_results: 下游返回的结果条数（参与键，不同条数的工具不共享结果）
+
+        Returns:
+            查询结果；fetch 抛出的异常会传递给所有等待者
+        """
+        key = canonical_query(query)
+        if n_results is not None:
+            key = f"{key}#{n_results}"
+
+        with self._lock:
+            self.stats["planned"] += 1
+            source_stats = self.stats["by_source"].setdefault(source or "unknown", {"planned": 0, "issued": 0})
+            source_stats["planned"] += 1
+
+            future = self._entries.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._entries[key] = future
+                self.stats["issued"] += 1
+                source_stats["issued"] += 1
+            elif future.done():
+                self.stats["dedup_completed"] += 1
+            else:
+                self.stats["dedup_inflight"] += 1
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            self._discard(key, future)
+            future.set_exception(e)
+            raise
+
+        if not reusable(result):
+            self._discard(key, future)
+        future.set_result(result)
+        return result
+
+    def _discard(self, key: str, future: Future):
+        """移除登记（仅当仍是同一个 Future 时）"""
+        with self._lock:
+            if self._entries.get(key) is future:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取查询统计：计划数、实际发出数、合并数"""
+        with self._lock:
+            planned = self.stats["planned"]
+            issued = self.stats["issued"]
+            return {
+                "session_id": self.session_id,
+                "planned": planned,
+                "issued": issued,
+                "deduplicated": planned - issued,
+                "dedup_inflight": self.stats["dedup_inflight"],
+                "dedup_completed": self.stats["dedup_completed"],
+                "dedup_rate": (planned - issued) / planned if planned else 0.0,
+                "by_source": {k: dict(v) for k, v in self.stats["by_source"].items()}
+            }
+
+
+# 全局实例（未开启研究会话时的兜底注册表）
+query_registry = QueryRegistry()
+
+# 当前研究运行的注册表
+_current_registry: contextvars.ContextVar = contextvars.ContextVar("query_registry", default=None)
+
+
+def start_query_session(session_id: str = None) -> QueryRegistry:
+    """
+    为当前研究运行创建独立的注册表，并绑定到当前上下文
+    工作线程需通过 contextvars.copy_context() 提交任务才能看到该注册表
+    """
+    registry = QueryRegistry()
+    registry.start_session(session_id)
+    _current_registry.set(registry)
+    return registry
+
+
+def get_query_registry() -> QueryRegistry:
+    """获取当前上下文的注册表，未开启会话时返回全局兜底实例"""
+    return _current_registry.get() or query_registry
@@ -0,0 +1,295 @@
+# agent_system/tools/search_cache.py
+"""
+搜索结果持久化缓存
+相同查询跨运行复用，节省 Serper 配额和网络延迟
+
+核心功能：
+1. 内容寻址 - 以 (归一化查询, n_results) 的哈希作为缓存键
+2. 分类TTL - 政策类缓存更久，市场/财务类更短
+3. LRU淘汰 - 按条目数和磁盘占用双重上限淘汰最久未用的条目
+4. 命中统计 - 按类别统计命中/未命中次数
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+# ===============================
+# 缓存目录（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", os.path.join(PROJECT_ROOT, "search_cache"))
+
+# 是否启用缓存（设为 0 可强制走实时搜索）
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") != "0"
+
+DAY = 86400
+
+# 各类工具的缓存有效期（秒）
+CATEGORY_TTL: Dict[str, int] = {
+    "policy": 7 * DAY,        # 政策文件变化慢
+    "supply_chain": 3 * DAY,
+    "competition": 3 * DAY,
+    "business_model": 3 * DAY,
+    "company": 2 * DAY,
+    "market": 1 * DAY,        # 市场规模/预测数据更新快
+    "financial": 1 * DAY,     # 财报、估值数据更新快
+    "investment": 1 * DAY,
+    "ticker": 30 * DAY,       # 公司名 -> 股票代码几乎不变
+    "default": 1 * DAY,
+}
+
+# 低于该长度的结果视为无效，不写入缓存
+MIN_RESULT_LENGTH = 50
+
+# 通用搜索与增强搜索共用的结果条数：条数一致，两类工具的相同查询才能在会话内互相复用
+SEARCH_N_RESULTS = int(os.getenv("SEARCH_N_RESULTS", "8"))
+
+
+def normalize_query(query: str) -> str:
+    """
+    查询归一化
+    全角转半角、统一大小写、合并连续空白
+    """
+    text = unicodedata.normalize("NFKC", query or "")
+    text = text.lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+class SearchResultCache:
+    """
+    搜索结果磁盘缓存
+    每个条目一个JSON文件，文件名为缓存键；内存中维护LRU索引
+    """
+
+    def __init__(self, cache_dir: str = SEARCH_CACHE_DIR,
+                 max_entries: int = 5000,
+                 max_bytes: int = 200 * 1024 * 1024,
+                 ttl_map: Dict[str, int] = None):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_entries: 最大条目数
+            max_bytes: 最大磁盘占用（字节）
+            ttl_map: 各类别的有效期（秒），缺省使用 CATEGORY_TTL
+        """
+        self.cache_dir = cache_dir
+        self.enabled = SEARCH_CACHE_ENABLED
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_map = dict(CATEGORY_TTL)
+        if ttl_map:
+            self.ttl_map.update(ttl_map)
+
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> 文件大小，按访问时间排序
+        self._total_bytes = 0
+        self._loaded = False
+
+        # 命中统计
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+            "by_category": {}
+        }
+
+    # ------------------ 内部工具 ------------------
+
+    @staticmethod
+    def make_key(query: str, n_results: Optional[int]) -> str:
+        """生成内容寻址缓存键"""
+        raw = f"{n_results}|{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _ensure_loaded(self):
+        """首次使用时扫描缓存目录，按文件修改时间重建LRU索引"""
+        if self._loaded:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def _record(self, category: str, field: str):
+        cat_stats = self.stats["by_category"].setdefault(category, {"hits": 0, "misses": 0})
+        cat_stats[field] += 1
+        self.stats[field] += 1
+
+    def _remove(self, key: str):
+        size = self._index.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到满足容量上限"""
+        while self._index and (len(self._index) > self.max_entries
+                               or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+    # ------------------ 读写接口 ------------------
+
+    def get(self, query: str, n_results: Optional[int] = None,
+            category: str = "default") -> Optional[Any]:
+        """
+        读取缓存
+
+        Returns:
+            缓存的搜索结果；未命中或已过期返回 None
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(query, n_results)
+        ttl = self.ttl_map.get(category, self.ttl_map["default"])
+
+        with self._lock:
+            self._ensure_loaded()
+            if key not in self._index:
+                self._record(category, "misses")
+                return None
+
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                self._record(category, "misses")
+                return None
+
+            if time.time() - entry.get("created_at", 0) > ttl:
+                self._remove(key)
+                self.stats["expired"] += 1
+                self._record(category, "misses")
+                return None
+
+            # 命中：刷新LRU位置和文件修改时间（重启后索引依然有序）
+            self._index.move_to_end(key)
+            try:
+                os.utime(self._path(key), None)
+            except OSError:
+                pass
+            self._record(category, "hits")
+            return entry.get("result")
+
+    def set(self, query: str, result: Any, n_results: Optional[int] = None,
+            category: str = "default"):
+        """写入缓存（原子写入，避免并发读到半个文件）"""
+        if not self.enabled:
+            return
+
+        key = self.make_key(query, n_results)
+        entry = {
+            "query": query,
+            "n_results": n_results,
+            "category": category,
+            "created_at": time.time(),
+            "result": result
+        }
+
+        with self._lock:
+            self._ensure_loaded()
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+            except OSError as e:
+                print(f"⚠️ [SearchCache] 写入失败: {e}")
+                return
+
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.stats["writes"] += 1
+            self._evict()
+
+    def get_or_fetch(self, query: str, fetch: Callable[[], Any],
+                     n_results: Optional[int] = None,
+                     category: str = "default") -> Any:
+        """
+        先查缓存，未命中时调用 fetch 并写回
+        只有长度足够的结果才会被缓存，异常直接向上抛出
+        """
+        cached = self.get(query, n_results, category)
+        if cached is not None:
+            return cached
+
+        result = fetch()
+        if result and len(str(result)) > MIN_RESULT_LENGTH:
+            self.set(query, result, n_results, category)
+        return result
+
+    # ------------------ 统计与维护 ------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            self._ensure_loaded()
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "by_category": {k: dict(v) for k, v in self.stats["by_category"].items()},
+                "hit_rate": self.stats["hits"] / total if total else 0.0,
+                "entries": len(self._index),
+                "total_bytes": self._total_bytes
+            }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._ensure_loaded()
+            for key in list(self._index):
+                self._remove(key)
+        print("🧹 [SearchCache] 搜索缓存已清理")
+
+
+def cached_search(tool, query: str, category: str = "default") -> Any:
+    """
+    通过缓存调用搜索工具（如 SerperDevTool）
+    缓存键包含工具的 n_results，不同结果数的工具互不串用
+    """
+    return search_cache.get_or_fetch(
+        query,
+        lambda: tool.run(query),
+        n_results=getattr(tool, "n_results", None),
+        category=category
+    )
+
+
+# 全局实例
+search_cache = SearchResultCache()
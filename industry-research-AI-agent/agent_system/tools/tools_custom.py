@@ -2,22 +2,56 @@
 # 修改您的工具定义，现在的工具不再是"读整个文件"，而是"去知识库里查"
 # 使用 crewai.tools (点) 导入 BaseTool，BaseTool 是定义在主包 crewai 里的，不是扩展包 crewai_tools 里的
 from crewai.tools import BaseTool
-from crewai_tools import SerperDevTool
-from agent_system.knowledge import kb_manager
-import yfinance as yf
-import akshare as ak  
-from pypdf import PdfReader
+from agent_system.knowledge import get_kb_manager
+from agent_system.tools.search_cache import cached_search, SEARCH_N_RESULTS
+from agent_system.tools.query_registry import get_query_registry
+from agent_system.tools.pdf_pages import paged_pdf_reader
+from ingestion.table_index import table_index
 import os
 import re 
+import threading
 import numpy as np
 import pandas as pd
 import numpy_financial as npf 
 # from agent_system.observability.log_buffer import log_event
 
 # 升级版工具：支持直接输入中文公司名
-# 初始化搜索工具
-# search_tool 直接传给 Agent 的 tools 列表即可
-serper_tool = SerperDevTool(n_results=5)
+# 初始化搜索工具（首次使用时创建：crewai_tools 导入较重）
+# search_tool 直接传给 Agent 的 tools 列表即可：tools=[get_serper_tool(), ...]
+# yfinance / akshare 同样在对应工具内部按需导入
+_serper_tool = None
+_serper_lock = threading.Lock()
+
+
+def get_serper_tool():
+    """Serper 搜索工具单例"""
+    global _serper_tool
+    with _serper_lock:
+        if _serper_tool is None:
+            from crewai_tools import SerperDevTool
+            _serper_tool = SerperDevTool(n_results=SEARCH_N_RESULTS)
+        return _serper_tool
+
+
+def __getattr__(name):
+    # 兼容 from tools_custom import serper_tool（导入时才创建）
+    if name == "serper_tool":
+        return get_serper_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def registered_search(query: str, category: str, source: str = "") -> str:
+    """
+    经会话查询注册表 + 磁盘缓存执行搜索
+    同一研究会话中其他工具已发出的相同查询会直接复用结果
+    """
+    serper_tool = get_serper_tool()
+    return get_query_registry().resolve(
+        query,
+        lambda: cached_search(serper_tool, query, category),
+        source=source or category,
+        n_results=getattr(serper_tool, "n_results", None)
+    )
 
 
 class StockAnalysisTool(BaseTool):
@@ -38,6 +72,8 @@ class StockAnalysisTool(BaseTool):
         【A股专用】使用 AkShare 获取精准财务数据
         """
         try:
+            import akshare as ak
+            
             stock_code = stock_code.strip()
             
             # 1. 获取个股实时信息 (市值、PE、行业等)
@@ -88,7 +124,7 @@ class StockAnalysisTool(BaseTool):
 
         try:
             search_query = f"{query} 股票代码 stock ticker"
-            result = serper_tool.run(search_query)
+            result = cached_search(get_serper_tool(), search_query, "ticker")
             
             match_a = re.search(r'(code|代码|ticker)[:\s]*(\d{6})', result, re.IGNORECASE)
             match_num = re.search(r'\b(60\d{4}|00\d{4}|30\d{4})\b', result)
@@ -125,6 +161,8 @@ class StockAnalysisTool(BaseTool):
                 return self._fetch_a_share_data(real_ticker)
             
             else:
+                import yfinance as yf
+                
                 stock = yf.Ticker(real_ticker)
                 info = stock.info
                 
@@ -155,11 +193,27 @@ class StockAnalysisTool(BaseTool):
 
 class PDFReadTool(BaseTool):
     name: str = "Read Local PDF Report"
-    description: str = "Useful for reading the FULL content of a local PDF file. Input: filename or path."
+    description: str = (
+        "Read a local PDF page by page. Call with only the filename first to get the table of contents "
+        "with page numbers, then call again with pages (e.g. '80-85') or section (a title from the contents). "
+        "Inline form also works: 'report.pdf | pages=80-85' or 'report.pdf | section=财务分析'."
+    )
 
-    def _run(self, file_path: str) -> str:
+    def _run(self, file_path: str, pages: str = "", section: str = "") -> str:
         try:
             file_path = file_path.strip().strip('"').strip("'")
+            # 兼容单字符串输入："文件名 | pages=80-85" / "文件名 | section=xx"
+            if "|" in file_path:
+                file_path, *options = [part.strip() for part in file_path.split("|")]
+                for option in options:
+                    key, _, value = option.partition("=")
+                    key, value = key.strip().lower(), value.strip()
+                    if key in ("pages", "page") and not pages:
+                        pages = value
+                    elif key == "section" and not section:
+                        section = value
+                file_path = file_path.strip('"').strip("'")
+
             base_dir = "knowledge_base"
             final_path = file_path
             
@@ -175,14 +229,8 @@ class PDFReadTool(BaseTool):
                         return f"Error: File '{filename}' not found. Available files in {base_dir}: {all_files}"
                     return f"Error: File not found at {file_path} (and {base_dir} folder missing)."
 
-            reader = PdfReader(final_path)
-            text = ""
-            max_pages = 20 
-            for i, page in enumerate(reader.pages):
-                if i >= max_pages: break
-                text += page.extract_text() + "\n"
-                
-            return f"--- Content of {final_path} (First {max_pages} pages) ---\n{text}"
+            # 先目录后按页/章节读取，只解码请求的页面
+            return paged_pdf_reader.render(final_path, pages=str(pages or ""), section=section or "")
             
         except Exception as e:
             return f"Error reading PDF: {str(e)}"
@@ -194,8 +242,8 @@ class RecallHistoryTool(BaseTool):
 
     def _run(self, query: str) -> str:
         try:
-            from memory_system.memory_manager import memory_manager
-            results = memory_manager.recall_memory(query, k=5)
+            from memory_system.memory_manager import get_memory_manager
+            results = get_memory_manager().recall_memory(query, k=5)
             if not results:
                 return "No relevant historical insights found."
                 
@@ -248,9 +296,9 @@ class MeetingNotesAggregator(BaseTool):
                     with open(f_path, 'r', encoding='utf-8') as file:
                         aggregated_text += f"\n--- File: {f} ---\n{file.read()}"
                 elif f.endswith('.pdf'):
-                    reader = PdfReader(f_path)
-                    text = ""
-                    for page in reader.pages[:5]: text += page.extract_text()
+                    # 只取前 5 页：已解析过的按页偏移读取，否则只解析这 5 页，不整本解析入库
+                    pages = paged_pdf_reader.read_pages(f_path, list(range(1, 6)))
+                    text = "".join(page.text for page in pages)
                     aggregated_text += f"\n--- File: {f} ---\n{text}"
             return aggregated_text[:10000]
         except Exception as e:
@@ -263,7 +311,7 @@ class RAGSearchTool(BaseTool):
 
     def _run(self, query: str) -> str:
         try:
-            evidence = kb_manager.query_knowledge(query, n_results=5)
+            evidence = get_kb_manager().query_knowledge(query, n_results=5)
             instruction = """
             【重要指令】：
             使用上述信息回答时，必须在句尾标注来源，格式为 [来源: 文件名]。
@@ -276,6 +324,44 @@ class RAGSearchTool(BaseTool):
             return f"Error querying knowledge base: {str(e)}"
 
 
+class TableLookupTool(BaseTool):
+    name: str = "Lookup Financial Table Figures"
+    description: str = (
+        "Exact lookup of numeric figures from tables in ingested local reports. "
+        "Input: metric and optional year / file keyword, e.g. '营收 2023' or '毛利率 2024 比亚迪'. "
+        "Amounts are normalized to 元 (displayed as 亿元/万元); percentages as %."
+    )
+
+    def _run(self, query: str) -> str:
+        try:
+            tokens = query.replace("，", " ").replace(",", " ").split()
+            year = None
+            rest = []
+            for token in tokens:
+                match = re.fullmatch(r"((?:19|20)\d{2})年?", token)
+                if match and year is None:
+                    year = int(match.group(1))
+                else:
+                    rest.append(token)
+            if not rest:
+                return "Please provide a metric name, e.g. '营收 2023'."
+
+            metric, source = rest[0], " ".join(rest[1:]) or None
+            rows = table_index.lookup(metric, year=year, source=source, limit=20)
+            if not rows:
+                return f"No table figures found for '{query}'. Try Search Local Knowledge Base instead."
+
+            lines = [f"【表格数值】{metric}" + (f" {year}" if year else "")]
+            for row in rows:
+                lines.append(
+                    f"- {row['row_label']} | {row['col_label']} | {table_index.format_value(row)} "
+                    f"(原文: {row['raw']}) [来源: {row['source']} 第{row['page']}页]"
+                )
+            return "\n".join(lines)
+        except Exception as e:
+            return f"Table lookup failed: {str(e)}"
+
+
 # ============================================================
 # 新增工具：产业链专项搜索
 # 建议将 serper_tool 作为类属性，或者在 _run 里面调用全局的 serper_tool 时加锁（Python GIL通常没事，但为了规范）
@@ -285,8 +371,6 @@ class SupplyChainSearchTool(BaseTool):
     description: str = "Search for supply chain information of a specific industry. Input: industry name (e.g., '半导体', '新能源汽车'). Returns upstream, midstream, downstream analysis."
 
     def _run(self, industry: str) -> str:
-        # 为了安全，这里可以引用全局的 serper_tool，但要确保它已初始化
-        from agent_system.tools.tools_custom import serper_tool 
         try:
             industry = industry.strip()
             
@@ -302,7 +386,7 @@ class SupplyChainSearchTool(BaseTool):
             all_results = []
             for query in queries:
                 try:
-                    result = serper_tool.run(query)
+                    result = registered_search(query, "supply_chain", self.name)
                     all_results.append(f"【查询: {query}】\n{result}\n")
                 except:
                     continue
@@ -344,7 +428,7 @@ class PolicySearchTool(BaseTool):
             all_results = []
             for q in queries:
                 try:
-                    result = serper_tool.run(q)
+                    result = registered_search(q, "policy", self.name)
                     all_results.append(f"【查询: {q}】\n{result}\n")
                 except:
                     continue
@@ -383,7 +467,7 @@ class MarketSizeSearchTool(BaseTool):
             all_results = []
             for q in queries:
                 try:
-                    result = serper_tool.run(q)
+                    result = registered_search(q, "market", self.name)
                     all_results.append(f"【查询: {q}】\n{result}\n")
                 except:
                     continue
@@ -424,7 +508,7 @@ class CompanySearchTool(BaseTool):
             all_results = []
             for q in queries:
                 try:
-                    result = serper_tool.run(q)
+                    result = registered_search(q, "company", self.name)
                     all_results.append(f"【查询: {q}】\n{result}\n")
                 except:
                     continue
@@ -461,7 +545,7 @@ class BusinessModelSearchTool(BaseTool):
             all_results = []
             for q in queries:
                 try:
-                    result = serper_tool.run(q)
+                    result = registered_search(q, "business_model", self.name)
                     all_results.append(f"【查询: {q}】\n{result}\n")
                 except:
                     continue
@@ -480,6 +564,7 @@ class BusinessModelSearchTool(BaseTool):
 
 # 实例化工具
 rag_tool = RAGSearchTool()
+table_lookup = TableLookupTool()
 stock_analysis = StockAnalysisTool()
 read_pdf = PDFReadTool()
 calc_tool = FinancialCalculatorTool()
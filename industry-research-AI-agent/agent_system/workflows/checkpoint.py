@@ -0,0 +1,207 @@
+# agent_system/workflows/checkpoint.py
+"""
+工作流阶段检查点
+每个阶段完成后立即落盘，失败的运行可按 run_id 断点续跑
+
+目录结构：
+    output/runs/<run_id>/
+        manifest.json        # 运行输入、输入哈希、各阶段状态、附加状态
+        phase_<name>.json    # 各阶段输出
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+# ===============================
+# 运行目录（项目根目录 output/runs 下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
+RUNS_DIR = os.getenv("RUNS_DIR", os.path.join(PROJECT_ROOT, "output", "runs"))
+
+
+def hash_inputs(inputs: Dict[str, Any]) -> str:
+    """计算运行输入的稳定哈希（键排序后序列化）"""
+    raw = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class RunCheckpoint:
+    """
+    单次运行的检查点
+    线程安全：并发阶段可同时写入各自的输出
+    """
+
+    def __init__(self, workflow: str, inputs: Dict[str, Any],
+                 run_id: str = None, base_dir: str = RUNS_DIR):
+        """
+        创建或打开检查点
+
+        Args:
+            workflow: 工作流名称（如 "v3"、"unified"）
+            inputs: 运行输入（用于校验续跑时输入一致）
+            run_id: 运行ID；已存在时打开并校验输入哈希
+            base_dir: 运行目录根路径
+        """
+        self.workflow = workflow
+        self.inputs = inputs
+        self.inputs_hash = hash_inputs(inputs)
+        self.run_id = run_id or self._new_run_id()
+        self.run_dir = os.path.join(base_dir, self.run_id)
+        self._lock = threading.Lock()
+
+        manifest = self._read_manifest(self.run_dir)
+        if manifest is None:
+            self.manifest = {
+                "run_id": self.run_id,
+                "workflow": workflow,
+                "inputs": inputs,
+                "inputs_hash": self.inputs_hash,
+                "status": "running",
+                "created_at": _now(),
+                "updated_at": _now(),
+                "phases": {},
+                "state": {}
+            }
+            os.makedirs(self.run_dir, exist_ok=True)
+            self._write_manifest()
+        else:
+            if manifest.get("inputs_hash") != self.inputs_hash:
+                raise ValueError(
+                    f"运行 {self.run_id} 的输入与检查点不一致，无法续跑"
+                    f"（{manifest.get('inputs_hash')} != {self.inputs_hash}）"
+                )
+            self.manifest = manifest
+            self.manifest["status"] = "running"
+            self._write_manifest()
+
+    def _new_run_id(self) -> str:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{self.workflow}_{stamp}_{self.inputs_hash[:6]}_{uuid.uuid4().hex[:4]}"
+
+    # ------------------ manifest ------------------
+
+    @staticmethod
+    def _read_manifest(run_dir: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(run_dir, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, filename: str, data: Any):
+        """原子写入，进程中断时不会留下半个文件"""
+        path = os.path.join(self.run_dir, filename)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def _write_manifest(self):
+        self.manifest["updated_at"] = _now()
+        self._write_json("manifest.json", self.manifest)
+
+    @classmethod
+    def load_manifest(cls, run_id: str, base_dir: str = RUNS_DIR) -> Dict[str, Any]:
+        """
+        读取已有运行的 manifest
+
+        Raises:
+            FileNotFoundError: run_id 不存在
+        """
+        manifest = cls._read_manifest(os.path.join(base_dir, run_id))
+        if manifest is None:
+            raise FileNotFoundError(f"未找到运行检查点: {run_id}")
+        return manifest
+
+    # ------------------ 阶段读写 ------------------
+
+    def save_phase(self, name: str, output: Any):
+        """保存阶段输出并标记完成"""
+        with self._lock:
+            filename = f"phase_{name}.json"
+            self._write_json(filename, {"phase": name, "output": output})
+            self.manifest["phases"][name] = {
+                "status": "done",
+                "file": filename,
+                "saved_at": _now()
+            }
+            self._write_manifest()
+
+    def mark_failed(self, name: str, error: str):
+        """标记阶段失败"""
+        with self._lock:
+            self.manifest["phases"][name] = {
+                "status": "failed",
+                "error": error,
+                "saved_at": _now()
+            }
+            self.manifest["status"] = "failed"
+            self._write_manifest()
+
+    def completed_phases(self) -> List[str]:
+        """已完成的阶段列表"""
+        return [name for name, info in self.manifest["phases"].items()
+                if info.get("status") == "done"]
+
+    def load_completed(self) -> Dict[str, Any]:
+        """读取所有已完成阶段的输出（阶段名 -> 输出）"""
+        results = {}
+        for name in self.completed_phases():
+            path = os.path.join(self.run_dir, self.manifest["phases"][name]["file"])
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    results[name] = json.load(f)["output"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ [Checkpoint] 阶段 {name} 输出读取失败，将重新执行: {e}")
+        return results
+
+    # ------------------ 附加状态 ------------------
+
+    def save_state(self, **state):
+        """保存阶段之外的工作流状态（如重点公司列表）"""
+        with self._lock:
+            self.manifest["state"].update(state)
+            self._write_manifest()
+
+    def get_state(self, key: str, default: Any = None) -> Any:
+        return self.manifest["state"].get(key, default)
+
+    def mark_status(self, status: str):
+        """更新运行状态：running | failed | completed"""
+        with self._lock:
+            self.manifest["status"] = status
+            self._write_manifest()
+
+
+def list_runs(base_dir: str = RUNS_DIR, workflow: str = None) -> List[Dict[str, Any]]:
+    """列出已有运行（按创建时间倒序）"""
+    if not os.path.isdir(base_dir):
+        return []
+
+    runs = []
+    for run_id in os.listdir(base_dir):
+        manifest = RunCheckpoint._read_manifest(os.path.join(base_dir, run_id))
+        if manifest is None:
+            continue
+        if workflow and manifest.get("workflow") != workflow:
+            continue
+        runs.append({
+            "run_id": run_id,
+            "workflow": manifest.get("workflow"),
+            "status": manifest.get("status"),
+            "created_at": manifest.get("created_at"),
+            "completed_phases": [n for n, p in manifest.get("phases", {}).items()
+                                 if p.get("status") == "done"]
+        })
+    return sorted(runs, key=lambda r: r["created_at"] or "", reverse=True)
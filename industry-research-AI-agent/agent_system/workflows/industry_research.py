@@ -54,8 +54,9 @@ from agent_system.postprocess.reviewer_parser import parse_reviewer_output
 from agent_system.tools.tools_custom import (
     stock_analysis,
     read_pdf,
-    serper_tool,
+    get_serper_tool,
     rag_tool,
+    table_lookup,
     recall_tool,
     supply_chain_search,
     policy_search,
@@ -64,7 +65,8 @@ from agent_system.tools.tools_custom import (
     business_model_search
 )
 
-from memory_system.memory_manager import memory_manager
+from agent_system.tools.query_registry import start_query_session
+from memory_system.memory_manager import get_memory_manager
 from agent_system.utils.report_replace import replace_chapter
 
 # ============================================================
@@ -115,6 +117,9 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     print(f"🚀 开始行业研究：{inputs.industry} | {inputs.province} | {inputs.target_year}")
     print(f"📋 研究侧重点：{inputs.focus}")
 
+    # 开启本次运行独立的查询注册表（各研究员工具共享同一批查询结果）
+    query_registry = start_query_session()
+
     # ============================================================
     # Phase 0: 定义 Agents
     # ============================================================
@@ -133,6 +138,9 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
         verbose=True
     )
 
+    # 搜索工具（首次使用时创建）
+    serper_tool = get_serper_tool()
+
     # 研究员 Agent（通用）
     researcher = Agent(
         role="Senior Industry Data Researcher",
@@ -149,7 +157,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
         ),
         tools=[
                stock_analysis, serper_tool, read_pdf, 
-               rag_tool, recall_tool,
+               rag_tool, table_lookup, recall_tool,
                policy_search, market_size_search, company_search,      
                business_model_search
               ],
@@ -188,7 +196,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
             "你特别擅长从产业链视角分析投资机会。"
             "你能够整合六大维度数据，形成投资决策建议。"
         ),
-        tools=[rag_tool, recall_tool],
+        tools=[rag_tool, table_lookup, recall_tool],
         llm=llm,
         verbose=True,
         max_iter=5,
@@ -318,7 +326,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     research_structs = [parse_researcher_output(str(research_result))]
 
     # 存入长期记忆
-    memory_manager.save_insight(
+    get_memory_manager().save_insight(
         content=str(research_result),
         category="fact",
         metadata={
@@ -361,7 +369,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     analysis_struct = parse_analyst_output(str(analysis_raw))
 
     # 存入记忆
-    memory_manager.save_insight(
+    get_memory_manager().save_insight(
         content=str(analysis_raw),
         category="conclusion",
         metadata={
@@ -458,7 +466,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
     draft_report = str(writer_crew.kickoff())
 
     # 存入记忆
-    memory_manager.save_insight(
+    get_memory_manager().save_insight(
         content=draft_report,
         category="report_segment",
         metadata={
@@ -642,5 +650,7 @@ def run_industry_research(inputs: Dict | IndustryResearchInput) -> str:
 
     print(f"\n✅ 行业研究报告已生成：{file_path}")
     print(f"📊 报告字数：约 {len(final_report_content)} 字符")
+    search_stats = query_registry.get_stats()
+    print(f"🔎 搜索查询：计划 {search_stats['planned']} 条 | 实际发出 {search_stats['issued']} 条")
 
     return final_report_content
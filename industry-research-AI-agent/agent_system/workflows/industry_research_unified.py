@@ -19,6 +19,7 @@ if project_root not in sys.path:
 # CrewAI导入
 try:
     from crewai import Agent, Task, Crew, Process
+    from config.llm import get_guarded_llm, AGENT_DEFAULT_MODEL
     HAS_CREWAI = True
 except ImportError:
     HAS_CREWAI = False
@@ -32,6 +33,8 @@ from agent_system.prompts.writer_prompt import get_writer_prompt
 from agent_system.prompts.reviewer_prompt import get_reviewer_prompt
 from agent_system.postprocess.reviewer_parser import parse_reviewer_response
 from agent_system.tools.tools_custom import get_research_tools
+from agent_system.tools.query_registry import start_query_session
+from agent_system.workflows.checkpoint import RunCheckpoint
 
 # 新增模块导入
 try:
@@ -73,7 +76,9 @@ class UnifiedResearchWorkflow:
         enable_pe_analysis: bool = True,
         enable_charts: bool = True,
         max_revisions: int = 2,
-        log_callback=None
+        log_callback=None,
+        enable_checkpoint: bool = True,
+        run_id: str = None
     ):
         """
         初始化工作流
@@ -88,6 +93,8 @@ class UnifiedResearchWorkflow:
             enable_charts: 是否生成图表
             max_revisions: 最大修订次数
             log_callback: 日志回调函数
+            enable_checkpoint: 是否将各阶段输出落盘（支持断点续跑）
+            run_id: 运行ID；传入已有ID时跳过已完成的阶段
         """
         self.industry = industry
         self.province = province
@@ -99,6 +106,9 @@ class UnifiedResearchWorkflow:
         self.max_revisions = max_revisions
         self.log_callback = log_callback
         
+        # 共享的受控 LLM：全局并发上限、连接池、退避重试（config.llm）
+        self.llm = get_guarded_llm(AGENT_DEFAULT_MODEL) if HAS_CREWAI else None
+        
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         if self.enable_charts:
@@ -116,6 +126,40 @@ class UnifiedResearchWorkflow:
         self.generated_charts = []
         self.final_report = ""
         self.pe_score = None
+        
+        # 阶段检查点
+        self.checkpoint = None
+        self._completed_phases: Dict[str, Any] = {}
+        if enable_checkpoint:
+            self.checkpoint = RunCheckpoint("unified", {
+                "industry": industry,
+                "province": province,
+                "target_year": target_year,
+                "focus": focus,
+                "output_dir": output_dir,
+                "enable_pe_analysis": enable_pe_analysis,
+                "enable_charts": enable_charts,
+                "max_revisions": max_revisions
+            }, run_id=run_id)
+            self._completed_phases = self.checkpoint.load_completed()
+    
+    @classmethod
+    def resume(cls, run_id: str, log_callback=None) -> Dict[str, Any]:
+        """
+        断点续跑：以原输入重建工作流，已完成的阶段直接读取检查点
+        
+        Args:
+            run_id: 失败运行的ID（见结果中的 run_id）
+            log_callback: 日志回调函数
+        
+        Returns:
+            包含研报和元数据的字典
+        """
+        manifest = RunCheckpoint.load_manifest(run_id)
+        if manifest.get("workflow") != "unified":
+            raise ValueError(f"运行 {run_id} 不是统一工作流的检查点")
+        workflow = cls(**manifest["inputs"], log_callback=log_callback, run_id=run_id)
+        return workflow.run()
     
     def log(self, message: str, level: str = "INFO"):
         """记录日志"""
@@ -125,6 +169,23 @@ class UnifiedResearchWorkflow:
         if self.log_callback:
             self.log_callback(log_message)
     
+    def _checkpointed(self, name: str, func, *args):
+        """执行阶段；检查点中已有输出时直接复用，否则执行后落盘"""
+        if name in self._completed_phases:
+            self.log(f"  ⏭️ 复用检查点: {name}")
+            return self._completed_phases[name]
+        
+        try:
+            output = func(*args)
+        except Exception as e:
+            if self.checkpoint:
+                self.checkpoint.mark_failed(name, str(e))
+            raise
+        
+        if self.checkpoint:
+            self.checkpoint.save_phase(name, output)
+        return output
+    
     def run(self) -> Dict[str, Any]:
         """
         运行完整工作流
@@ -136,27 +197,36 @@ class UnifiedResearchWorkflow:
         self.log(f"PE级分析: {'启用' if self.enable_pe_analysis else '禁用'}")
         self.log(f"图表生成: {'启用' if self.enable_charts else '禁用'}")
         
+        if self.checkpoint:
+            self.log(f"运行ID: {self.checkpoint.run_id}")
+            if self._completed_phases:
+                self.log(f"续跑，已完成阶段: {', '.join(self._completed_phases)}")
+        
+        # 开启本次运行独立的查询注册表（会话级查询去重）
+        self.query_registry = start_query_session()
+        
         try:
             # Phase 1: 规划
             self.log("Phase 1: 制定研究计划...")
-            research_plan = self._phase_planning()
+            research_plan = self._checkpointed("planning", self._phase_planning)
             
             # Phase 2: 数据收集
             self.log("Phase 2: 收集行业数据...")
-            research_data = self._phase_research(research_plan)
+            research_data = self._checkpointed("research", self._phase_research, research_plan)
+            self.research_data['raw'] = research_data
             
-            # Phase 3: 自动公司发现
+            # Phase 3: 自动公司发现（规则抽取，续跑时直接重算）
             self.log("Phase 3: 自动发现产业链公司...")
             self._phase_company_discovery(research_data)
             
             # Phase 4: 数据分析
             self.log("Phase 4: 深度数据分析...")
-            analysis_result = self._phase_analysis(research_data)
+            analysis_result = self._checkpointed("analysis", self._phase_analysis, research_data)
             
             # Phase 5: PE级深度分析（如果启用）
             if self.enable_pe_analysis and self.discovered_companies:
                 self.log("Phase 5: PE级标的深拆分析...")
-                pe_analysis = self._phase_pe_analysis()
+                pe_analysis = self._checkpointed("pe_analysis", self._phase_pe_analysis)
                 analysis_result = self._merge_pe_analysis(analysis_result, pe_analysis)
             
             # Phase 6: 生成图表（如果启用）
@@ -166,11 +236,12 @@ class UnifiedResearchWorkflow:
             
             # Phase 7: 撰写报告
             self.log("Phase 7: 撰写研究报告...")
-            draft_report = self._phase_writing(research_data, analysis_result)
+            draft_report = self._checkpointed("writing", self._phase_writing, research_data, analysis_result)
             
             # Phase 8: 审核与修订
             self.log("Phase 8: 审核与修订...")
-            final_report = self._phase_review_and_revise(draft_report)
+            final_report = self._checkpointed("review", self._phase_review_and_revise, draft_report)
+            self.final_report = final_report
             
             # Phase 9: PE评分（如果启用）
             if self.enable_pe_analysis:
@@ -181,7 +252,11 @@ class UnifiedResearchWorkflow:
             self.log("Phase 10: 保存最终报告...")
             output_path = self._save_report(final_report)
             
+            if self.checkpoint:
+                self.checkpoint.mark_status("completed")
             self.log(f"✅ 报告生成完成: {output_path}")
+            search_stats = self.query_registry.get_stats()
+            self.log(f"搜索查询: 计划 {search_stats['planned']} 条 | 实际发出 {search_stats['issued']} 条")
             
             return {
                 "success": True,
@@ -190,6 +265,8 @@ class UnifiedResearchWorkflow:
                 "charts": self.generated_charts,
                 "discovered_companies": [c.name for c in self.discovered_companies],
                 "pe_score": self.pe_score,
+                "search_stats": search_stats,
+                "run_id": self.checkpoint.run_id if self.checkpoint else None,
                 "metadata": {
                     "industry": self.industry,
                     "province": self.province,
@@ -202,9 +279,12 @@ class UnifiedResearchWorkflow:
             self.log(f"❌ 报告生成失败: {str(e)}", "ERROR")
             import traceback
             traceback.print_exc()
+            if self.checkpoint:
+                self.checkpoint.mark_status("failed")
             return {
                 "success": False,
                 "error": str(e),
+                "run_id": self.checkpoint.run_id if self.checkpoint else None,
                 "report": self.final_report or ""
             }
     
@@ -231,6 +311,7 @@ class UnifiedResearchWorkflow:
             role="行业研究规划师",
             goal=f"制定{self.industry}行业研究计划",
             backstory="资深行业研究专家，擅长制定系统性研究框架",
+            llm=self.llm,
             verbose=True
         )
         
@@ -264,6 +345,7 @@ class UnifiedResearchWorkflow:
             goal=f"收集{self.province}{self.industry}行业全面数据",
             backstory="专业行业研究员，擅长多渠道数据收集",
             tools=tools,
+            llm=self.llm,
             verbose=True
         )
         
@@ -331,6 +413,7 @@ class UnifiedResearchWorkflow:
             role="行业分析师",
             goal=f"深度分析{self.industry}行业数据",
             backstory="资深行业分析师，擅长数据分析和趋势预测",
+            llm=self.llm,
             verbose=True
         )
         
@@ -487,6 +570,7 @@ class UnifiedResearchWorkflow:
             role="研报撰写专家",
             goal=f"撰写专业的{self.industry}行业研究报告",
             backstory="资深研报撰写专家，擅长将数据转化为投资洞察",
+            llm=self.llm,
             verbose=True
         )
         
@@ -517,6 +601,7 @@ class UnifiedResearchWorkflow:
                     role="研报审核专家",
                     goal="审核研报质量并提出改进建议",
                     backstory="资深研报审核专家，确保报告质量达标",
+                    llm=self.llm,
                     verbose=True
                 )
                 
@@ -568,6 +653,7 @@ class UnifiedResearchWorkflow:
             role="研报修订专家",
             goal="根据审核意见修订报告",
             backstory="专业研报修订专家",
+            llm=self.llm,
             verbose=True
         )
         
@@ -832,6 +918,20 @@ def run_industry_research_unified(
     return workflow.run()
 
 
+def resume_industry_research_unified(run_id: str, log_callback=None) -> Dict[str, Any]:
+    """
+    续跑失败的统一行业研究
+    
+    Args:
+        run_id: 失败运行的ID
+        log_callback: 日志回调函数
+    
+    Returns:
+        包含研报和元数据的字典
+    """
+    return UnifiedResearchWorkflow.resume(run_id, log_callback=log_callback)
+
+
 if __name__ == "__main__":
     # 测试
     result = run_industry_research_unified(
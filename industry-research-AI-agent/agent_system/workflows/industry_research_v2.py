@@ -17,7 +17,7 @@ from typing import Dict, List, Optional, Any
 
 # CrewAI核心
 from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
+from config.llm import get_guarded_llm
 
 # 自定义模块
 from agent_system.prompts.planner_prompt import get_planner_prompt
@@ -39,6 +39,7 @@ from agent_system.tools.enhanced_search import (
     investment_search,
     code_executor_tool
 )
+from agent_system.tools.query_registry import start_query_session
 from agent_system.postprocess.reviewer_parser import parse_reviewer_output
 
 # 记忆系统
@@ -49,9 +50,9 @@ except ImportError:
     fact_validation = None
 
 try:
-    from memory_system.memory_manager import memory_manager
+    from memory_system.memory_manager import get_memory_manager
 except ImportError:
-    memory_manager = None
+    get_memory_manager = None
 
 
 class IndustryResearchWorkflowV2:
@@ -69,9 +70,12 @@ class IndustryResearchWorkflowV2:
             verbose: 是否输出详细日志
         """
         self.model_name = model_name
+        # 共享的受控 LLM：全局并发上限、连接池、退避重试（config.llm）
+        self.llm = get_guarded_llm(model_name)
         self.verbose = verbose
         
-        # 初始化基础搜索工具
+        # 初始化基础搜索工具（crewai_tools 导入较重，构造工作流时才加载）
+        from crewai_tools import SerperDevTool
         self.search_tool = SerperDevTool(n_results=8)
         
         # 增强搜索工具集
@@ -132,6 +136,9 @@ class IndustryResearchWorkflowV2:
             year=target_year
         )
         
+        # 开启本次运行独立的查询注册表（会话级查询去重）
+        self.query_registry = start_query_session()
+        
         try:
             # Phase 1: 规划
             print("\n📋 Phase 1: 研究规划")
@@ -174,6 +181,8 @@ class IndustryResearchWorkflowV2:
             print(f"✅ 研究完成!")
             print(f"   报告路径: {output_path}")
             print(f"   数据覆盖率: {quality_score:.1%}")
+            search_stats = self.query_registry.get_stats()
+            print(f"   搜索查询: 计划 {search_stats['planned']} 条 | 实际发出 {search_stats['issued']} 条")
             print(f"{'='*60}\n")
             
             return {
@@ -181,6 +190,7 @@ class IndustryResearchWorkflowV2:
                 "report": final_report,
                 "output_path": output_path,
                 "quality_score": quality_score,
+                "search_stats": search_stats,
                 "iterations": self.state["iteration"]
             }
         
@@ -201,9 +211,9 @@ class IndustryResearchWorkflowV2:
         
         # 获取历史研究建议
         suggestions = ""
-        if memory_manager:
+        if get_memory_manager:
             try:
-                context = memory_manager.get_industry_context(industry, province)
+                context = get_memory_manager().get_industry_context(industry, province)
                 if context:
                     suggestions = f"\n\n【历史研究经验】\n{context}"
             except:
@@ -213,7 +223,7 @@ class IndustryResearchWorkflowV2:
             role="研究规划师",
             goal=f"为{province}{industry}行业研究制定详细的研究计划",
             backstory=get_planner_prompt(),
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -265,7 +275,7 @@ class IndustryResearchWorkflowV2:
             goal=f"收集{province}{industry}行业的全面数据",
             backstory=get_researcher_prompt(),
             tools=self.enhanced_tools,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -426,7 +436,7 @@ class IndustryResearchWorkflowV2:
             goal=f"对{province}{industry}行业进行深度分析",
             backstory=get_analyst_prompt(),
             tools=[code_executor_tool],  # 分析师可以使用代码执行器
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -493,7 +503,7 @@ class IndustryResearchWorkflowV2:
             role="资深研究报告撰写专家",
             goal=f"撰写{province}{industry}行业研究报告",
             backstory=get_writer_prompt(),
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -570,7 +580,7 @@ class IndustryResearchWorkflowV2:
                 role="研究报告审核专家",
                 goal="审核研究报告的质量和准确性",
                 backstory=get_reviewer_prompt(),
-                llm=self.model_name,
+                llm=self.llm,
                 verbose=self.verbose
             )
             
@@ -640,7 +650,7 @@ REVISION_SUGGESTIONS: 修改建议（如有）
             role="研究报告修订专家",
             goal="根据审核意见修订报告",
             backstory="你是一位经验丰富的研究报告修订专家，擅长根据审核意见改进报告质量。",
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
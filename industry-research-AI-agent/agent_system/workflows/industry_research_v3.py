@@ -15,11 +15,12 @@
 import os
 import re
 import datetime
+import threading
 from typing import Dict, List, Optional, Any
 
 # CrewAI核心
 from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
+from config.llm import get_guarded_llm
 
 # 基础Prompt
 from agent_system.prompts.planner_prompt import get_planner_prompt
@@ -41,7 +42,10 @@ from agent_system.tools.enhanced_search import (
     investment_search,
     code_executor_tool
 )
+from agent_system.tools.query_registry import start_query_session
 from agent_system.postprocess.reviewer_parser import parse_reviewer_output
+from agent_system.workflows.phase_scheduler import PhaseSpec, PhaseScheduler
+from agent_system.workflows.checkpoint import RunCheckpoint
 
 # V3.0 PE级专业模块
 from agent_system.professional.data_anchoring import (
@@ -82,9 +86,9 @@ except ImportError:
     fact_validation = None
 
 try:
-    from memory_system.memory_manager import memory_manager
+    from memory_system.memory_manager import get_memory_manager
 except ImportError:
-    memory_manager = None
+    get_memory_manager = None
 
 
 class IndustryResearchWorkflowV3:
@@ -93,18 +97,35 @@ class IndustryResearchWorkflowV3:
     生成符合头部PE/一线券商首席级标准的深度研报
     """
     
-    def __init__(self, model_name: str = "gpt-4o-mini", verbose: bool = True):
+    def __init__(self, model_name: str = "gpt-4o-mini", verbose: bool = True,
+                 parallel_phases: bool = True, max_parallel_phases: int = 3,
+                 enable_checkpoint: bool = True):
         """
         初始化工作流
         
         Args:
             model_name: LLM模型名称
             verbose: 是否输出详细日志
+            parallel_phases: 是否并发执行互不依赖的阶段
+            max_parallel_phases: 最大并发阶段数
+            enable_checkpoint: 是否将各阶段输出落盘（支持断点续跑）
         """
         self.model_name = model_name
+        # 共享的受控 LLM：全局并发上限、连接池、退避重试（config.llm）
+        self.llm = get_guarded_llm(model_name)
         self.verbose = verbose
+        self.parallel_phases = parallel_phases
+        self.max_parallel_phases = max_parallel_phases
+        self.enable_checkpoint = enable_checkpoint
         
-        # 初始化基础搜索工具
+        # 当前运行的检查点
+        self.checkpoint: Optional[RunCheckpoint] = None
+        
+        # 各阶段耗时记录
+        self.phase_timings: List[Dict[str, Any]] = []
+        
+        # 初始化基础搜索工具（crewai_tools 导入较重，构造工作流时才加载）
+        from crewai_tools import SerperDevTool
         self.search_tool = SerperDevTool(n_results=10)
         
         # 增强搜索工具集
@@ -133,10 +154,13 @@ class IndustryResearchWorkflowV3:
         
         # 重点公司列表（用于标的深拆）
         self.key_companies = []
+        
+        # 并发阶段写 state / key_companies 时加锁
+        self._state_lock = threading.Lock()
     
     def run(self, industry: str, province: str, target_year: str = "2025",
             focus: str = "综合分析", max_revisions: int = 2,
-            key_companies: List[str] = None) -> Dict[str, Any]:
+            key_companies: List[str] = None, run_id: str = None) -> Dict[str, Any]:
         """
         运行PE级行业研究工作流
         
@@ -147,6 +171,7 @@ class IndustryResearchWorkflowV3:
             focus: 研究侧重点
             max_revisions: 最大修订次数
             key_companies: 重点分析的公司列表
+            run_id: 运行ID；传入已有ID时跳过已完成的阶段
         
         Returns:
             Dict: 研究结果
@@ -161,6 +186,24 @@ class IndustryResearchWorkflowV3:
         
         self.key_companies = key_companies or []
         
+        # 打开检查点（已有运行则恢复阶段间状态）
+        self.checkpoint = None
+        if self.enable_checkpoint:
+            self.checkpoint = RunCheckpoint("v3", {
+                "industry": industry,
+                "province": province,
+                "target_year": target_year,
+                "focus": focus,
+                "max_revisions": max_revisions,
+                "key_companies": self.key_companies
+            }, run_id=run_id)
+            self.key_companies = self.checkpoint.get_state("key_companies", self.key_companies)
+            self.state.update(self.checkpoint.get_state("workflow_state", {}))
+            completed = self.checkpoint.completed_phases()
+            print(f"💾 运行ID: {self.checkpoint.run_id}")
+            if completed:
+                print(f"   ⏭️ 续跑，已完成阶段: {', '.join(completed)}")
+        
         # 初始化全局上下文
         global_context_manager.init_context(industry, province, target_year, focus)
         
@@ -178,61 +221,13 @@ class IndustryResearchWorkflowV3:
             year=target_year
         )
         
+        # 开启本次运行独立的查询注册表（会话级查询去重）
+        self.query_registry = start_query_session()
+        
         try:
-            # Phase 1: 规划
-            print("\n📋 Phase 1: 研究规划（PE级）")
-            plan = self._phase_planning_pe(industry, province, target_year, focus)
-            
-            # Phase 2: 研究（锚定型数据）
-            print("\n🔍 Phase 2: 数据研究（锚定型）")
-            research_data = self._phase_research_anchored(
-                industry, province, target_year, focus, plan
-            )
-            
-            # Phase 3: 标的深拆
-            print("\n🏢 Phase 3: 标的深拆")
-            company_analysis = self._phase_company_deep_dive(
-                industry, province, target_year, research_data
-            )
-            
-            # Phase 4: 深度分析
-            print("\n📊 Phase 4: 深度分析")
-            analysis = self._phase_analysis_pe(
-                industry, province, target_year, focus, research_data, company_analysis
-            )
-            
-            # Phase 5: 估值与回报
-            print("\n💰 Phase 5: 估值与回报分析")
-            valuation_analysis = self._phase_valuation(
-                industry, province, target_year, company_analysis
-            )
-            
-            # Phase 6: 微观风险
-            print("\n⚠️ Phase 6: 微观风险分析")
-            risk_analysis = self._phase_micro_risk(
-                industry, province, target_year
-            )
-            
-            # Phase 7: 反共识观点
-            print("\n💡 Phase 7: 反共识观点")
-            contrarian_section = self._phase_contrarian_views(
-                industry, province, target_year
-            )
-            
-            # Phase 8: 报告撰写
-            print("\n✍️ Phase 8: 报告撰写（PE级）")
-            report = self._phase_writing_pe(
-                industry, province, target_year, focus,
-                research_data, company_analysis, analysis,
-                valuation_analysis, risk_analysis, contrarian_section
-            )
-            
-            # Phase 9: 审核与修订
-            print("\n🔄 Phase 9: 审核与修订")
-            final_report = self._phase_review_and_revise_pe(
-                industry, province, target_year, focus,
-                report, research_data, analysis, max_revisions
-            )
+            # Phase 1-9: 按依赖图调度（微观风险、反共识不依赖研究产出，可与主线并发）
+            results = self._run_phases(industry, province, target_year, focus, max_revisions)
+            final_report = results["review"]
             
             # Phase 10: PE级质量评估
             print("\n📈 Phase 10: PE级质量评估")
@@ -269,6 +264,10 @@ class IndustryResearchWorkflowV3:
             print(f"   报告路径: {output_path}")
             print(f"   评分报告: {scorecard_path}")
             print(f"   数据覆盖率: {quality_score:.1%}")
+            if self.checkpoint:
+                self.checkpoint.mark_status("completed")
+            search_stats = self.query_registry.get_stats()
+            print(f"   搜索查询: 计划 {search_stats['planned']} 条 | 实际发出 {search_stats['issued']} 条")
             print(f"   PE级评分: {scorecard.overall_score:.1f}/100 ({scorecard.report_level.value})")
             print(f"{'='*70}\n")
             
@@ -278,8 +277,11 @@ class IndustryResearchWorkflowV3:
                 "output_path": output_path,
                 "scorecard_path": scorecard_path,
                 "quality_score": quality_score,
+                "search_stats": search_stats,
                 "pe_score": scorecard.overall_score,
                 "report_level": scorecard.report_level.value,
+                "phase_timings": self.phase_timings,
+                "run_id": self.checkpoint.run_id if self.checkpoint else None,
                 "iterations": self.state["iteration"]
             }
         
@@ -287,22 +289,148 @@ class IndustryResearchWorkflowV3:
             print(f"\n❌ 研究过程出错: {e}")
             import traceback
             traceback.print_exc()
+            if self.checkpoint:
+                self.checkpoint.mark_status("failed")
             
             return {
                 "success": False,
                 "error": str(e),
+                "phase_timings": self.phase_timings,
+                "run_id": self.checkpoint.run_id if self.checkpoint else None,
                 "iterations": self.state["iteration"]
             }
     
+    def resume(self, run_id: str) -> Dict[str, Any]:
+        """
+        断点续跑：以原输入重新运行，已完成的阶段直接读取检查点
+        
+        Args:
+            run_id: 失败运行的ID（见结果中的 run_id）
+        
+        Returns:
+            Dict: 研究结果
+        """
+        manifest = RunCheckpoint.load_manifest(run_id)
+        if manifest.get("workflow") != "v3":
+            raise ValueError(f"运行 {run_id} 不是 V3 工作流的检查点")
+        self.enable_checkpoint = True
+        return self.run(**manifest["inputs"], run_id=run_id)
+    
+    def _build_phase_graph(self, industry: str, province: str, target_year: str,
+                           focus: str, max_revisions: int) -> List[PhaseSpec]:
+        """
+        声明 Phase 1-9 的依赖图
+        列表顺序即串行模式下的执行顺序（与原流程一致）
+        """
+        return [
+            PhaseSpec(
+                name="planning",
+                title="📋 Phase 1: 研究规划（PE级）",
+                func=lambda r: self._phase_planning_pe(industry, province, target_year, focus)
+            ),
+            PhaseSpec(
+                name="research",
+                title="🔍 Phase 2: 数据研究（锚定型）",
+                deps=["planning"],
+                func=lambda r: self._phase_research_anchored(
+                    industry, province, target_year, focus, r["planning"]
+                )
+            ),
+            PhaseSpec(
+                name="company_analysis",
+                title="🏢 Phase 3: 标的深拆",
+                # 重点公司在规划阶段确定
+                deps=["planning", "research"],
+                func=lambda r: self._phase_company_deep_dive(
+                    industry, province, target_year, r["research"]
+                )
+            ),
+            PhaseSpec(
+                name="analysis",
+                title="📊 Phase 4: 深度分析",
+                deps=["research", "company_analysis"],
+                func=lambda r: self._phase_analysis_pe(
+                    industry, province, target_year, focus,
+                    r["research"], r["company_analysis"]
+                )
+            ),
+            PhaseSpec(
+                name="valuation",
+                title="💰 Phase 5: 估值与回报分析",
+                deps=["company_analysis"],
+                func=lambda r: self._phase_valuation(
+                    industry, province, target_year, r["company_analysis"]
+                )
+            ),
+            PhaseSpec(
+                name="micro_risk",
+                title="⚠️ Phase 6: 微观风险分析",
+                func=lambda r: self._phase_micro_risk(industry, province, target_year)
+            ),
+            PhaseSpec(
+                name="contrarian",
+                title="💡 Phase 7: 反共识观点",
+                func=lambda r: self._phase_contrarian_views(industry, province, target_year)
+            ),
+            PhaseSpec(
+                name="writing",
+                title="✍️ Phase 8: 报告撰写（PE级）",
+                deps=["research", "company_analysis", "analysis",
+                      "valuation", "micro_risk", "contrarian"],
+                func=lambda r: self._phase_writing_pe(
+                    industry, province, target_year, focus,
+                    r["research"], r["company_analysis"], r["analysis"],
+                    r["valuation"], r["micro_risk"], r["contrarian"]
+                )
+            ),
+            PhaseSpec(
+                name="review",
+                title="🔄 Phase 9: 审核与修订",
+                deps=["writing", "research", "analysis"],
+                func=lambda r: self._phase_review_and_revise_pe(
+                    industry, province, target_year, focus,
+                    r["writing"], r["research"], r["analysis"], max_revisions
+                )
+            ),
+        ]
+    
+    def _run_phases(self, industry: str, province: str, target_year: str,
+                    focus: str, max_revisions: int) -> Dict[str, Any]:
+        """执行 Phase 1-9 并记录各阶段耗时，已有检查点的阶段直接复用"""
+        checkpoint = self.checkpoint
+        scheduler = PhaseScheduler(
+            self._build_phase_graph(industry, province, target_year, focus, max_revisions),
+            max_workers=self.max_parallel_phases,
+            parallel=self.parallel_phases,
+            on_phase_done=self._save_phase_checkpoint if checkpoint else None,
+            on_phase_failed=(lambda name, e: checkpoint.mark_failed(name, str(e))) if checkpoint else None
+        )
+        try:
+            return scheduler.run(checkpoint.load_completed() if checkpoint else None)
+        finally:
+            self.phase_timings = scheduler.get_timings()
+            for timing in self.phase_timings:
+                if timing["status"] in ("done", "failed"):
+                    print(f"   ⏱️ {timing['name']}: {timing['duration']:.1f}s ({timing['status']})")
+    
+    def _save_phase_checkpoint(self, name: str, output: Any):
+        """阶段完成后落盘，同时保存规划/研究阶段写入的实例状态"""
+        self.checkpoint.save_phase(name, output)
+        if name in ("planning", "research"):
+            with self._state_lock:
+                key_companies = list(self.key_companies)
+                workflow_state = dict(self.state)
+            self.checkpoint.save_state(key_companies=key_companies, workflow_state=workflow_state)
+    
     def _phase_planning_pe(self, industry: str, province: str, 
                            target_year: str, focus: str) -> str:
         """Phase 1: PE级研究规划"""
         
         # 获取历史研究建议
         suggestions = ""
-        if memory_manager:
+        if get_memory_manager:
             try:
-                context = memory_manager.get_industry_context(industry, province)
+                context = get_memory_manager().get_industry_context(industry, province)
                 if context:
                     suggestions = f"\n\n【历史研究经验】\n{context}"
             except:
@@ -341,7 +469,7 @@ class IndustryResearchWorkflowV3:
             role="PE级研究规划师",
             goal=f"为{province}{industry}行业研究制定PE级专业研究计划",
             backstory=get_planner_prompt() + pe_planning_requirements,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -401,14 +529,15 @@ class IndustryResearchWorkflowV3:
         }
         
         # 如果用户没有指定，从计划中查找或使用默认
-        if not self.key_companies:
-            for company in common_companies.get(industry, []):
-                if company in plan:
-                    self.key_companies.append(company)
+        with self._state_lock:
+            if self.key_companies:
+                return
+            companies = [c for c in common_companies.get(industry, []) if c in plan]
             
             # 如果还是没有，使用默认
-            if not self.key_companies and industry in common_companies:
-                self.key_companies = common_companies[industry][:2]
+            if not companies and industry in common_companies:
+                companies = common_companies[industry][:2]
+            self.key_companies = companies
     
     def _phase_research_anchored(self, industry: str, province: str,
                                   target_year: str, focus: str, 
@@ -423,7 +552,7 @@ class IndustryResearchWorkflowV3:
             goal=f"收集{province}{industry}行业的锚定型数据",
             backstory=get_researcher_prompt() + "\n\n" + anchoring_prompt,
             tools=self.enhanced_tools,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -473,7 +602,8 @@ class IndustryResearchWorkflowV3:
         
         # 数据质量检查
         quality = data_quality_checker.check_coverage(research_data)
-        self.state["data_coverage"] = quality.total_score
+        with self._state_lock:
+            self.state["data_coverage"] = quality.total_score
         
         print(f"   ✓ 锚定型数据收集完成")
         print(f"   📊 数据覆盖率: {quality.total_score:.1%}")
@@ -499,7 +629,7 @@ class IndustryResearchWorkflowV3:
             goal=f"对{industry}行业重点公司进行深度拆解分析",
             backstory=company_prompt,
             tools=self.enhanced_tools,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -557,7 +687,7 @@ class IndustryResearchWorkflowV3:
             goal=f"对{province}{industry}行业进行PE级深度分析",
             backstory=get_analyst_prompt(),
             tools=[code_executor_tool],
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -630,7 +760,7 @@ class IndustryResearchWorkflowV3:
             goal=f"对{industry}行业重点公司进行估值与回报分析",
             backstory=valuation_prompt,
             tools=[code_executor_tool],
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -686,7 +816,7 @@ class IndustryResearchWorkflowV3:
             role="风险分析师",
             goal=f"对{province}{industry}行业进行项目级微观风险分析",
             backstory=risk_prompt,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -745,7 +875,7 @@ class IndustryResearchWorkflowV3:
             role="策略分析师",
             goal=f"对{province}{industry}行业提出反共识观点",
             backstory=contrarian_prompt,
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -803,7 +933,7 @@ class IndustryResearchWorkflowV3:
             role="PE级研究报告撰写专家",
             goal=f"撰写{province}{industry}行业PE级深度研究报告",
             backstory=get_writer_prompt(),
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -907,7 +1037,7 @@ class IndustryResearchWorkflowV3:
 4. 风险分析 - 是否有微观风险量化
 5. 反共识观点 - 是否有差异化判断
 """,
-                llm=self.model_name,
+                llm=self.llm,
                 verbose=self.verbose
             )
             
@@ -954,7 +1084,8 @@ REVISION_SUGGESTIONS: 修改建议
             
             if not review_result.get("need_revision", False):
                 print(f"   ✓ PE级审核通过")
-                self.state["quality_passed"] = True
+                with self._state_lock:
+                    self.state["quality_passed"] = True
                 break
             
             # 需要修订
@@ -980,7 +1111,7 @@ REVISION_SUGGESTIONS: 修改建议
             role="PE级研究报告修订专家",
             goal="根据PE级审核意见修订报告",
             backstory="你是一位经验丰富的PE级研究报告修订专家，擅长根据审核意见提升报告质量。",
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -1035,7 +1166,7 @@ REVISION_SUGGESTIONS: 修改建议
             role="研究报告补强专家",
             goal="根据评分补强研究报告",
             backstory="你是一位专业的研究报告补强专家，擅长针对性提升报告质量。",
-            llm=self.model_name,
+            llm=self.llm,
             verbose=self.verbose
         )
         
@@ -1135,3 +1266,19 @@ def run_industry_research_v3(industry: str, province: str,
         industry, province, target_year, focus, 
         max_revisions, key_companies
     )
+
+
+def resume_industry_research_v3(run_id: str,
+                                model_name: str = "gpt-4o-mini") -> Dict[str, Any]:
+    """
+    续跑失败的 V3 研究
+    
+    Args:
+        run_id: 失败运行的ID
+        model_name: LLM模型
+    
+    Returns:
+        Dict: 研究结果
+    """
+    workflow = IndustryResearchWorkflowV3(model_name=model_name)
+    return workflow.resume(run_id)
@@ -0,0 +1,177 @@
+# agent_system/workflows/phase_scheduler.py
+"""
+工作流阶段调度器
+以声明式依赖图描述各 Phase，无依赖关系的阶段并发执行
+
+核心功能：
+1. 依赖声明 - 每个阶段声明所需的上游阶段
+2. 并发执行 - 依赖满足即提交到线程池
+3. 耗时记录 - 记录每个阶段的开始/结束时间
+4. 完成回调 - 阶段完成/失败时通知（用于检查点落盘）
+"""
+
+import contextvars
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class PhaseSpec:
+    """阶段定义"""
+    name: str  # 阶段标识（同时作为结果键）
+    func: Callable[..., Any]  # 阶段函数，以上游结果字典为参数
+    deps: List[str] = field(default_factory=list)  # 依赖的上游阶段
+    title: str = ""  # 日志标题，如 "Phase 3: 标的深拆"
+
+
+@dataclass
+class PhaseTiming:
+    """阶段耗时记录"""
+    name: str
+    start: str = ""
+    end: str = ""
+    duration: float = 0.0
+    status: str = "pending"  # pending | running | done | failed | skipped
+    error: str = ""
+
+
+class PhaseScheduler:
+    """
+    阶段DAG调度器
+    阶段函数签名为 func(results: Dict[str, Any]) -> Any，
+    results 中只保证包含该阶段已声明依赖的输出
+    """
+
+    def __init__(self, phases: List[PhaseSpec], max_workers: int = 4,
+                 parallel: bool = True,
+                 on_phase_done: Optional[Callable[[str, Any], None]] = None,
+                 on_phase_failed: Optional[Callable[[str, Exception], None]] = None):
+        """
+        初始化调度器
+
+        Args:
+            phases: 阶段列表（顺序即串行模式下的执行顺序）
+            max_workers: 最大并发阶段数
+            parallel: 是否并发执行；False 时按列表顺序串行
+            on_phase_done: 阶段完成回调 (name, output)，在阶段线程内调用
+            on_phase_failed: 阶段失败回调 (name, error)
+        """
+        self.phases = {p.name: p for p in phases}
+        self.order = [p.name for p in phases]
+        self.max_workers = max_workers
+        self.parallel = parallel
+        self.on_phase_done = on_phase_done
+        self.on_phase_failed = on_phase_failed
+        self.timings: Dict[str, PhaseTiming] = {
+            name: PhaseTiming(name=name) for name in self.order
+        }
+        self._validate()
+
+    def _validate(self):
+        """校验依赖存在且无环"""
+        for phase in self.phases.values():
+            for dep in phase.deps:
+                if dep not in self.phases:
+                    raise ValueError(f"阶段 {phase.name} 依赖未知阶段 {dep}")
+
+        visiting, visited = set(), set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"阶段依赖存在环: {name}")
+            visiting.add(name)
+            for dep in self.phases[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.order:
+            visit(name)
+
+    def _run_phase(self, name: str, results: Dict[str, Any]) -> Any:
+        """执行单个阶段并记录耗时"""
+        phase = self.phases[name]
+        timing = self.timings[name]
+
+        if phase.title:
+            print(f"\n{phase.title}")
+
+        timing.status = "running"
+        timing.start = datetime.datetime.now().isoformat(timespec="milliseconds")
+        started = time.perf_counter()
+        try:
+            upstream = {dep: results[dep] for dep in phase.deps}
+            output = phase.func(upstream)
+            if self.on_phase_done:
+                self.on_phase_done(name, output)
+            timing.status = "done"
+            return output
+        except Exception as e:
+            timing.status = "failed"
+            timing.error = str(e)
+            if self.on_phase_failed:
+                self.on_phase_failed(name, e)
+            raise
+        finally:
+            timing.duration = round(time.perf_counter() - started, 3)
+            timing.end = datetime.datetime.now().isoformat(timespec="milliseconds")
+
+    def run(self, initial_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        执行全部阶段
+
+        Args:
+            initial_results: 已有的阶段结果（这些阶段将被跳过）
+
+        Returns:
+            Dict[str, Any]: 阶段名 -> 输出
+        """
+        results: Dict[str, Any] = dict(initial_results or {})
+        for name in results:
+            if name in self.timings:
+                self.timings[name].status = "skipped"
+
+        pending = [name for name in self.order if name not in results]
+
+        if not self.parallel:
+            for name in pending:
+                results[name] = self._run_phase(name, results)
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="phase") as executor:
+            running = {}
+            while pending or running:
+                # 提交所有依赖已满足的阶段（保持声明顺序）
+                for name in list(pending):
+                    if all(dep in results for dep in self.phases[name].deps):
+                        pending.remove(name)
+                        # 每个阶段复制一份上下文，沿用本次运行的查询注册表等上下文状态
+                        ctx = contextvars.copy_context()
+                        running[executor.submit(ctx.run, self._run_phase, name, results)] = name
+
+                if not running:
+                    raise RuntimeError(f"阶段无法调度: {pending}")
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        # 等待其余在途阶段结束后再抛出，避免线程池内残留任务
+                        for other in running:
+                            other.cancel()
+                        wait(list(running))
+                        raise
+
+        return results
+
+    def get_timings(self) -> List[Dict[str, Any]]:
+        """获取各阶段耗时（按声明顺序）"""
+        return [vars(self.timings[name]).copy() for name in self.order]
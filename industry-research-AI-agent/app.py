@@ -77,11 +77,11 @@ try:
 except ImportError:
     HAS_UNIFIED_WORKFLOW = False
 
-# 知识库引擎（RAG--knowledge_engine.py）
+# 知识库后台入库服务（知识库引擎 knowledge_engine.py 在首次入库时才初始化）
 try:
-    from agent_system.knowledge import kb_manager
+    from agent_system.knowledge import ingest_service
 except ImportError:
-    kb_manager = None  #容错
+    ingest_service = None  #容错
 
 # ==========================================================
 # 1. 全局配置 (必须在最前面)
@@ -96,6 +96,18 @@ st.set_page_config(
 # 初始化目录
 config.init_directories()
 
+# 向量模型后台预热（知识库与记忆系统共用同一个实例）
+try:
+    from config.embedding import embedding_service, EMBEDDING_WARMUP
+    if EMBEDDING_WARMUP:
+        embedding_service.warm_up(background=True)
+except ImportError:
+    pass
+
+# 后台入库：监听研报目录，新增/变化的 PDF 自动排队向量化（重复调用只启动一次）
+if ingest_service:
+    ingest_service.start(config.KNOWLEDGE_BASE_DIR)
+
 # ==========================================================
 # 2. 路由逻辑
 # ==========================================================
@@ -426,22 +438,43 @@ def render_console_page():
                 uploaded_files = st.file_uploader("➕ 上传新研报 (PDF)", type=["pdf"], accept_multiple_files=True)
     
                 if uploaded_files:
-                    for uploaded_file in uploaded_files:
+                    # file_uploader 在重跑后仍保留文件，已投递过的不再重复处理
+                    handled = st.session_state.setdefault("kb_uploaded", set())
+                    new_uploads = [f for f in uploaded_files if (f.name, f.size) not in handled]
+                    for uploaded_file in new_uploads:
                         save_path = os.path.join(config.KNOWLEDGE_BASE_DIR, uploaded_file.name)
                         
-                        if not os.path.exists(save_path):
-                            with open(save_path, "wb") as f:
-                                f.write(uploaded_file.getbuffer())
-                            
-                            if kb_manager:
-                                with st.spinner(f"正在学习 {uploaded_file.name} (向量化)..."):
-                                    kb_manager.ingest_pdf(save_path)
-                            
-                            st.toast(f"✅ 已入库并学习: {uploaded_file.name}", icon="🧠")
+                        # 同名文件直接覆盖，是否需要重新向量化由入库清单按内容哈希判断
+                        with open(save_path, "wb") as f:
+                            f.write(uploaded_file.getbuffer())
+                        handled.add((uploaded_file.name, uploaded_file.size))
+                        
+                        # 向量化交给后台服务，界面不阻塞
+                        if ingest_service:
+                            ingest_service.enqueue(save_path)
+                            st.toast(f"📥 已加入学习队列: {uploaded_file.name}", icon="🧠")
                         else:
-                            st.toast(f"ℹ️ 文件已存在: {uploaded_file.name}")
-                    time.sleep(1)
-                    st.rerun()
+                            st.toast(f"✅ 已保存: {uploaded_file.name}")
+                    if new_uploads:
+                        time.sleep(1)
+                        st.rerun()
+                
+                # 后台入库进度
+                if ingest_service and ingest_service.running:
+                    kb_status = ingest_service.get_status()
+                    active = kb_status["queue_depth"] + len(kb_status["in_progress"])
+                    if active:
+                        st.caption(f"🧠 后台学习中: 排队 {kb_status['queue_depth']} 份, "
+                                   f"进行中 {len(kb_status['in_progress'])} 份")
+                        for job in kb_status["in_progress"]:
+                            st.caption(f"⏳ {job['file']}: {job['pages']} 页 / {job['chunks']} 个片段 "
+                                       f"({job['elapsed']:.0f}s)")
+                        st.button("🔄 刷新进度", key="kb_refresh")
+                    for job in kb_status["recent"][:3]:
+                        if job["state"] == "failed":
+                            st.caption(f"⚠️ {job['file']} 入库失败: {job['error']}")
+                        elif job["status"] in ("new", "changed"):
+                            st.caption(f"✅ {job['file']}: 已学习 {job['chunks']} 个片段")
     
                 # 根据研报级别显示不同的按钮
                 if report_level == "PE级专业版":
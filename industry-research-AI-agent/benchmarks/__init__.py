@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+"""
+性能基准与离线重放工具
+
+不依赖 DeepSeek / Serper 即可端到端运行各工作流，
+用于追踪编排开销、解析、评分与导出环节的性能回归
+"""
@@ -0,0 +1,191 @@
+# benchmarks/bench_chunker.py
+"""
+语义切分微基准
+
+固定语料（随机种子生成的研报风格页面：章节标题、正文、列表、表格行）上对比：
+- legacy   - 逐行 × 逐模式 re.match、目录按模式逐个 findall 全文（改造前的实现）
+- compiled - 预编译多分支正则，每页一次扫描
+- parallel - compiled + 进程池跨页切分
+
+同时校验各实现的切分结果与目录完全一致。
+
+用法：
+    python benchmarks/bench_chunker.py
+    python benchmarks/bench_chunker.py --pages 2000 --repeat 5 --workers 8
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from agent_system.tools.enhanced_pdf import EnhancedPDFProcessor, SemanticChunker
+
+
+# ===============================
+# 改造前的实现（基线）
+# ===============================
+
+class LegacySemanticChunker(SemanticChunker):
+    """逐行、逐模式匹配"""
+
+    def _split_by_sections(self, text: str) -> List[Tuple[str, str]]:
+        sections = []
+        current_title = ""
+        current_content = []
+        for line in text.split('\n'):
+            is_title = False
+            for pattern in self.SECTION_PATTERNS:
+                if re.match(pattern, line.strip()):
+                    if current_content:
+                        sections.append((current_title, '\n'.join(current_content)))
+                    current_title = line.strip()
+                    current_content = []
+                    is_title = True
+                    break
+            if not is_title:
+                current_content.append(line)
+        if current_content:
+            sections.append((current_title, '\n'.join(current_content)))
+        return sections if sections else [("", text)]
+
+    def _split_by_paragraphs(self, text: str) -> List[str]:
+        for sep in self.PARAGRAPH_SEPARATORS:
+            if sep in text:
+                paragraphs = text.split(sep)
+                if len(paragraphs) > 1:
+                    return [p.strip() for p in paragraphs if p.strip()]
+        return [s.strip() for s in re.split(r'[。！？\n]', text) if s.strip()]
+
+    def _detect_chunk_type(self, content: str) -> str:
+        if '|' in content and content.count('|') > 3:
+            return 'table'
+        if re.match(r'^[\d•\-\*]', content.strip()):
+            return 'list'
+        if len(content) < 50 and not content.endswith('。'):
+            for pattern in self.SECTION_PATTERNS:
+                if re.match(pattern, content.strip()):
+                    return 'title'
+        return 'text'
+
+
+def legacy_sections(text: str) -> List[Dict]:
+    """改造前的目录提取：每个模式一次全文 findall"""
+    sections = []
+    for pattern in SemanticChunker.SECTION_PATTERNS:
+        for match in re.findall(f'{pattern}.*', text, re.MULTILINE)[:20]:
+            if len(match.strip()) < 100:
+                sections.append({"title": match.strip()})
+    return sections
+
+
+# ===============================
+# 固定语料
+# ===============================
+
+_HEADINGS = ["第{n}章 行业概况", "{cn}、市场规模与增速", "{n}.{m} 竞争格局分析", "（{n}）政策环境", "A、风险提示"]
+_SENTENCES = [
+    "2024年行业市场规模达到2,850亿元，同比增长18.6%。",
+    "上游核心零部件国产化率持续提升，毛利率维持在35%-45%区间。",
+    "龙头企业市场份额约21%，CR5约为58%。",
+    "预计到2027年市场规模将突破4,600亿元，年复合增长率约17%。",
+    "政策端持续加码，重点支持关键技术攻关与规模化应用。",
+]
+_CN = "一二三四五六七八九十"
+
+
+def build_corpus(pages: int, seed: int = 42) -> List[Tuple[str, int]]:
+    """生成固定语料：同样的页数和种子得到同样的文本"""
+    rng = random.Random(seed)
+    corpus = []
+    for page_number in range(1, pages + 1):
+        lines = []
+        for _ in range(rng.randint(20, 40)):
+            roll = rng.random()
+            if roll < 0.08:
+                template = rng.choice(_HEADINGS)
+                lines.append(template.format(n=rng.randint(1, 12), m=rng.randint(1, 9), cn=rng.choice(_CN)))
+            elif roll < 0.15:
+                lines.append("| 指标 | 2022 | 2023 | 2024E |")
+            elif roll < 0.2:
+                lines.append(f"• {rng.choice(_SENTENCES)}")
+            elif roll < 0.25:
+                lines.append("")
+            else:
+                lines.append("".join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 4))))
+        corpus.append(("\n".join(lines), page_number))
+    return corpus
+
+
+# ===============================
+# 计时
+# ===============================
+
+def _time(func, repeat: int) -> Tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _signature(chunks) -> List[Tuple]:
+    return [(c.content, c.chunk_type, c.page_number, c.section) for c in chunks]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="语义切分微基准")
+    parser.add_argument("--pages", type=int, default=600, help="语料页数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行切分进程数")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.pages)
+    full_text = "\n\n".join(text for text, _ in corpus)
+    chars = len(full_text)
+
+    legacy = LegacySemanticChunker()
+    compiled = SemanticChunker()
+    processor = EnhancedPDFProcessor()
+
+    def run_legacy():
+        return [c for text, page in corpus for c in legacy.chunk(text, page)]
+
+    timings = {}
+    timings["legacy"], legacy_chunks = _time(run_legacy, args.repeat)
+    timings["compiled"], compiled_chunks = _time(lambda: compiled.chunk_pages(corpus, max_workers=1), args.repeat)
+    timings["parallel"], parallel_chunks = _time(
+        lambda: compiled.chunk_pages(corpus, max_workers=args.workers), args.repeat)
+    timings["toc_legacy"], legacy_toc = _time(lambda: legacy_sections(full_text), args.repeat)
+    timings["toc_compiled"], compiled_toc = _time(
+        lambda: processor._extract_structure(full_text).sections, args.repeat)
+
+    consistent = (_signature(legacy_chunks) == _signature(compiled_chunks) == _signature(parallel_chunks)
+                  and legacy_toc == compiled_toc)
+
+    print(f"\n{'='*60}")
+    print(f"语料: {args.pages} 页, {chars:,} 字符, {len(legacy_chunks)} 个片段, 并行进程 {args.workers}")
+    print(f"{'实现':<14}{'耗时(ms)':>12}{'页/秒':>12}{'加速比':>10}")
+    for name in ("legacy", "compiled", "parallel"):
+        seconds = timings[name]
+        print(f"{name:<14}{seconds * 1000:>12.1f}{args.pages / seconds:>12.0f}"
+              f"{timings['legacy'] / seconds:>10.2f}x")
+    for name in ("toc_legacy", "toc_compiled"):
+        seconds = timings[name]
+        print(f"{name:<14}{seconds * 1000:>12.1f}{'':>12}{timings['toc_legacy'] / seconds:>10.2f}x")
+    print(f"{'='*60}")
+    print("✅ 各实现结果一致" if consistent else "❌ 结果不一致")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
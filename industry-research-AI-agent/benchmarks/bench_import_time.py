@@ -0,0 +1,127 @@
+# benchmarks/bench_import_time.py
+"""
+导入耗时预算
+
+每个模块在独立的子进程中冷导入，记录：
+- 导入耗时（多次取最快一次）与 RSS
+- 导入后已加载的重型依赖（chromadb / sentence_transformers / torch / akshare / yfinance ...）
+
+两项检查：
+1. 耗时不超过预算（--scale 可整体放宽，适配较慢的机器）
+2. 不应在导入时加载的重型依赖没有被加载（与机器快慢无关，是主要的回归信号）
+
+--top N 时额外用 python -X importtime 列出累计耗时最高的 N 个子模块，便于定位回归来源。
+
+用法：
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 5 --top 15
+    python benchmarks/bench_import_time.py --module agent_system.tools.tools_custom --scale 2
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+
+# 首次使用时才应加载的重型依赖
+HEAVY_MODULES = [
+    "chromadb", "sentence_transformers", "torch", "langchain_chroma",
+    "akshare", "yfinance", "crewai_tools",
+]
+
+# 模块 -> (耗时预算秒数, 导入时允许加载的重型依赖)
+IMPORT_BUDGETS = {
+    "agent_system.knowledge": (1.5, []),
+    "memory_system.memory_manager": (1.0, []),
+    "memory_system.enhanced_memory": (1.5, []),
+    "agent_system.tools.tools_custom": (8.0, []),
+    "agent_system.workflows.industry_research": (10.0, []),
+    "agent_system.workflows.industry_research_v2": (10.0, []),
+    "agent_system.workflows.industry_research_v3": (10.0, []),
+    "main": (10.0, []),
+    "app": (15.0, []),
+}
+
+_PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - started
+with open("/proc/self/statm") as f:
+    rss_mb = int(f.read().split()[1]) * 4096 / 1024 / 1024
+print(json.dumps({{"seconds": seconds, "rss_mb": rss_mb,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(module: str) -> Dict[str, Any]:
+    """在子进程中冷导入一次"""
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return {"error": (proc.stderr.strip().splitlines() or ["unknown error"])[-1]}
+
+
+def top_imports(module: str, top: int) -> List[tuple]:
+    """python -X importtime：累计耗时最高的子模块 (毫秒, 模块名)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=PROJECT_ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="导入耗时预算")
+    parser.add_argument("--module", action="append", help="只测指定模块（可重复）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块冷导入次数（取最快一次）")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算放宽倍数")
+    parser.add_argument("--top", type=int, default=0, help="列出累计耗时最高的 N 个子模块")
+    args = parser.parse_args(argv)
+
+    modules = args.module or list(IMPORT_BUDGETS)
+    failed = False
+
+    print(f"\n{'='*78}")
+    print(f"{'模块':<44}{'耗时(s)':>9}{'预算(s)':>9}{'RSS(MB)':>9}  结果")
+    for module in modules:
+        budget, allowed = IMPORT_BUDGETS.get(module, (float("inf"), []))
+        budget *= args.scale
+        runs = [probe(module) for _ in range(max(1, args.repeat))]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            failed = True
+            print(f"{module:<44}  ❌ {errors[-1][:60]}")
+            continue
+
+        best = min(runs, key=lambda r: r["seconds"])
+        unexpected = [m for m in best["heavy"] if m not in allowed]
+        ok = best["seconds"] <= budget and not unexpected
+        failed = failed or not ok
+        verdict = "✅" if ok else "❌"
+        if unexpected:
+            verdict += f" 导入时加载了: {', '.join(unexpected)}"
+        print(f"{module:<44}{best['seconds']:>9.2f}{budget:>9.1f}{best['rss_mb']:>9.0f}  {verdict}")
+
+        if args.top:
+            for millis, name in top_imports(module, args.top):
+                print(f"    {millis:>9.1f} ms  {name}")
+    print(f"{'='*78}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_pdf_memory.py
+"""
+大文档解析内存基准
+
+对同一份 PDF 分别执行：
+- stream  - 逐页生成器（入库路径的实际用法），不保留页面
+- collect - 解析结果全部收集到列表（旧版拼接全文的内存上界）
+
+每种方式在单独子进程中运行，记录峰值 RSS 增量、耗时和页数。
+直接调用解析器（不经过解析结果存储），保证每次都真实解析 PDF。
+
+用法：
+    python benchmarks/bench_pdf_memory.py knowledge_base/某招股书.pdf
+    python benchmarks/bench_pdf_memory.py big.pdf --ceiling 256
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+MODES = ["stream", "collect"]
+
+
+def bench_one(pdf_path: str, mode: str, ceiling: int) -> Dict[str, Any]:
+    """在当前进程内解析一次并采集指标"""
+    from benchmarks.replay import peak_rss_mb
+    from ingestion.pdf_parser import iter_page_records
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    pages = 0
+    chars = 0
+
+    records = iter_page_records(pdf_path, memory_ceiling_mb=ceiling)
+    if mode == "collect":
+        records = list(records)
+    for record in records:
+        pages += 1
+        chars += len(record.text)
+
+    return {
+        "mode": mode,
+        "pages": pages,
+        "chars": chars,
+        "seconds": round(time.perf_counter() - started, 2),
+        "peak_rss_delta_mb": round(peak_rss_mb() - baseline, 1),
+        "ceiling_mb": ceiling
+    }
+
+
+def bench_in_subprocess(pdf_path: str, mode: str, ceiling: int) -> Dict[str, Any]:
+    """子进程运行，保证峰值 RSS 只反映该模式"""
+    cmd = [sys.executable, os.path.abspath(__file__), pdf_path,
+           "--mode", mode, "--ceiling", str(ceiling), "--json"]
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return {"mode": mode, "error": proc.stderr.strip()[-300:]}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="大文档解析内存基准")
+    parser.add_argument("pdf", help="PDF 路径")
+    parser.add_argument("--mode", default="all", choices=MODES + ["all"])
+    parser.add_argument("--ceiling", type=int, default=512, help="内存增量上限（MB），0 表示不限制")
+    parser.add_argument("--json", action="store_true", help="只输出 JSON（子进程使用）")
+    args = parser.parse_args(argv)
+
+    if args.mode != "all":
+        result = bench_one(args.pdf, args.mode, args.ceiling)
+        print(json.dumps(result, ensure_ascii=False) if args.json else result)
+        return 0
+
+    results = [bench_in_subprocess(args.pdf, mode, args.ceiling) for mode in MODES]
+    print(f"\n{'='*60}")
+    print(f"{'模式':<10}{'页数':>8}{'耗时(s)':>10}{'峰值RSS增量(MB)':>20}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<10}  ❌ {r['error']}")
+            continue
+        print(f"{r['mode']:<10}{r['pages']:>8}{r['seconds']:>10.2f}{r['peak_rss_delta_mb']:>20.1f}")
+    print(f"{'='*60}")
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# benchmarks/bench_rerank.py
+"""
+重排序微基准
+
+固定候选池（随机种子生成的研报风格片段与来源）上对比：
+- legacy - 逐片段 Python 循环打分（改造前的实现）
+- batch  - 预编译多模式匹配一次扫描 + NumPy 批量打分
+
+同时校验两种实现的得分一致、排序结果一致。
+
+用法：
+    python benchmarks/bench_rerank.py
+    python benchmarks/bench_rerank.py --sizes 1000 10000 50000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import List, Tuple
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+
+from agent_system.rag.agentic_rag import ChunkReranker, RetrievedChunk
+
+
+# ===============================
+# 改造前的实现（基线）
+# ===============================
+
+class LegacyChunkReranker(ChunkReranker):
+    """逐片段、逐关键词匹配"""
+
+    def rerank(self, chunks: List[RetrievedChunk], query: str, top_k: int = 5) -> List[RetrievedChunk]:
+        scored = [(chunk, self._calculate_score(chunk, query)) for chunk in chunks]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return [c[0] for c in scored[:top_k]]
+
+    def _calculate_score(self, chunk: RetrievedChunk, query: str) -> float:
+        score = chunk.score
+        for keyword, weight in self.keyword_weights.items():
+            if keyword in chunk.content:
+                score *= weight
+        source = chunk.source.lower()
+        for src, weight in self.source_weights.items():
+            if src.lower() in source:
+                score *= weight
+                break
+        query_terms = set(query.replace("，", " ").replace(",", " ").split())
+        overlap = len(query_terms & set(chunk.content))
+        score *= (1 + overlap * 0.1)
+        numbers = re.findall(r'\d+\.?\d*', chunk.content)
+        score *= (1 + len(numbers) / max(len(chunk.content.split()), 1) * 0.5)
+        for year in range(self.current_year - 2, self.current_year + 2):
+            if str(year) in chunk.content:
+                score *= 1.2
+                break
+        return score
+
+
+# ===============================
+# 固定候选池
+# ===============================
+
+_SENTENCES = [
+    "2024年行业市场规模达到2,850亿元，同比增长18.6%。",
+    "上游核心零部件国产化率持续提升，毛利率维持在35%-45%区间。",
+    "龙头企业市场份额约21%，CR5约为58%。",
+    "预计到2027年市场规模将突破4,600亿元，年复合增长率约17%。",
+    "政策端持续加码，重点支持关键技术攻关与规模化应用。",
+    "据国家统计局数据，规模以上企业营收同比增长 12.3 %。",
+    "Shipments reached 1.2 million units in 2023 according to IDC research.",
+    "权威机构预测行业将保持稳健增长，官方统计口径有所调整。",
+]
+_SOURCES = ["国家统计局-2024统计公报.pdf", "某公司2024年报.pdf", "IDC China Tracker.pdf",
+            "艾瑞咨询-行业白皮书.pdf", "招股书-某科技.pdf", "券商研报.pdf", "会议纪要.pdf"]
+QUERY = "人工智能 市场规模 增长 亿 %"
+
+
+def build_candidates(size: int, seed: int = 42) -> List[RetrievedChunk]:
+    """生成固定候选池：同样的数量和种子得到同样的片段"""
+    rng = random.Random(seed)
+    return [
+        RetrievedChunk(
+            content="".join(rng.choice(_SENTENCES) for _ in range(rng.randint(2, 12))),
+            source=rng.choice(_SOURCES),
+            score=rng.random()
+        )
+        for _ in range(size)
+    ]
+
+
+# ===============================
+# 计时
+# ===============================
+
+def _time(func, repeat: int) -> Tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="重排序微基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="候选池大小")
+    parser.add_argument("--top-k", type=int, default=10, help="返回数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    args = parser.parse_args(argv)
+
+    legacy = LegacyChunkReranker()
+    batch = ChunkReranker()
+    consistent = True
+
+    print(f"\n{'='*60}")
+    print(f"{'候选数':>8}{'legacy(ms)':>14}{'batch(ms)':>12}{'加速比':>10}  结果")
+    for size in args.sizes:
+        chunks = build_candidates(size)
+        legacy_seconds, legacy_top = _time(lambda: legacy.rerank(chunks, QUERY, args.top_k), args.repeat)
+        batch_seconds, batch_top = _time(lambda: batch.rerank(chunks, QUERY, args.top_k), args.repeat)
+
+        legacy_scores = np.array([legacy._calculate_score(c, QUERY) for c in chunks])
+        same = (np.allclose(legacy_scores, batch.score_batch(chunks, QUERY), rtol=1e-12)
+                and [id(c) for c in legacy_top] == [id(c) for c in batch_top])
+        consistent = consistent and same
+        print(f"{size:>8}{legacy_seconds * 1000:>14.1f}{batch_seconds * 1000:>12.1f}"
+              f"{legacy_seconds / batch_seconds:>10.2f}x  {'✅' if same else '❌'}")
+    print(f"{'='*60}")
+    print("✅ 两种实现结果一致" if consistent else "❌ 结果不一致")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# benchmarks/bench_table_index.py
+"""
+表格数值规整微基准
+
+固定样例表格（随机种子生成的财务摘要表：金额、百分比、倍数、括号负数、单位声明）上：
+- 测量 tables_to_cells 的吞吐（单元格/秒）
+- 校验单位规整：金额按表头/行/单元格单位换算为元，百分比换算为小数，
+  倍数（PE 12倍）不套用表头的金额单位
+
+用法：
+    python benchmarks/bench_table_index.py
+    python benchmarks/bench_table_index.py --tables 2000 --repeat 5
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, List
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ingestion.table_index import TableIndex, tables_to_cells
+
+
+# 单位规整校验：(行标签, 列标签, 期望数值, 期望单位, 期望展示)
+SAMPLE_TABLE = [
+    ["项目（单位：亿元）", "2023年", "2024E"],
+    ["营业收入", "120.5", "150"],
+    ["归母净利润", "(3.2)", "8"],
+    ["研发投入（万元）", "5,200", "6000"],
+    ["毛利率", "35.2%", "36%"],
+    ["PE", "12倍", "15x"],
+]
+EXPECTED = [
+    ("营业收入", "2023年", 120.5e8, "元", "120.50亿元"),
+    ("归母净利润", "2023年", -3.2e8, "元", "-3.20亿元"),
+    ("研发投入（万元）", "2024E", 6000e4, "元", "6,000.00万元"),
+    ("毛利率", "2023年", 0.352, "ratio", "35.20%"),
+    ("PE", "2023年", 12.0, "倍", "12倍"),
+    ("PE", "2024E", 15.0, "倍", "15倍"),
+]
+
+
+def check_units() -> List[str]:
+    """返回与期望不一致的单元格描述（空列表表示全部通过）"""
+    cells = tables_to_cells([SAMPLE_TABLE])
+    errors = []
+    for row_label, col_label, value, unit, shown in EXPECTED:
+        match = cells[(cells["row_label"] == row_label) & (cells["col_label"] == col_label)]
+        if match.empty:
+            errors.append(f"{row_label}/{col_label}: 缺失")
+            continue
+        cell = match.iloc[0].to_dict()
+        formatted = TableIndex.format_value(cell)
+        if cell["unit"] != unit or not math.isclose(cell["value"], value, rel_tol=1e-9) or formatted != shown:
+            errors.append(f"{row_label}/{col_label}: {cell['value']!r} {cell['unit']!r} {formatted!r}，"
+                          f"期望 {value!r} {unit!r} {shown!r}")
+    return errors
+
+
+def make_tables(count: int, seed: int = 7) -> List[List[List[Any]]]:
+    """研报风格的财务摘要表"""
+    rng = random.Random(seed)
+    units = ["（单位：亿元）", "（单位：万元）", "(百万元)", ""]
+    rows = ["营业收入", "营业成本", "归母净利润", "毛利率", "净利率", "PE", "PB", "研发投入（万元）"]
+    years = ["2021A", "2022A", "2023A", "2024E", "2025E"]
+    tables = []
+    for _ in range(count):
+        table = [[f"项目{rng.choice(units)}"] + years]
+        for label in rows:
+            cells = []
+            for _ in years:
+                number = rng.uniform(1, 500)
+                if label in ("毛利率", "净利率"):
+                    cells.append(f"{number / 10:.1f}%")
+                elif label in ("PE", "PB"):
+                    cells.append(f"{number / 20:.1f}倍")
+                elif rng.random() < 0.1:
+                    cells.append(f"({number:,.2f})")
+                else:
+                    cells.append(f"{number * 100:,.2f}")
+            table.append([label] + cells)
+        tables.append(table)
+    return tables
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="表格数值规整微基准")
+    parser.add_argument("--tables", type=int, default=500, help="样例表格数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    args = parser.parse_args(argv)
+
+    errors = check_units()
+    tables = make_tables(args.tables)
+
+    best, cells = float("inf"), None
+    for _ in range(max(1, args.repeat)):
+        started = time.perf_counter()
+        cells = tables_to_cells(tables)
+        best = min(best, time.perf_counter() - started)
+
+    print(f"\n{'='*60}")
+    print(f"表格 {args.tables} 个, 单元格 {len(cells)} 个")
+    print(f"tables_to_cells: {best * 1000:.1f} ms, {len(cells) / best:,.0f} cells/s")
+    if errors:
+        print("❌ 单位规整校验失败:")
+        for error in errors:
+            print(f"   - {error}")
+        return 1
+    print(f"✅ 单位规整校验通过（{len(EXPECTED)} 个单元格）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# benchmarks/bench_workflows.py
+"""
+工作流端到端基准
+
+离线（重放）运行各工作流，记录：
+- 总耗时 / 进程 CPU 时间 / 峰值 RSS
+- 各阶段（每次 Crew.kickoff）的耗时、CPU 时间
+- LLM / 搜索调用次数（重放命中 vs 替身）
+
+用法：
+    # 离线重放全部工作流（每个工作流单独子进程，峰值内存互不干扰）
+    python benchmarks/bench_workflows.py --workflow all
+
+    # 录制真实响应作为夹具（需要 DEEPSEEK / SERPER 密钥）
+    python benchmarks/bench_workflows.py --workflow v3 --mode record
+
+    # 模拟网络延迟，观察并发阶段的收益
+    python benchmarks/bench_workflows.py --workflow v3 --llm-latency 0.5
+"""
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Callable, Dict, List
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+RESULTS_DIR = os.path.join(CURRENT_DIR, "results")
+WORKFLOWS = ["v1", "v2", "v3", "unified"]
+
+DEFAULT_INPUTS = {
+    "industry": "人工智能",
+    "province": "浙江省",
+    "target_year": "2025",
+    "focus": "产业链投资机会"
+}
+
+
+def _prepare_env(mode: str, scratch_dir: str):
+    """
+    隔离运行期副作用：检查点写入临时目录
+    重放模式下关闭搜索/LLM 缓存，避免缓存命中掩盖真实开销
+    """
+    os.environ.setdefault("RUNS_DIR", os.path.join(scratch_dir, "runs"))
+    if mode == "replay":
+        os.environ["SEARCH_CACHE_ENABLED"] = "0"
+        os.environ["LLM_CACHE_ENABLED"] = "0"
+        os.environ.setdefault("DEEPSEEK_API_KEY", "replay")
+        os.environ.setdefault("DEEPSEEK_API_BASE", "http://127.0.0.1:9")
+        os.environ.setdefault("SERPER_API_KEY", "replay")
+
+
+def _load_workflow(name: str, inputs: Dict[str, Any], scratch_dir: str) -> Callable[[], Any]:
+    """
+    导入工作流并返回无参运行函数
+    必须在重放环境内调用：模块导入时创建的 LLM 单例才会绑定到替身
+    """
+    if name == "v1":
+        from agent_system.workflows.industry_research import run_industry_research
+        return lambda: run_industry_research(dict(inputs))
+
+    if name == "v2":
+        from agent_system.workflows.industry_research_v2 import IndustryResearchWorkflowV2
+        return lambda: IndustryResearchWorkflowV2().run(
+            inputs["industry"], inputs["province"], inputs["target_year"], inputs["focus"]
+        )
+
+    if name == "v3":
+        from agent_system.workflows.industry_research_v3 import IndustryResearchWorkflowV3
+        return lambda: IndustryResearchWorkflowV3(enable_checkpoint=False).run(
+            inputs["industry"], inputs["province"], inputs["target_year"], inputs["focus"]
+        )
+
+    if name == "unified":
+        from agent_system.workflows.industry_research_unified import UnifiedResearchWorkflow
+        return lambda: UnifiedResearchWorkflow(
+            industry=inputs["industry"],
+            province=inputs["province"],
+            target_year=inputs["target_year"],
+            focus=inputs["focus"],
+            output_dir=os.path.join(scratch_dir, "output"),
+            enable_checkpoint=False
+        ).run()
+
+    raise ValueError(f"未知工作流: {name}")
+
+
+def _summarize_result(result: Any) -> Dict[str, Any]:
+    """提取工作流结果中与性能相关的字段"""
+    if isinstance(result, dict):
+        return {
+            "success": result.get("success", True),
+            "error": result.get("error"),
+            "report_chars": len(result.get("report") or ""),
+            "phase_timings": result.get("phase_timings"),
+            "search_stats": result.get("search_stats")
+        }
+    return {"success": True, "report_chars": len(str(result or ""))}
+
+
+def bench_one(name: str, args) -> Dict[str, Any]:
+    """在当前进程内运行一个工作流并采集指标"""
+    from benchmarks.replay import ReplayEnvironment, peak_rss_mb
+
+    scratch_dir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    _prepare_env(args.mode, scratch_dir)
+
+    record: Dict[str, Any] = {
+        "workflow": name,
+        "mode": args.mode,
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "inputs": DEFAULT_INPUTS,
+        "llm_latency": args.llm_latency,
+        "search_latency": args.search_latency
+    }
+
+    env = ReplayEnvironment(
+        mode=args.mode,
+        fixture_path=args.fixtures,
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency
+    )
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        with env:
+            # 导入单独计时（模型加载、向量库初始化等）
+            import_start = time.perf_counter()
+            run = _load_workflow(name, DEFAULT_INPUTS, scratch_dir)
+            record["import_time"] = round(time.perf_counter() - import_start, 3)
+            record.update(_summarize_result(run()))
+    except Exception as e:
+        record["success"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["traceback"] = traceback.format_exc(limit=5)
+
+    record["wall_time"] = round(time.perf_counter() - wall_start, 3)
+    record["cpu_time"] = round(time.process_time() - cpu_start, 3)
+    record["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    record.update(env.get_report())
+    return record
+
+
+def bench_in_subprocess(name: str, args) -> Dict[str, Any]:
+    """在子进程中运行单个工作流，保证峰值 RSS 只反映该工作流"""
+    with tempfile.NamedTemporaryFile("r", suffix=".json", delete=False) as f:
+        out_path = f.name
+
+    cmd = [
+        sys.executable, os.path.abspath(__file__),
+        "--workflow", name,
+        "--mode", args.mode,
+        "--fixtures", args.fixtures,
+        "--llm-latency", str(args.llm_latency),
+        "--search-latency", str(args.search_latency),
+        "--out", out_path
+    ]
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT)
+
+    try:
+        with open(out_path, "r", encoding="utf-8") as f:
+            return json.load(f)[0]
+    except (OSError, ValueError, IndexError):
+        return {"workflow": name, "success": False,
+                "error": f"子进程异常退出 (exit={proc.returncode})"}
+    finally:
+        os.remove(out_path)
+
+
+def main(argv: List[str] = None) -> int:
+    from benchmarks.replay import DEFAULT_FIXTURE_PATH
+
+    parser = argparse.ArgumentParser(description="工作流端到端基准（离线重放）")
+    parser.add_argument("--workflow", default="all", choices=WORKFLOWS + ["all"])
+    parser.add_argument("--mode", default="replay", choices=["replay", "record"])
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_PATH, help="夹具文件路径")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="替身 LLM 延迟（秒）")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="替身搜索延迟（秒）")
+    parser.add_argument("--out", default=None, help="结果 JSON 路径（默认 benchmarks/results/<时间戳>.json）")
+    args = parser.parse_args(argv)
+
+    if args.workflow == "all":
+        results = [bench_in_subprocess(name, args) for name in WORKFLOWS]
+    else:
+        results = [bench_one(args.workflow, args)]
+
+    out_path = args.out
+    if not out_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_path = os.path.join(RESULTS_DIR, f"workflows_{stamp}.json")
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+
+    if not args.out or args.workflow == "all":
+        print(f"\n{'='*70}")
+        print(f"{'工作流':<10}{'耗时(s)':>10}{'CPU(s)':>10}{'RSS(MB)':>10}{'LLM':>8}{'搜索':>8}  状态")
+        for r in results:
+            counters = r.get("counters", {})
+            status = "✅" if r.get("success") else f"❌ {(r.get('error') or '')[:40]}"
+            print(f"{r['workflow']:<10}{r.get('wall_time', 0):>10.2f}{r.get('cpu_time', 0):>10.2f}"
+                  f"{r.get('peak_rss_mb', 0):>10.1f}{counters.get('llm_calls', 0):>8}"
+                  f"{counters.get('search_calls', 0):>8}  {status}")
+        print(f"{'='*70}")
+        print(f"📊 结果已保存: {out_path}")
+
+    return 0 if all(r.get("success") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+# benchmarks/replay.py
+"""
+LLM / 搜索离线重放环境
+
+两种模式：
+1. record - 调用真实 DeepSeek / Serper，同时把响应写入夹具文件
+2. replay - 从夹具文件读取响应；夹具中没有的请求返回内置的替身文本
+
+替换点（类级别打补丁，覆盖所有工作流）：
+- crewai LLM 及其子类的 call
+- litellm.completion（DeepSeekClient 直连路径）
+- SerperDevTool._run
+- Crew.kickoff（计时，按 Agent 角色记录各阶段耗时）
+"""
+
+import hashlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DEFAULT_FIXTURE_PATH = os.path.join(CURRENT_DIR, "fixtures", "replay.json")
+
+
+# ===============================
+# 替身响应
+# ===============================
+
+CANNED_REVIEW = """REVIEW_RESULT: PASS
+SCORE: 86/100
+
+审核意见：
+1. 报告结构完整，逻辑清晰
+2. 核心数据均标注来源
+"""
+
+CANNED_REPORT = """# 行业研究（离线替身输出）
+
+## 一、市场规模
+2024年市场规模约2,850亿元，同比增长18.6%，2020-2024年CAGR为21.3%。
+预计2027年市场规模将达到4,600亿元。（来源：国家统计局、行业协会）
+
+## 二、产业链结构
+- 上游：核心零部件、原材料，毛利率约35%-45%
+- 中游：整机制造与系统集成，毛利率约20%-28%
+- 下游：行业应用与运营服务，毛利率约15%-22%
+
+## 三、竞争格局
+CR5约为58%，CR10约为73%，龙头企业市场份额约21%。
+
+## 四、政策环境
+《关于推动产业高质量发展的指导意见》提出到2027年核心产业规模突破5,000亿元。
+
+## 五、估值与回报
+可比公司PE中位数约32倍，EV/EBITDA约18倍；基准情形下IRR约22%，MOIC约2.6x。
+
+## 六、风险提示
+技术迭代风险、价格竞争风险、政策执行不及预期风险。
+"""
+
+CANNED_SEARCH = """Title: 行业市场规模与竞争格局分析（离线替身搜索结果）
+Link: https://example.com/industry-report
+Snippet: 2024年市场规模约2,850亿元，同比增长18.6%，CR5约58%，龙头企业市场份额约21%。
+---
+Title: 产业政策与发展规划
+Link: https://example.com/policy
+Snippet: 到2027年核心产业规模突破5,000亿元，重点支持上游核心零部件国产替代。
+"""
+
+
+def _messages_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(m.get("content", "")) for m in messages or [] if isinstance(m, dict))
+
+
+def canned_llm_response(messages: Any) -> str:
+    """
+    按 Prompt 内容挑选替身响应
+    采用 CrewAI ReAct 的 Final Answer 格式，Agent 一轮即结束
+    """
+    text = _messages_text(messages)
+    body = CANNED_REVIEW if ("REVIEW_RESULT" in text or "审核" in text[-4000:]) else CANNED_REPORT
+    return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+
+def _hash(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _normalize_messages(messages: Any) -> List[Dict[str, Any]]:
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return [{"role": m.get("role"), "content": m.get("content")} if isinstance(m, dict) else m
+            for m in messages or []]
+
+
+def peak_rss_mb() -> float:
+    """进程峰值常驻内存（MB）；Linux 下 ru_maxrss 单位为 KB，macOS 为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+# ===============================
+# 重放环境
+# ===============================
+
+class ReplayEnvironment:
+    """
+    离线重放环境（上下文管理器）
+
+    用法：
+        with ReplayEnvironment(mode="replay") as env:
+            run_workflow(...)
+        print(env.get_report())
+    """
+
+    def __init__(self, mode: str = "replay", fixture_path: str = DEFAULT_FIXTURE_PATH,
+                 llm_latency: float = 0.0, search_latency: float = 0.0):
+        """
+        初始化重放环境
+
+        Args:
+            mode: "replay" 或 "record"
+            fixture_path: 夹具文件路径
+            llm_latency: 替身 LLM 响应的模拟延迟（秒）
+            search_latency: 替身搜索的模拟延迟（秒）
+        """
+        if mode not in ("replay", "record"):
+            raise ValueError(f"未知模式: {mode}")
+        self.mode = mode
+        self.fixture_path = fixture_path
+        self.llm_latency = llm_latency
+        self.search_latency = search_latency
+
+        self.fixtures = {"llm": {}, "search": {}}
+        if os.path.exists(fixture_path):
+            with open(fixture_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            self.fixtures["llm"].update(loaded.get("llm", {}))
+            self.fixtures["search"].update(loaded.get("search", {}))
+
+        self._lock = threading.Lock()
+        self._patches: List[tuple] = []
+        self.counters = {
+            "llm_calls": 0,
+            "llm_replayed": 0,
+            "llm_canned": 0,
+            "search_calls": 0,
+            "search_replayed": 0,
+            "search_canned": 0,
+        }
+        self.phases: List[Dict[str, Any]] = []
+
+    # ------------------ 打补丁 ------------------
+
+    def _patch(self, owner: Any, attr: str, replacement: Any):
+        self._patches.append((owner, attr, owner.__dict__.get(attr)))
+        setattr(owner, attr, replacement)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _llm_classes(self) -> List[type]:
+        """收集 crewai LLM 及其所有子类（不同版本的 provider 实现类不同）"""
+        from crewai import LLM
+
+        roots = [LLM]
+        for module_name, attr in (("crewai.llms.base_llm", "BaseLLM"), ("crewai.llm", "BaseLLM")):
+            try:
+                module = __import__(module_name, fromlist=[attr])
+                roots.append(getattr(module, attr))
+            except (ImportError, AttributeError):
+                continue
+
+        classes, stack = [], list(roots)
+        while stack:
+            cls = stack.pop()
+            if cls in classes:
+                continue
+            classes.append(cls)
+            stack.extend(cls.__subclasses__())
+        return [cls for cls in classes if "call" in cls.__dict__]
+
+    def _install_llm(self):
+        env = self
+
+        def make_call(original: Callable):
+            def call(llm_self, messages, *args, **kwargs):
+                env._count("llm_calls")
+                key = _hash({
+                    "model": getattr(llm_self, "model", ""),
+                    "messages": _normalize_messages(messages)
+                })
+                if env.mode == "record":
+                    response = original(llm_self, messages, *args, **kwargs)
+                    if isinstance(response, str):
+                        with env._lock:
+                            env.fixtures["llm"][key] = response
+                    return response
+
+                if env.llm_latency:
+                    time.sleep(env.llm_latency)
+                if key in env.fixtures["llm"]:
+                    env._count("llm_replayed")
+                    return env.fixtures["llm"][key]
+                env._count("llm_canned")
+                return canned_llm_response(messages)
+            return call
+
+        for cls in self._llm_classes():
+            self._patch(cls, "call", make_call(cls.__dict__["call"]))
+
+        # DeepSeekClient 直连 litellm 的路径：replay 时注入 mock_response，不发网络请求
+        try:
+            import litellm
+        except ImportError:
+            return
+        original_completion = litellm.completion
+
+        def completion(*args, **kwargs):
+            if env.mode == "record":
+                return original_completion(*args, **kwargs)
+            env._count("llm_calls")
+            env._count("llm_canned")
+            if env.llm_latency:
+                time.sleep(env.llm_latency)
+            kwargs["mock_response"] = canned_llm_response(kwargs.get("messages"))
+            return original_completion(*args, **kwargs)
+
+        self._patches.append((litellm, "completion", original_completion))
+        litellm.completion = completion
+
+    def _install_search(self):
+        from crewai_tools import SerperDevTool
+        env = self
+        original_run = SerperDevTool.__dict__.get("_run")
+
+        def _run(tool_self, *args, **kwargs):
+            env._count("search_calls")
+            key = _hash({"n": getattr(tool_self, "n_results", None), "args": args, "kwargs": kwargs})
+            if env.mode == "record":
+                result = original_run(tool_self, *args, **kwargs)
+                with env._lock:
+                    env.fixtures["search"][key] = result
+                return result
+
+            if env.search_latency:
+                time.sleep(env.search_latency)
+            if key in env.fixtures["search"]:
+                env._count("search_replayed")
+                return env.fixtures["search"][key]
+            env._count("search_canned")
+            return CANNED_SEARCH
+
+        self._patch(SerperDevTool, "_run", _run)
+
+    def _install_kickoff_timer(self):
+        from crewai import Crew
+        env = self
+        original_kickoff = Crew.__dict__["kickoff"]
+
+        def kickoff(crew_self, *args, **kwargs):
+            agents = getattr(crew_self, "agents", None) or []
+            label = getattr(agents[0], "role", "crew") if agents else "crew"
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            status = "done"
+            try:
+                return original_kickoff(crew_self, *args, **kwargs)
+            except Exception:
+                status = "failed"
+                raise
+            finally:
+                with env._lock:
+                    env.phases.append({
+                        "label": label,
+                        "thread": threading.current_thread().name,
+                        "wall_time": round(time.perf_counter() - wall_start, 4),
+                        "cpu_time": round(time.thread_time() - cpu_start, 4),
+                        "peak_rss_mb": round(peak_rss_mb(), 1),
+                        "status": status
+                    })
+
+        self._patch(Crew, "kickoff", kickoff)
+
+    def __enter__(self) -> "ReplayEnvironment":
+        self._install_llm()
+        self._install_search()
+        self._install_kickoff_timer()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for owner, attr, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+        self._patches.clear()
+        if self.mode == "record":
+            self.save_fixtures()
+        return False
+
+    # ------------------ 夹具与报告 ------------------
+
+    def save_fixtures(self):
+        """保存录制的夹具"""
+        os.makedirs(os.path.dirname(self.fixture_path), exist_ok=True)
+        with open(self.fixture_path, "w", encoding="utf-8") as f:
+            json.dump(self.fixtures, f, ensure_ascii=False, indent=1)
+        print(f"💾 [Replay] 夹具已保存: {self.fixture_path} "
+              f"(LLM {len(self.fixtures['llm'])} 条, 搜索 {len(self.fixtures['search'])} 条)")
+
+    def get_report(self) -> Dict[str, Any]:
+        """调用计数与各阶段耗时"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "counters": dict(self.counters),
+                "phases": list(self.phases)
+            }
@@ -8,10 +8,19 @@ config 包统一出口
 
 from .runtime_env import setup_runtime_env
 from .network import setup_network
-from .llm import get_deepseek_llm
+from .llm import get_deepseek_llm, get_guarded_llm, DeepSeekClient, deepseek_client
+from .llm_cache import LLMResponseCache, llm_cache
+from .embedding import EmbeddingService, embedding_service
 
 __all__ = [
     "setup_runtime_env",
     "setup_network",
-    "get_deepseek_llm"
+    "get_deepseek_llm",
+    "get_guarded_llm",
+    "DeepSeekClient",
+    "deepseek_client",
+    "LLMResponseCache",
+    "llm_cache",
+    "EmbeddingService",
+    "embedding_service"
 ]
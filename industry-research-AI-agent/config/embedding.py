@@ -0,0 +1,170 @@
+# config/embedding.py
+"""
+向量模型共享服务
+
+知识库（chromadb）和记忆系统（langchain_chroma）原来各自加载一份 BAAI/bge-m3，
+同一进程里常驻两份约 2GB 的模型。这里统一为进程内单例：
+
+- 懒加载：导入时不加载模型，第一次向量化（或预热）时才加载，且只加载一次
+- 预热：warm_up() 加载模型并跑一次推理，可在后台线程执行，不阻塞启动
+- 两个向量库通过各自的适配器（knowledge_engine / chroma_client）调用同一个模型，
+  编码参数与原来各自的实现保持一致，已入库的向量无需重建
+- 查询走 encode_queries()，经 LRU 查询向量缓存（config/embedding_cache.py），
+  重复查询不再做前向推理
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.embedding_cache import QueryEmbeddingCache
+
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+# 推理设备（cpu / cuda / mps），留空由 sentence-transformers 自动选择
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+# 单次前向推理的文本数
+EMBEDDING_ENCODE_BATCH = int(os.getenv("EMBEDDING_ENCODE_BATCH", "32"))
+# 启动时是否在后台预热模型
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+
+class EmbeddingService:
+    """
+    进程内共享的向量模型
+    线程安全：加载加锁，推理可并发调用
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, device: Optional[str] = EMBEDDING_DEVICE,
+                 batch_size: int = EMBEDDING_ENCODE_BATCH):
+        """
+        初始化服务（不加载模型）
+
+        Args:
+            model_name: sentence-transformers 模型名
+            device: 推理设备
+            batch_size: 单次前向推理的文本数
+        """
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+
+        self._model = None
+        self._lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self.query_cache = QueryEmbeddingCache(model_name)
+
+        self.stats = {"load_seconds": 0.0, "calls": 0, "texts": 0, "encode_seconds": 0.0}
+
+    # ------------------ 模型 ------------------
+
+    @property
+    def model(self):
+        """SentenceTransformer 实例（首次访问时加载）"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    print(f"🧠 [Embedding] 正在加载向量模型: {self.model_name} ...")
+                    started = time.perf_counter()
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+                    self.stats["load_seconds"] = round(time.perf_counter() - started, 2)
+                    print(f"✅ [Embedding] 模型已加载 ({self.stats['load_seconds']}s)")
+        return self._model
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def warm_up(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        预热：加载模型并执行一次推理（首次推理会初始化计算图与线程池）
+
+        Args:
+            background: 是否在后台线程执行（重复调用只启动一个线程）
+
+        Returns:
+            后台线程（background=True 时）
+        """
+        if not background:
+            self.encode(["warm up"])
+            return None
+
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(
+                    target=self._safe_warm_up, name="embedding-warmup", daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+
+    def _safe_warm_up(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"⚠️ [Embedding] 模型预热失败: {e}")
+
+    # ------------------ 推理 ------------------
+
+    def encode(self, texts: Sequence[str], normalize: bool = False) -> List[List[float]]:
+        """
+        文本向量化
+
+        Args:
+            texts: 文本列表
+            normalize: 是否做 L2 归一化（两个向量库原实现均未归一化，保持默认）
+
+        Returns:
+            List[List[float]]: 每条文本一个向量
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        model = self.model
+        started = time.perf_counter()
+        vectors = model.encode(texts, batch_size=self.batch_size,
+                               convert_to_numpy=True, normalize_embeddings=normalize)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["texts"] += len(texts)
+            self.stats["encode_seconds"] += elapsed
+        return vectors.tolist()
+
+    def encode_queries(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        查询向量化（带缓存）
+        命中的直接返回，未命中的合并为一次推理后写回缓存；文档入库请用 encode()
+
+        Args:
+            texts: 查询文本列表
+
+        Returns:
+            List[List[float]]: 每条查询一个向量，与输入顺序一致
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        found = self.query_cache.get_many(texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        if missing:
+            vectors = self.encode(missing)
+            self.query_cache.put_many(zip(missing, vectors))
+            found.update(zip(missing, vectors))
+        return [found[text] for text in texts]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取服务统计信息"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["model"] = self.model_name
+        stats["loaded"] = self.is_loaded
+        stats["encode_seconds"] = round(stats["encode_seconds"], 2)
+        stats["texts_per_sec"] = round(stats["texts"] / stats["encode_seconds"], 1) if stats["encode_seconds"] else 0.0
+        stats["query_cache"] = self.query_cache.get_stats()
+        return stats
+
+
+# 全局实例
+embedding_service = EmbeddingService()
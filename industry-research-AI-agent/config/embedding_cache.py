@@ -0,0 +1,197 @@
+# config/embedding_cache.py
+"""
+查询向量缓存（内存 LRU + 可选 SQLite 持久化）
+
+RAG 工具、记忆召回、查询改写产生的子查询反复出现同样的查询串，
+CPU 机器上每次查询的主要耗时就是 bge-m3 前向推理。这里缓存 查询串 → 向量：
+
+- 内存层：OrderedDict LRU，条目数上限 EMBEDDING_CACHE_SIZE
+- 磁盘层：EMBEDDING_CACHE_DISK=1 时开启，跨进程/跨次运行复用，按最久未访问淘汰
+- 只缓存查询（encode_queries），入库的文档切片不进入缓存，避免冲掉热点查询
+- 键包含模型名，换模型后旧向量自然失效
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# ===============================
+# 缓存位置（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(PROJECT_ROOT, "embedding_cache", "queries.sqlite"))
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_DISK = os.getenv("EMBEDDING_CACHE_DISK", "0") == "1"
+EMBEDDING_CACHE_DISK_MAX = int(os.getenv("EMBEDDING_CACHE_DISK_MAX", "50000"))
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class QueryEmbeddingCache:
+    """
+    查询向量缓存
+    内存层与磁盘层共用一把锁；磁盘层单个 SQLite 文件，多线程共享一个连接
+    """
+
+    def __init__(self, model_name: str, max_entries: int = EMBEDDING_CACHE_SIZE,
+                 disk: bool = EMBEDDING_CACHE_DISK, db_path: str = EMBEDDING_CACHE_PATH,
+                 disk_max_entries: int = EMBEDDING_CACHE_DISK_MAX):
+        """
+        初始化缓存
+
+        Args:
+            model_name: 向量模型名（参与缓存键）
+            max_entries: 内存层条目数上限（0 表示不缓存）
+            disk: 是否启用磁盘层
+            db_path: 磁盘层 SQLite 路径
+            disk_max_entries: 磁盘层条目数上限
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk = disk
+        self.db_path = db_path
+        self.disk_max_entries = disk_max_entries
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    # ------------------ 内部工具 ------------------
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时建库建表"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vectors (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_access ON vectors(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, vector: List[float]):
+        """写入内存层（调用方持锁）"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ------------------ 读写接口 ------------------
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        批量查询
+
+        Returns:
+            Dict[str, List[float]]: 命中的 文本 -> 向量（未命中的不在结果中）
+        """
+        if self.max_entries <= 0:
+            return {}
+        found: Dict[str, List[float]] = {}
+        to_disk: Dict[str, str] = {}
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                key = self._key(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+                    self.stats["hits"] += 1
+                else:
+                    to_disk[key] = text
+
+            if to_disk and self.disk:
+                conn = self._connect()
+                keys = list(to_disk)
+                marks = ",".join("?" * len(keys))
+                rows = conn.execute(f"SELECT key, vector FROM vectors WHERE key IN ({marks})", keys).fetchall()
+                for key, blob in rows:
+                    vector = _unpack(blob)
+                    found[to_disk.pop(key)] = vector
+                    self._remember(key, vector)
+                    self.stats["disk_hits"] += 1
+                if rows:
+                    now = time.time()
+                    conn.executemany("UPDATE vectors SET last_access = ? WHERE key = ?",
+                                     [(now, key) for key, _ in rows])
+                    conn.commit()
+            self.stats["misses"] += len(to_disk)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        """批量写入"""
+        if self.max_entries <= 0:
+            return
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vector in items:
+                key = self._key(text)
+                self._remember(key, vector)
+                rows.append((key, _pack(vector), now))
+
+            if rows and self.disk:
+                conn = self._connect()
+                conn.executemany("INSERT OR REPLACE INTO vectors (key, vector, last_access) VALUES (?, ?, ?)", rows)
+                total = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+                if total > self.disk_max_entries:
+                    conn.execute(
+                        "DELETE FROM vectors WHERE key IN "
+                        "(SELECT key FROM vectors ORDER BY last_access LIMIT ?)",
+                        (total - self.disk_max_entries,)
+                    )
+                conn.commit()
+
+    # ------------------ 统计与维护 ------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._memory)
+        hits = stats["hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = hits / total if total else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["disk"] = self.disk
+        return stats
+
+    def clear(self):
+        """清空缓存（含磁盘层）"""
+        with self._lock:
+            self._memory.clear()
+            if self.disk:
+                conn = self._connect()
+                conn.execute("DELETE FROM vectors")
+                conn.commit()
+        print("🧹 [EmbeddingCache] 查询向量缓存已清理")
@@ -1,15 +1,386 @@
 # config/llm.py
+"""
+LLM 配置与调用门面
 
+- 进程内共享一个 httpx 连接池（keep-alive），注入 litellm，所有 Agent 复用 TLS 连接；
+  异步客户端绑定事件循环，按事件循环各建一个
+- 全局并发信号量，防止并行阶段超出服务商限流
+- 所有工作流的 Agent 都通过 get_guarded_llm(model) 获取带并发控制/重试/缓存的 LLM 实例
+- 请求级超时 + 抖动指数退避重试
+- 同步 / 异步两条调用路径（DeepSeekClient.complete / acomplete）
+- 可选响应缓存（config.llm_cache，LLM_CACHE_ENABLED=1 开启）
+"""
+
+import asyncio
+import functools
 import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Union
+
 from crewai import LLM
 
+from config.llm_cache import llm_cache
+
+DEEPSEEK_MODEL = "openai/deepseek-chat"
+# Agent 未指定模型时的默认模型（与 CrewAI 自身的取值规则一致）
+AGENT_DEFAULT_MODEL = os.getenv("MODEL") or os.getenv("OPENAI_MODEL_NAME") or "gpt-4o-mini"
+
+# 单次请求超时（秒）
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "1800"))
+# 进程内同时在途的 LLM 请求上限
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# 失败重试次数（不含首次）
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# 退避基准与上限（秒）
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+
+# 可重试的异常类型（按类名匹配，兼容 litellm / openai / httpx 的不同版本）
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "Timeout",
+    "APITimeoutError",
+    "APIConnectionError",
+    "ServiceUnavailableError",
+    "InternalServerError",
+    "ConnectError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+}
+
+_llm_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_client_lock = threading.Lock()
+_http_clients: Dict[str, Any] = {}
+# 异步客户端按事件循环缓存（循环结束后自动释放）
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_shared_llm = None
+_guarded_llms: Dict[str, Any] = {}
+
+
+# ------------------ 连接池 ------------------
+
+def _http_options() -> Dict[str, Any]:
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONCURRENCY * 2,
+            max_keepalive_connections=LLM_MAX_CONCURRENCY,
+            keepalive_expiry=120
+        ),
+        "timeout": httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=15.0),
+    }
+
+
+def get_http_clients() -> Dict[str, Any]:
+    """
+    获取进程级共享的同步 httpx 客户端
+    首次调用时创建并注入 litellm，之后所有同步 litellm 请求复用同一连接池
+    代理设置沿用环境变量（config.network.setup_network）
+    """
+    with _client_lock:
+        if _http_clients:
+            return _http_clients
+
+        import httpx
+        import litellm
+
+        _http_clients["sync"] = httpx.Client(**_http_options())
+        litellm.client_session = _http_clients["sync"]
+
+        return _http_clients
+
+
+def get_async_http_client():
+    """
+    获取当前事件循环的异步 httpx 客户端并注入 litellm
+    httpx.AsyncClient 的连接绑定创建它的事件循环，每次 asyncio.run 都是新循环，
+    因此按循环各建一个；须在事件循环内调用
+    """
+    import httpx
+    import litellm
+
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**_http_options())
+            _async_clients[loop] = client
+        litellm.aclient_session = client
+    return client
+
+
+def _backoff_delay(attempt: int) -> float:
+    """抖动指数退避：base * 2^attempt，乘以 [0.5, 1.5) 随机因子"""
+    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _is_retryable(error: Exception) -> bool:
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def guarded_call(func, *args, max_retries: int = LLM_MAX_RETRIES, **kwargs):
+    """
+    在全局并发上限内执行一次 LLM 调用
+    可重试错误按抖动退避重试，退避等待期间不占用并发名额
+    """
+    for attempt in range(max_retries + 1):
+        with _llm_semaphore:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(attempt)
+                print(f"⚠️ [LLM] {type(e).__name__}，{delay:.1f}s 后第 {attempt + 1} 次重试")
+        time.sleep(delay)
+
+
+async def _acquire_slot():
+    """
+    在线程中等待全局信号量（与同步路径共用）
+    等待期间任务被取消时线程仍会拿到名额：由拿到名额的一方检查取消标记并归还，
+    不依赖事件循环回调（循环关闭后也不会泄漏名额）
+    """
+    lock = threading.Lock()
+    state = {"acquired": False, "abandoned": False}
+
+    def acquire():
+        _llm_semaphore.acquire()
+        with lock:
+            if state["abandoned"]:
+                _llm_semaphore.release()
+            else:
+                state["acquired"] = True
+
+    try:
+        await asyncio.to_thread(acquire)
+    except asyncio.CancelledError:
+        with lock:
+            state["abandoned"] = True
+            if state["acquired"]:
+                _llm_semaphore.release()
+        raise
+
+
+async def aguarded_call(func, *args, max_retries: int = LLM_MAX_RETRIES, **kwargs):
+    """guarded_call 的异步版本，与同步路径共享同一个全局信号量"""
+    for attempt in range(max_retries + 1):
+        await _acquire_slot()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ [LLM] {type(e).__name__}，{delay:.1f}s 后第 {attempt + 1} 次重试")
+        finally:
+            _llm_semaphore.release()
+        await asyncio.sleep(delay)
+
+
+# ------------------ 缓存键参数 ------------------
+
+# 与输出无关、不参与缓存键的参数
+_NON_GENERATION_PARAMS = {
+    "model", "temperature", "messages", "tools", "api_key", "timeout", "num_retries", "max_retries",
+    "callbacks", "available_functions", "from_task", "from_agent",
+}
+
+# CrewAI LLM 实例上影响输出的生成参数
+_LLM_GENERATION_ATTRS = (
+    "max_tokens", "max_completion_tokens", "top_p", "n", "stop", "presence_penalty",
+    "frequency_penalty", "logit_bias", "response_format", "seed", "logprobs", "top_logprobs",
+    "reasoning_effort", "base_url", "api_base",
+)
+
+
+def _generation_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """提取参与缓存键的生成参数（去掉 None 与无关参数；类型等对象按名称记录）"""
+    result = {}
+    for name, value in params.items():
+        if name in _NON_GENERATION_PARAMS or value is None:
+            continue
+        result[name] = getattr(value, "__name__", value) if isinstance(value, type) else value
+    return result
+
+
+# ------------------ CrewAI LLM ------------------
+
+def _tool_names(tools) -> List[str]:
+    """提取工具名（兼容 OpenAI function schema 和工具对象），参与缓存键"""
+    names = []
+    for tool in tools or []:
+        if isinstance(tool, dict):
+            names.append(tool.get("function", {}).get("name") or tool.get("name") or str(tool))
+        else:
+            names.append(getattr(tool, "name", str(tool)))
+    return names
+
+
+def _install_call_guard(llm):
+    """
+    为 CrewAI LLM 实例的 call 加上全局并发控制、退避重试和响应缓存
+    采用实例级包装而非子类化：新版 CrewAI 的 LLM(...) 可能按 provider 返回不同实现类
+    """
+    original_call = llm.call
+
+    @functools.wraps(original_call)
+    def call(*args, **kwargs):
+        messages = args[0] if args else kwargs.get("messages")
+        tools = kwargs.get("tools") if "tools" in kwargs else (args[1] if len(args) > 1 else None)
+        params = {name: getattr(llm, name, None) for name in _LLM_GENERATION_ATTRS}
+        params.update(kwargs)
+        return llm_cache.get_or_call(
+            getattr(llm, "model", DEEPSEEK_MODEL),
+            getattr(llm, "temperature", None),
+            messages,
+            lambda: guarded_call(original_call, *args, **kwargs),
+            tools=_tool_names(tools),
+            params=_generation_params(params)
+        )
+
+    llm.call = call
+    return llm
+
+
 def get_deepseek_llm():
-    return LLM(
-        model="openai/deepseek-chat",
-        base_url=os.getenv("DEEPSEEK_API_BASE"),
-        api_key=os.getenv("DEEPSEEK_API_KEY"),
-        temperature=0.3,
-        timeout=1800,
-        max_tokens=8000,
-        max_retries=3
-    )
+    """
+    获取 DeepSeek LLM（进程内单例）
+    所有 Agent 共享同一实例和底层连接池
+    """
+    global _shared_llm
+    if _shared_llm is not None:
+        return _shared_llm
+
+    get_http_clients()
+    with _client_lock:
+        if _shared_llm is None:
+            llm = LLM(
+                model=DEEPSEEK_MODEL,
+                base_url=os.getenv("DEEPSEEK_API_BASE"),
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+                temperature=0.3,
+                timeout=LLM_REQUEST_TIMEOUT,
+                max_tokens=8000,
+                # 重试由 guarded_call 统一负责，避免双重重试
+                max_retries=0
+            )
+            _shared_llm = _install_call_guard(llm)
+    return _shared_llm
+
+
+def get_guarded_llm(model: Optional[str] = None):
+    """
+    按模型名获取带并发控制、退避重试和响应缓存的 CrewAI LLM（每个模型一个进程内实例）
+    工作流 Agent 统一用它代替直接传模型名字符串（字符串会让 litellm 每次自建客户端，绕过限流）
+
+    Args:
+        model: 模型名；为空或为 DeepSeek 模型时返回 get_deepseek_llm()
+    """
+    if not model or model == DEEPSEEK_MODEL:
+        return get_deepseek_llm()
+
+    get_http_clients()
+    with _client_lock:
+        llm = _guarded_llms.get(model)
+        if llm is None:
+            llm = _install_call_guard(LLM(
+                model=model,
+                timeout=LLM_REQUEST_TIMEOUT,
+                # 重试由 guarded_call 统一负责，避免双重重试
+                max_retries=0
+            ))
+            _guarded_llms[model] = llm
+    return llm
+
+
+# ------------------ 直接调用门面 ------------------
+
+Messages = Union[str, List[Dict[str, str]]]
+
+
+class DeepSeekClient:
+    """
+    DeepSeek 调用门面
+    不经过 CrewAI，直接通过 litellm 调用；同步/异步共用连接池与并发上限
+    """
+
+    def __init__(self, model: str = DEEPSEEK_MODEL, temperature: float = 0.3,
+                 max_tokens: int = 8000, timeout: float = LLM_REQUEST_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def _build_params(self, messages: Messages, **overrides) -> Dict[str, Any]:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "api_base": os.getenv("DEEPSEEK_API_BASE"),
+            "api_key": os.getenv("DEEPSEEK_API_KEY"),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "timeout": self.timeout,
+            "num_retries": 0,
+        }
+        params.update(overrides)
+        return params
+
+    @staticmethod
+    def _content(response) -> str:
+        return response.choices[0].message.content or ""
+
+    def _cache_key(self, params: Dict[str, Any]) -> str:
+        return llm_cache.make_key(params["model"], params["temperature"], params["messages"],
+                                  params=_generation_params(params))
+
+    def complete(self, messages: Messages, timeout: Optional[float] = None, **kwargs) -> str:
+        """同步调用（启用缓存时相同请求直接返回历史响应）"""
+        import litellm
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        params = self._build_params(messages, **kwargs)
+
+        def call() -> str:
+            get_http_clients()
+            response = guarded_call(litellm.completion, max_retries=self.max_retries, **params)
+            return self._content(response)
+
+        return llm_cache.get_or_call(params["model"], params["temperature"], params["messages"], call,
+                                     params=_generation_params(params))
+
+    async def acomplete(self, messages: Messages, timeout: Optional[float] = None, **kwargs) -> str:
+        """异步调用，可在并行阶段中 asyncio.gather 多个请求"""
+        import litellm
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        params = self._build_params(messages, **kwargs)
+
+        key = self._cache_key(params) if llm_cache.enabled else None
+        if key:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                return cached
+
+        get_async_http_client()
+        response = await aguarded_call(
+            litellm.acompletion,
+            max_retries=self.max_retries,
+            **params
+        )
+        content = self._content(response)
+        if key and content.strip():
+            llm_cache.set(key, content, params["model"], params["temperature"])
+        return content
+
+
+# 全局实例
+deepseek_client = DeepSeekClient()
@@ -0,0 +1,215 @@
+# config/llm_cache.py
+"""
+LLM 响应缓存（SQLite）
+
+Prompt 完全由输入和上游输出决定，相同请求可直接复用历史响应：
+- 修改下游代码（如审核解析器）后重跑工作流，上游 LLM 调用零成本
+- 流水线回归基准可确定性重放
+
+缓存键 = sha256(model, temperature, 完整消息列表, 工具名, 其余生成参数)
+按总字节数淘汰最久未访问的条目；默认关闭，设置 LLM_CACHE_ENABLED=1 开启
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# ===============================
+# 缓存位置（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(PROJECT_ROOT, "llm_cache", "responses.sqlite"))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "0") == "1"
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+
+
+def _normalize_messages(messages: Any) -> List[Dict[str, Any]]:
+    """统一为消息列表（字符串视为单条 user 消息）"""
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return list(messages or [])
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存
+    单个 SQLite 文件，多线程共享一个连接（加锁串行化）
+    """
+
+    def __init__(self, db_path: str = LLM_CACHE_PATH,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 enabled: bool = LLM_CACHE_ENABLED):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite 文件路径
+            max_bytes: 响应总字节数上限
+            enabled: 是否启用
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    # ------------------ 内部工具 ------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时建库建表"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    temperature REAL,
+                    response TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], messages: Any,
+                 tools: Optional[List[str]] = None,
+                 params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            params: 其余影响输出的生成参数（max_tokens、stop、response_format 等），
+                    不应包含 api_key / timeout 等与输出无关的参数
+        """
+        payload = {
+            "model": model,
+            "temperature": temperature,
+            "messages": _normalize_messages(messages),
+            "tools": sorted(tools or []),
+            "params": params or {}
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """总大小超限时按最久未访问淘汰"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.stats["evictions"] += len(stale)
+
+    # ------------------ 读写接口 ------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中返回 None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key)
+            )
+            conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def set(self, key: str, response: str, model: str = "",
+            temperature: Optional[float] = None):
+        """写入缓存"""
+        if not self.enabled or not response:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, temperature, response, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, temperature, response, len(response.encode("utf-8")), now, now)
+            )
+            self.stats["writes"] += 1
+            self._evict(conn)
+            conn.commit()
+
+    def get_or_call(self, model: str, temperature: Optional[float], messages: Any,
+                    call: Callable[[], Any], tools: Optional[List[str]] = None,
+                    params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        先查缓存，未命中时执行 call 并写回
+        只缓存非空字符串响应；未启用时直接执行 call
+        """
+        if not self.enabled:
+            return call()
+
+        key = self.make_key(model, temperature, messages, tools, params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        response = call()
+        if isinstance(response, str) and response.strip():
+            self.set(key, response, model, temperature)
+        return response
+
+    # ------------------ 统计与维护 ------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        stats["enabled"] = self.enabled
+        if self.enabled:
+            with self._lock:
+                entries, size = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            stats["entries"] = entries
+            stats["total_bytes"] = size
+        return stats
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+        print("🧹 [LLMCache] LLM 响应缓存已清理")
+
+
+# 全局实例
+llm_cache = LLMResponseCache()
@@ -0,0 +1,272 @@
+# ingestion/artifact_store.py
+"""
+PDF 解析结果存储（按内容哈希）
+
+同一份 PDF 只解析一次：逐页文本 + 表格写入 gzip 压缩的 JSON Lines，
+之后知识库入库、记忆入库、PDF 阅读工具、会议纪要工具都直接读取该文件
+
+文件格式（每行一页）：
+    {"p": 页码, "t": 文本, "tb": 表格, "e": 错误}
+旁边的 .idx.json 记录每页在解压后数据流中的偏移和长度，
+按页读取时直接定位，只解码请求的页面
+写入先落临时文件，完整写完再原子重命名，中断不会留下半个文件
+"""
+
+import gzip
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ingestion.ingest_manifest import file_sha256
+from ingestion.pdf_parser import PageRecord, iter_page_records, parse_pdf_parallel
+
+
+# ===============================
+# 存储位置（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+PDF_ARTIFACT_DIR = os.getenv("PDF_ARTIFACT_DIR", os.path.join(PROJECT_ROOT, "pdf_artifacts"))
+
+PDF_ARTIFACT_ENABLED = os.getenv("PDF_ARTIFACT_ENABLED", "1") == "1"
+
+
+def _encode(record: PageRecord) -> bytes:
+    row: Dict[str, Any] = {"p": record.page_number, "t": record.text}
+    if record.tables:
+        row["tb"] = record.tables
+    if record.error:
+        row["e"] = record.error
+    return (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _decode(line: bytes) -> PageRecord:
+    row = json.loads(line)
+    return PageRecord(page_number=row["p"], text=row.get("t", ""),
+                      tables=row.get("tb", []), error=row.get("e", ""))
+
+
+def _index_path(artifact_path: str) -> str:
+    return artifact_path[:-len(".jsonl.gz")] + ".idx.json"
+
+
+class _ArtifactWriter:
+    """逐页写入并记录页偏移；close(commit=True) 时原子落盘（先索引后数据）"""
+
+    def __init__(self, final_path: str):
+        self.final_path = final_path
+        self.tmp_path = f"{final_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = gzip.open(self.tmp_path, "wb")
+        self._offset = 0
+        self.pages: List[List[int]] = []  # [页码, 偏移, 长度]
+
+    def write(self, record: PageRecord):
+        data = _encode(record)
+        self._file.write(data)
+        self.pages.append([record.page_number, self._offset, len(data)])
+        self._offset += len(data)
+
+    def close(self, commit: bool = True):
+        self._file.close()
+        if not commit:
+            os.remove(self.tmp_path)
+            return
+        _write_index(_index_path(self.final_path), self.pages)
+        os.replace(self.tmp_path, self.final_path)
+
+
+def _write_index(path: str, pages: List[List[int]]):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pages": pages}, f)
+    os.replace(tmp_path, path)
+
+
+class ParsedDocumentStore:
+    """
+    PDF 解析结果存储
+    文件内容哈希按 (路径, mtime, 大小) 在内存中复用，文件未变化时不重新计算
+    """
+
+    def __init__(self, base_dir: str = PDF_ARTIFACT_DIR, enabled: bool = PDF_ARTIFACT_ENABLED):
+        """
+        初始化存储
+
+        Args:
+            base_dir: 存储目录
+            enabled: 是否启用（关闭时每次都重新解析）
+        """
+        self.base_dir = base_dir
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._hash_index: Dict[str, Tuple[int, int, str]] = {}  # 文件路径 -> (mtime_ns, size, 内容哈希)
+
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    # ------------------ 内部工具 ------------------
+
+    def content_hash(self, file_path: str) -> str:
+        """文件内容哈希；mtime 和大小未变时复用上次结果"""
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        with self._lock:
+            cached = self._hash_index.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = file_sha256(key)
+        with self._lock:
+            self._hash_index[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def artifact_path(self, content_hash: str) -> str:
+        # 两级目录，避免单目录文件过多
+        return os.path.join(self.base_dir, content_hash[:2], f"{content_hash}.jsonl.gz")
+
+    def has(self, content_hash: str) -> bool:
+        return self.enabled and os.path.exists(self.artifact_path(content_hash))
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _open_writer(self, content_hash: str) -> _ArtifactWriter:
+        final_path = self.artifact_path(content_hash)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        return _ArtifactWriter(final_path)
+
+    # ------------------ 读写接口 ------------------
+
+    def read(self, content_hash: str) -> Iterator[PageRecord]:
+        """流式读取已存储的页面"""
+        with gzip.open(self.artifact_path(content_hash), "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield _decode(line)
+
+    def page_index(self, content_hash: str) -> Dict[int, Tuple[int, int]]:
+        """
+        页码 -> (偏移, 长度)
+        旧版存储没有索引文件时扫描一遍补建
+        """
+        index_path = _index_path(self.artifact_path(content_hash))
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except (OSError, ValueError, KeyError):
+            pages, offset = [], 0
+            with gzip.open(self.artifact_path(content_hash), "rb") as f:
+                for line in f:
+                    if line.strip():
+                        pages.append([json.loads(line)["p"], offset, len(line)])
+                    offset += len(line)
+            _write_index(index_path, pages)
+        return {page: (offset, length) for page, offset, length in pages}
+
+    def read_pages(self, content_hash: str, page_numbers: Iterable[int]) -> List[PageRecord]:
+        """
+        按页码读取（跳过未请求页面的 JSON 解码）
+
+        Args:
+            content_hash: 内容哈希
+            page_numbers: 页码（从 1 开始），不存在的页码忽略
+
+        Returns:
+            List[PageRecord]: 按页码排序
+        """
+        index = self.page_index(content_hash)
+        wanted = sorted({p for p in page_numbers if p in index}, key=lambda p: index[p][0])
+        records = []
+        with gzip.open(self.artifact_path(content_hash), "rb") as f:
+            for page in wanted:
+                offset, length = index[page]
+                f.seek(offset)
+                records.append(_decode(f.read(length)))
+        return records
+
+    def put(self, content_hash: str, records: Iterable[PageRecord]):
+        """写入完整的解析结果"""
+        if not self.enabled:
+            return
+        writer = self._open_writer(content_hash)
+        try:
+            for record in records:
+                writer.write(record)
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        writer.close()
+        self._count("writes")
+
+    def _tee(self, content_hash: str, records: Iterable[PageRecord]) -> Iterator[PageRecord]:
+        """边产出边写入；只有完整遍历后才落盘，中途放弃时丢弃临时文件"""
+        writer = self._open_writer(content_hash)
+        try:
+            for record in records:
+                writer.write(record)
+                yield record
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        writer.close()
+        self._count("writes")
+
+    def iter_pages(self, file_path: str, content_hash: Optional[str] = None,
+                   parallel: bool = False, max_workers: Optional[int] = None) -> Iterator[PageRecord]:
+        """
+        按页码顺序产出页面：已存储时读文件，否则解析 PDF 并同时写入存储
+
+        Args:
+            file_path: PDF 路径
+            content_hash: 已知的内容哈希（避免重复计算）
+            parallel: 未命中时是否按页码区间多进程解析
+            max_workers: 并行解析的进程数
+        """
+        if not self.enabled:
+            if parallel:
+                return iter(parse_pdf_parallel(file_path, max_workers=max_workers))
+            return iter_page_records(file_path)
+
+        content_hash = content_hash or self.content_hash(file_path)
+        if self.has(content_hash):
+            self._count("hits")
+            return self.read(content_hash)
+
+        self._count("misses")
+        if parallel:
+            records: Iterable[PageRecord] = parse_pdf_parallel(file_path, max_workers=max_workers)
+        else:
+            records = iter_page_records(file_path)
+        return self._tee(content_hash, records)
+
+    def load(self, file_path: str, content_hash: Optional[str] = None,
+             parallel: bool = False, max_workers: Optional[int] = None) -> List[PageRecord]:
+        """读取整个文档的页面列表"""
+        return list(self.iter_pages(file_path, content_hash, parallel, max_workers))
+
+    # ------------------ 统计与维护 ------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+    def clear(self):
+        """清空已存储的解析结果"""
+        import shutil
+
+        if os.path.exists(self.base_dir):
+            shutil.rmtree(self.base_dir)
+        with self._lock:
+            self._hash_index.clear()
+        print("🧹 [ArtifactStore] PDF 解析结果已清理")
+
+
+# 全局实例
+artifact_store = ParsedDocumentStore()
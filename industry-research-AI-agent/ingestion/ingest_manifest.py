@@ -0,0 +1,217 @@
+# ingestion/ingest_manifest.py
+"""
+文档入库清单（基于内容哈希的增量入库）
+
+记录每个已入库文档的内容哈希和切片ID：
+- 内容未变（含同一文件改名/另存）→ 跳过
+- 内容变化 → 新切片写入后删除旧切片ID
+- 文件已删除 → 删除对应切片（reindex 时）
+- 同内容并发入库 → 按内容哈希预留，首个文件入库，其余等待后登记为别名
+
+清单以 JSON 存放在向量库目录旁，每个向量库一份
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """流式计算文件内容哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(id_prefix: str, count: int) -> List[str]:
+    """根据前缀和切片数还原切片ID（清单只存前缀和数量）"""
+    return [f"{id_prefix}_{i}" for i in range(count)]
+
+
+@dataclass
+class IngestPlan:
+    """单个文件的入库计划"""
+    file_key: str  # 文件绝对路径
+    content_hash: str
+    status: str  # new | changed | unchanged | duplicate | pending
+    id_prefix: str = ""  # 新切片ID前缀
+    stale_ids: List[str] = field(default_factory=list)  # 新切片写入后需删除的旧ID
+
+    @property
+    def needs_ingest(self) -> bool:
+        return self.status in ("new", "changed")
+
+
+class IngestManifest:
+    """
+    入库清单
+    documents: content_hash -> {id_prefix, chunks, files, ingested_at}
+    files: 文件绝对路径 -> content_hash
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict[str, Any]] = {"documents": {}, "files": {}}
+        # 入库中的内容：content_hash -> (文件, 完成事件)，commit/release 时释放
+        self._pending: Dict[str, Tuple[str, threading.Event]] = {}
+
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                self.data["documents"].update(loaded.get("documents", {}))
+                self.data["files"].update(loaded.get("files", {}))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ [IngestManifest] 清单读取失败，将重建: {e}")
+
+    def _save(self):
+        """原子写入"""
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def file_key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def plan(self, file_path: str, id_namespace: str = "", wait: bool = True) -> IngestPlan:
+        """
+        判断文件是否需要入库
+        需要入库（new/changed）时按内容哈希预留，入库结束后须 commit 或 release；
+        同内容已被其他文件预留时等待其结束，随后按别名（duplicate）登记
+
+        Args:
+            file_path: 文件路径
+            id_namespace: 切片ID命名空间（默认用文件名）
+            wait: 同内容正在入库时是否等待；False 时直接返回 pending 计划
+        """
+        key = self.file_key(file_path)
+        content_hash = file_sha256(file_path)
+        namespace = id_namespace or os.path.basename(file_path)
+
+        while True:
+            with self._lock:
+                pending = self._pending.get(content_hash)
+                if pending is None:
+                    plan = self._plan_locked(key, content_hash, namespace)
+                    if plan.needs_ingest:
+                        self._pending[content_hash] = (key, threading.Event())
+                    return plan
+                if not wait:
+                    return IngestPlan(key, content_hash, "pending")
+            print(f"⏳ [IngestManifest] 同内容文件正在入库，等待: {os.path.basename(pending[0])}")
+            pending[1].wait()
+
+    def _plan_locked(self, key: str, content_hash: str, namespace: str) -> IngestPlan:
+        """生成入库计划（调用方持锁）"""
+        old_hash = self.data["files"].get(key)
+
+        # 文件内容变了：旧内容没有被其他文件引用时，其切片需要删除
+        stale_ids: List[str] = []
+        old_doc = self.data["documents"].get(old_hash) if old_hash != content_hash else None
+        if old_doc and all(f == key for f in old_doc["files"]):
+            stale_ids = chunk_ids(old_doc["id_prefix"], old_doc["chunks"])
+
+        if content_hash in self.data["documents"]:
+            status = "unchanged" if old_hash == content_hash else "duplicate"
+            return IngestPlan(key, content_hash, status, stale_ids=stale_ids)
+
+        return IngestPlan(
+            file_key=key,
+            content_hash=content_hash,
+            status="changed" if old_hash else "new",
+            id_prefix=f"{namespace}_{content_hash[:12]}",
+            stale_ids=stale_ids
+        )
+
+    def _release_locked(self, plan: IngestPlan):
+        """释放该计划的内容预留并唤醒等待者（调用方持锁）"""
+        pending = self._pending.get(plan.content_hash)
+        if pending is not None and pending[0] == plan.file_key:
+            del self._pending[plan.content_hash]
+            pending[1].set()
+
+    def release(self, plan: IngestPlan):
+        """入库失败或放弃时释放内容预留（可重复调用），等待者将重新规划"""
+        with self._lock:
+            self._release_locked(plan)
+
+    def commit(self, plan: IngestPlan, chunks: int = 0):
+        """
+        记录入库结果
+        new/changed：登记新内容并释放预留；duplicate：只登记文件别名
+        """
+        with self._lock:
+            try:
+                docs = self.data["documents"]
+                old_hash = self.data["files"].get(plan.file_key)
+
+                if plan.needs_ingest:
+                    docs[plan.content_hash] = {
+                        "id_prefix": plan.id_prefix,
+                        "chunks": chunks,
+                        "files": [],
+                        "ingested_at": datetime.datetime.now().isoformat(timespec="seconds")
+                    }
+                entry = docs[plan.content_hash]
+                if plan.file_key not in entry["files"]:
+                    entry["files"].append(plan.file_key)
+
+                # 文件从旧内容迁移到新内容
+                if old_hash and old_hash != plan.content_hash:
+                    self._detach(plan.file_key, old_hash)
+                self.data["files"][plan.file_key] = plan.content_hash
+                self._save()
+            finally:
+                self._release_locked(plan)
+
+    def _detach(self, file_key: str, content_hash: str) -> List[str]:
+        """解除文件与内容的关联；内容不再被引用时删除记录并返回其切片ID"""
+        doc = self.data["documents"].get(content_hash)
+        if not doc:
+            return []
+        if file_key in doc["files"]:
+            doc["files"].remove(file_key)
+        if doc["files"]:
+            return []
+        del self.data["documents"][content_hash]
+        return chunk_ids(doc["id_prefix"], doc["chunks"])
+
+    def remove_missing(self, folder: Optional[str] = None) -> List[str]:
+        """
+        移除磁盘上已不存在的文件
+
+        Args:
+            folder: 只检查该目录下的文件（None 表示全部）
+
+        Returns:
+            List[str]: 需要从向量库删除的切片ID
+        """
+        prefix = os.path.join(os.path.abspath(folder), "") if folder else ""
+        stale_ids: List[str] = []
+        with self._lock:
+            for key in list(self.data["files"]):
+                if prefix and not key.startswith(prefix):
+                    continue
+                if os.path.exists(key):
+                    continue
+                stale_ids.extend(self._detach(key, self.data["files"].pop(key)))
+            self._save()
+        return stale_ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self.data["documents"]),
+                "files": len(self.data["files"]),
+                "chunks": sum(d["chunks"] for d in self.data["documents"].values())
+            }
@@ -0,0 +1,279 @@
+# ingestion/keyword_index.py
+"""
+关键词倒排索引（BM25）
+
+向量召回对"CR5 2024"、"毛利率 35.2%"这类精确数字/实体查询不稳定：
+数字和缩写在 embedding 空间里区分度低，top-k 里可能根本没有目标片段。
+这里为知识库切片维护一份 SQLite 倒排索引，与 Chroma 同步写入/删除：
+
+    docs(id, chunk_id, source, page, length, content, meta)
+    postings(term, doc, tf)
+
+- 分词：英文/数字整词（小写，去千分位），中文按字二元组（孤立单字保留为一元），
+  不依赖分词词典，索引与查询使用同一规则
+- 打分：BM25（k1=1.2, b=0.75）乘以查询词覆盖率（命中词数 / 查询词数），
+  在 SQLite 内按词项聚合，只返回 top-k；
+  查询中有稀有词时只用稀有词圈定候选切片，再对候选按全部查询词打分，
+  精确数字/实体查询不必扫描高频词的长倒排表
+- 增量：add/delete 以切片ID为单位，入库、回滚、删除文件时与向量库同步
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# ===============================
+# 索引位置（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+KEYWORD_INDEX_PATH = os.getenv(
+    "KEYWORD_INDEX_PATH", os.path.join(PROJECT_ROOT, "keyword_index", "knowledge_base.sqlite"))
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 出现在超过该比例切片中的词视为高频词
+COMMON_TERM_RATIO = float(os.getenv("KEYWORD_COMMON_TERM_RATIO", "0.3"))
+
+# 英文/数字整词（含小数）与连续中文
+_TOKEN_RE = re.compile(r"(?P<word>[a-z0-9]+(?:\.[0-9]+)?)|(?P<cjk>[\u4e00-\u9fff]+)")
+# 千分位逗号：2,850 → 2850
+_THOUSANDS_RE = re.compile(r"(?<=\d)[,，](?=\d{3}(?!\d))")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    中英文混合分词
+
+    Examples:
+        "CR5约为58%" -> ["cr5", "约为", "58"]
+        "2024年营收2,850亿元" -> ["2024", "年营", "营收", "2850", "亿元"]
+    """
+    text = _THOUSANDS_RE.sub("", text.lower())
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        word = match.group("word")
+        if word:
+            tokens.append(word)
+            continue
+        run = match.group("cjk")
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class KeywordIndex:
+    """
+    BM25 倒排索引（SQLite）
+    单个文件，多线程共享一个连接（加锁串行化）
+    """
+
+    def __init__(self, db_path: str = KEYWORD_INDEX_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._corpus_stats: Optional[tuple] = None  # (文档数, 平均长度)，写入后失效
+
+    # ------------------ 内部工具 ------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时建库建表"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    chunk_id TEXT UNIQUE,
+                    source TEXT,
+                    page INTEGER,
+                    length INTEGER,
+                    content TEXT,
+                    meta TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT,
+                    doc INTEGER,
+                    tf INTEGER,
+                    PRIMARY KEY (term, doc)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _delete_locked(conn: sqlite3.Connection, ids: Sequence[str], batch_size: int = 500) -> int:
+        removed = 0
+        for start in range(0, len(ids), batch_size):
+            batch = list(ids[start:start + batch_size])
+            marks = ",".join("?" * len(batch))
+            docs = [row[0] for row in conn.execute(
+                f"SELECT id FROM docs WHERE chunk_id IN ({marks})", batch)]
+            if not docs:
+                continue
+            doc_marks = ",".join("?" * len(docs))
+            conn.execute(f"DELETE FROM postings WHERE doc IN ({doc_marks})", docs)
+            conn.execute(f"DELETE FROM docs WHERE id IN ({doc_marks})", docs)
+            removed += len(docs)
+        return removed
+
+    def _stats_locked(self, conn: sqlite3.Connection) -> tuple:
+        if self._corpus_stats is None:
+            count, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            self._corpus_stats = (count, avg_length or 0.0)
+        return self._corpus_stats
+
+    # ------------------ 写入 ------------------
+
+    def add(self, ids: Sequence[str], documents: Sequence[str],
+            metadatas: Optional[Sequence[Dict[str, Any]]] = None) -> int:
+        """
+        写入一批切片（同ID已存在时覆盖）
+
+        Args:
+            ids: 切片ID（与向量库一致）
+            documents: 切片文本
+            metadatas: 切片元数据（source / page 单独建列，其余原样保存）
+
+        Returns:
+            int: 写入的切片数
+        """
+        if not ids:
+            return 0
+        metadatas = metadatas or [{}] * len(ids)
+
+        with self._lock:
+            conn = self._connect()
+            self._delete_locked(conn, ids)
+            for chunk_id, content, meta in zip(ids, documents, metadatas):
+                meta = meta or {}
+                terms = Counter(tokenize(content))
+                cursor = conn.execute(
+                    "INSERT INTO docs (chunk_id, source, page, length, content, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                    (chunk_id, meta.get("source", ""), meta.get("page"), sum(terms.values()),
+                     content, json.dumps(meta, ensure_ascii=False))
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()]
+                )
+            conn.commit()
+            self._corpus_stats = None
+        return len(ids)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """按切片ID删除，返回删除数"""
+        if not ids:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            removed = self._delete_locked(conn, ids)
+            conn.commit()
+            if removed:
+                self._corpus_stats = None
+        return removed
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM docs")
+            conn.commit()
+            self._corpus_stats = None
+        print("🧹 [KeywordIndex] 关键词索引已清空")
+
+    # ------------------ 查询 ------------------
+
+    def search(self, query: str, k: int = 10, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 检索
+
+        Args:
+            query: 查询文本
+            k: 返回数量
+            source: 只在文件名包含该关键词的切片中检索
+
+        Returns:
+            List[Dict]: id、content、source、page、metadata、score，按分数降序
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            conn = self._connect()
+            total, avg_length = self._stats_locked(conn)
+            if not total:
+                return []
+
+            marks = ",".join("?" * len(terms))
+            df = dict(conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({marks}) GROUP BY term", terms))
+            weights = [(term, math.log(1 + (total - n + 0.5) / (n + 0.5))) for term, n in df.items()]
+            if not weights:
+                return []
+
+            values = ",".join(["(?, ?)"] * len(weights))
+            params: List[Any] = [x for pair in weights for x in pair]
+            # 高频词（如"公司"、"2024"）倒排表很长：有更稀有的词时只用稀有词圈定候选切片，
+            # 候选仍按全部查询词打分；高频词 idf 接近 0，由覆盖率保证命中全部查询词的切片排在前面
+            rare = [term for term, n in df.items() if n <= total * COMMON_TERM_RATIO]
+            if rare:
+                params.extend(rare)
+                ctes = f", cand(doc) AS (SELECT DISTINCT doc FROM postings WHERE term IN ({','.join('?' * len(rare))}))"
+                joins = ("FROM cand CROSS JOIN q JOIN postings p ON p.term = q.term AND p.doc = cand.doc "
+                         "JOIN docs d ON d.id = p.doc ")
+            else:
+                ctes = ""
+                joins = "FROM q JOIN postings p ON p.term = q.term JOIN docs d ON d.id = p.doc "
+            params.extend([BM25_K1 + 1, BM25_K1, 1 - BM25_B, BM25_B / avg_length, len(weights)])
+            where = ""
+            if source:
+                where = "WHERE d.source LIKE ?"
+                params.append(f"%{source}%")
+            params.append(k)
+            sql = (
+                f"WITH q(term, idf) AS (VALUES {values}){ctes} "
+                "SELECT d.chunk_id, d.content, d.source, d.page, d.meta, "
+                "SUM(q.idf * p.tf * ? / (p.tf + ? * (? + ? * d.length))) * COUNT(*) / ? AS score "
+                f"{joins}{where} GROUP BY d.id ORDER BY score DESC LIMIT ?"
+            )
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            {"id": chunk_id, "content": content, "source": source_name, "page": page,
+             "metadata": json.loads(meta) if meta else {}, "score": score}
+            for chunk_id, content, source_name, page, meta, score in rows
+        ]
+
+    def count(self) -> int:
+        """已索引的切片数"""
+        with self._lock:
+            return self._stats_locked(self._connect())[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        with self._lock:
+            conn = self._connect()
+            docs, avg_length = self._stats_locked(conn)
+            terms = conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+        return {"chunks": docs, "terms": terms, "avg_length": round(avg_length, 1)}
+
+
+# 全局实例
+keyword_index = KeywordIndex()
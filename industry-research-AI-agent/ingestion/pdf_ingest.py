@@ -1,24 +1,26 @@
 # ingestion/pdf_ingest.py
 # PDF → 原始文本 + 表格文本
-import pdfplumber
+from ingestion.artifact_store import artifact_store
 
 class PDFIngestor:
     # 原 knowledge_engine.py 中的 PDF 解析逻辑
-    def ingest(self, file_path: str) -> str:
-        full_text = ""
+    def iter_pages(self, file_path: str, parallel: bool = False, max_workers: int = None,
+                   content_hash: str = None):
+        # 逐页产出 (页码, 文本+表格文本)，大文档入库时不必拼出全文
+        # 同一内容只解析一次，之后直接读取解析结果
+        # parallel=True 时按页码区间多进程解析，结果仍按页码顺序产出
+        for record in artifact_store.iter_pages(file_path, content_hash, parallel, max_workers):
+            parts = []
+            if record.text:
+                parts.append(record.text + "\n")
 
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-
-                # 原有表格提取逻辑
-                tables = page.extract_tables()
-                for table in tables:
-                    for row in table:
-                        full_text += " | ".join(row) + "\n"
-
-        return full_text
+            # 原有表格提取逻辑
+            for table in record.tables:
+                for row in table:
+                    parts.append(" | ".join(row) + "\n")
 
+            yield record.page_number, "".join(parts)
 
+    def ingest(self, file_path: str, parallel: bool = False, max_workers: int = None,
+               content_hash: str = None) -> str:
+        return "".join(text for _, text in self.iter_pages(file_path, parallel, max_workers, content_hash))
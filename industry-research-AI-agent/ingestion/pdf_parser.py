@@ -0,0 +1,217 @@
+# ingestion/pdf_parser.py
+"""
+PDF 页面解析（支持多进程并行）
+
+pdfplumber 的文本/表格提取是纯 CPU 计算且单核执行，
+大批量研报入库时可按以下两种方式并行：
+1. 单文档分片 - 把页码区间分给进程池，结果按页码顺序合并
+2. 多文档并行 - 整个文档交给一个进程，按文件产出结果
+
+各消费者（KnowledgeBaseManager / PDFIngestor / EnhancedPDFProcessor）
+只依赖 PageRecord，表格如何转文本由消费者决定
+"""
+
+import gc
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+# 并行解析的进程数（默认 CPU 核数）
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# 页数少于该值的文档直接串行解析（进程启动与序列化开销不划算）
+MIN_PAGES_FOR_PARALLEL = int(os.getenv("PDF_MIN_PAGES_FOR_PARALLEL", "16"))
+
+# 逐页解析的内存增量上限（MB，相对开始解析时的 RSS）；超过后关闭并重新打开文档，
+# 释放 pdfminer 在文档级累积的对象缓存。0 表示不限制
+# （按增量而非绝对值计算：Streamlit 进程里 embedding 模型本身就占数 GB）
+PDF_MEMORY_CEILING_MB = int(os.getenv("PDF_MEMORY_CEILING_MB", "512"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass
+class PageRecord:
+    """单页解析结果"""
+    page_number: int  # 从 1 开始
+    text: str = ""
+    tables: List[List[List[str]]] = field(default_factory=list)  # 单元格 None 已替换为 ""
+    error: str = ""
+
+
+def _release_page(page):
+    """释放 pdfplumber 的页面缓存（对象/字符缓存会随页数累积）"""
+    release = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+    if release:
+        release()
+
+
+def _parse_page(page, page_number: int, with_tables: bool = True) -> PageRecord:
+    """解析单页；单页失败不影响其他页"""
+    record = PageRecord(page_number=page_number)
+    try:
+        record.text = page.extract_text() or ""
+        if with_tables:
+            record.tables = [
+                [[str(cell) if cell is not None else "" for cell in row] for row in table]
+                for table in page.extract_tables()
+            ]
+    except Exception as e:
+        record.error = str(e)
+    finally:
+        _release_page(page)
+    return record
+
+
+def current_rss_mb() -> float:
+    """进程当前常驻内存（MB）；无法获取时返回 0（Linux 读取 /proc/self/statm）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def count_pages(file_path: str) -> int:
+    """获取PDF页数"""
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_page_records(file_path: str, with_tables: bool = True,
+                      start: int = 0, end: Optional[int] = None,
+                      memory_ceiling_mb: Optional[int] = None) -> Iterator[PageRecord]:
+    """
+    逐页解析（串行、流式）
+    每页解析后立即释放页面缓存；RSS 增量超过上限时重新打开文档，
+    内存占用与总页数无关
+
+    Args:
+        file_path: PDF 路径
+        with_tables: 是否提取表格
+        start: 起始页下标（从 0 开始，含）
+        end: 结束页下标（不含），None 表示到末页
+        memory_ceiling_mb: 内存增量上限（MB），默认 PDF_MEMORY_CEILING_MB，0 表示不限制
+    """
+    import pdfplumber
+
+    ceiling = PDF_MEMORY_CEILING_MB if memory_ceiling_mb is None else memory_ceiling_mb
+    baseline = current_rss_mb()
+    index = start
+    while True:
+        with pdfplumber.open(file_path) as pdf:
+            stop = len(pdf.pages) if end is None else min(end, len(pdf.pages))
+            reopen = False
+            while index < stop:
+                record = _parse_page(pdf.pages[index], index + 1, with_tables)
+                index += 1
+                yield record
+                if ceiling and index < stop and current_rss_mb() - baseline > ceiling:
+                    reopen = True
+                    break
+        if not reopen:
+            return
+        # 文档对象连同其缓存一起丢弃后再继续；
+        # 分配器不一定把内存还给系统，以重开后的 RSS 作为新基线，避免逐页反复重开
+        gc.collect()
+        baseline = current_rss_mb()
+
+
+def _parse_page_range(task: Tuple[str, int, int, bool]) -> List[PageRecord]:
+    """进程池任务：解析一个页码区间（每个进程独立打开文件）"""
+    file_path, start, end, with_tables = task
+    return list(iter_page_records(file_path, with_tables, start, end))
+
+
+def _parse_whole_file(task: Tuple[str, bool]) -> List[PageRecord]:
+    """进程池任务：解析整个文件"""
+    file_path, with_tables = task
+    return list(iter_page_records(file_path, with_tables))
+
+
+def parse_pdf(file_path: str, with_tables: bool = True) -> List[PageRecord]:
+    """串行解析整个文档"""
+    return list(iter_page_records(file_path, with_tables))
+
+
+def parse_pdf_parallel(file_path: str, max_workers: Optional[int] = None,
+                       pages_per_task: Optional[int] = None,
+                       with_tables: bool = True) -> List[PageRecord]:
+    """
+    单文档按页码区间分片并行解析
+
+    Args:
+        file_path: PDF 路径
+        max_workers: 进程数，默认 PDF_PARSE_WORKERS
+        pages_per_task: 每个任务的页数，默认按进程数均分（每进程约 2 个任务，便于负载均衡）
+        with_tables: 是否提取表格
+
+    Returns:
+        List[PageRecord]: 按页码排序的解析结果
+    """
+    max_workers = max_workers or PDF_PARSE_WORKERS
+    total = count_pages(file_path)
+    if max_workers <= 1 or total < MIN_PAGES_FOR_PARALLEL:
+        return parse_pdf(file_path, with_tables)
+
+    pages_per_task = pages_per_task or max(4, math.ceil(total / (max_workers * 2)))
+    tasks = [(file_path, start, min(start + pages_per_task, total), with_tables)
+             for start in range(0, total, pages_per_task)]
+
+    records: List[PageRecord] = []
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        # map 保持任务顺序，区间拼接即为页码顺序
+        for chunk in executor.map(_parse_page_range, tasks):
+            records.extend(chunk)
+    return records
+
+
+def parse_folder_parallel(file_paths: Iterable[str], max_workers: Optional[int] = None,
+                          with_tables: bool = True) -> Iterator[Tuple[str, List[PageRecord], Optional[Exception]]]:
+    """
+    多文档并行解析（每个文档一个进程任务）
+    按完成顺序产出，调用方可以边解析边入库
+
+    Args:
+        file_paths: PDF 路径列表
+        max_workers: 进程数，默认 PDF_PARSE_WORKERS
+        with_tables: 是否提取表格
+
+    Yields:
+        (文件路径, 按页码排序的解析结果, 异常或 None)
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return
+    max_workers = max_workers or PDF_PARSE_WORKERS
+
+    if max_workers <= 1 or len(file_paths) == 1:
+        for path in file_paths:
+            try:
+                yield path, parse_pdf(path, with_tables), None
+            except Exception as e:
+                yield path, [], e
+        return
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(file_paths))) as executor:
+        futures = {executor.submit(_parse_whole_file, (path, with_tables)): path
+                   for path in file_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, [], e
+
+
+def list_pdfs(folder: str) -> List[str]:
+    """递归列出目录下的 PDF 文件（排序后返回）"""
+    pdf_files = []
+    for root, _, files in os.walk(folder):
+        pdf_files.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".pdf"))
+    return sorted(pdf_files)
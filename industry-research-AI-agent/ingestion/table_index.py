@@ -0,0 +1,369 @@
+# ingestion/table_index.py
+"""
+表格数值索引
+
+研报/年报中的表格入库时除了转成文本切片，还会规整为长表写入 SQLite：
+    (文件, 页码, 表格序号, 行标签, 列标签, 年份, 原始值, 数值, 单位)
+
+- 单位统一换算：亿/万/千万/百万 → 元，百分比 → 小数，括号负数 → 负值
+- 年份列（2023 / 2023年 / 2024E）自动识别；年份在首列的表格自动转置
+- 单元格解析基于 pandas 字符串向量化操作，一页的所有表格一起处理
+
+Agent 查询"营收 2023"时直接走索引，而不是在扁平化文本上做向量模糊匹配
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# ===============================
+# 索引位置（项目根目录下）
+# ===============================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+TABLE_INDEX_PATH = os.getenv("TABLE_INDEX_PATH", os.path.join(PROJECT_ROOT, "table_index", "tables.sqlite"))
+
+# 金额单位 → 换算为元的倍数
+UNIT_SCALES = {"万亿": 1e12, "亿": 1e8, "千万": 1e7, "百万": 1e6, "万": 1e4, "千": 1e3, "": 1.0}
+_UNIT_ALT = "万亿|亿|千万|百万|万|千"
+
+# 表头/行标签中的单位声明：单位：亿元、（万元）、(亿元)
+_DECLARED_UNIT = re.compile(rf"(?:单位[:：]\s*(?P<a>{_UNIT_ALT})?元)|(?:[（(](?P<b>{_UNIT_ALT})?元[)）])")
+
+# 单元格：可选括号负数，千分位，数字 + 可选单位 + 可选 % / 倍
+_CELL_PATTERN = rf"^(?P<num>[+-]?\d+(?:\.\d+)?)\s*(?P<unit>{_UNIT_ALT})?(?P<yuan>元)?\s*(?P<suffix>%|％|倍|x|X)?$"
+
+# 年份列：2023 / 2023年 / 2023A / 2024E / 2023H1 / 2023Q3
+_YEAR = re.compile(r"((?:19|20)\d{2})\s*(?:年度?|[AE]|H[12]|Q[1-4])?")
+
+# 常见指标别名（查询时扩展）
+METRIC_ALIASES = {
+    "营收": ["营业收入", "营业总收入", "主营业务收入"],
+    "收入": ["营业收入", "营业总收入", "主营业务收入"],
+    "净利润": ["归母净利润", "归属于母公司股东的净利润", "净利润"],
+    "归母净利润": ["归属于母公司股东的净利润", "归属母公司净利润"],
+    "毛利率": ["销售毛利率", "综合毛利率"],
+    "净利率": ["销售净利率"],
+    "研发投入": ["研发费用", "研发支出"],
+}
+
+
+def _declared_scale(text: str) -> Optional[float]:
+    """从文本中识别单位声明，返回换算倍数；没有声明返回 None"""
+    match = _DECLARED_UNIT.search(text or "")
+    if not match:
+        return None
+    return UNIT_SCALES[match.group("a") or match.group("b") or ""]
+
+
+def _row_key(label: str) -> str:
+    """行标签规整：去掉空白和括号内的单位说明，用于匹配"""
+    label = re.sub(r"\s+", "", label or "")
+    return re.sub(r"[（(][^）)]*[)）]", "", label)
+
+
+def _year_of(label: str) -> Optional[int]:
+    match = _YEAR.search(label or "")
+    return int(match.group(1)) if match else None
+
+
+def _clean_cells(table: List[List[Any]]) -> List[List[str]]:
+    """None → 空串，去掉单元格内换行；各行补齐到相同列数"""
+    width = max((len(row) for row in table), default=0)
+    return [
+        [re.sub(r"\s+", " ", str(cell)).strip() if cell is not None else "" for cell in row]
+        + [""] * (width - len(row))
+        for row in table
+    ]
+
+
+def table_to_frame(table: List[List[Any]]) -> Optional[pd.DataFrame]:
+    """
+    表格 → 宽表 DataFrame（行标签为索引，列标签为列名）
+    年份在首列而不在表头时自动转置，保证列方向是期间
+
+    Returns:
+        DataFrame 或 None（少于 2 行 2 列的表格）
+    """
+    rows = _clean_cells(table)
+    if len(rows) < 2 or len(rows[0]) < 2:
+        return None
+
+    header_years = sum(_year_of(cell) is not None for cell in rows[0][1:])
+    column_years = sum(_year_of(row[0]) is not None for row in rows[1:])
+    if header_years == 0 and column_years >= 2:
+        rows = [list(col) for col in zip(*rows)]
+
+    # 列名去空、去重
+    columns, seen = [], {}
+    for i, name in enumerate(rows[0][1:], 1):
+        name = name or f"列{i}"
+        seen[name] = seen.get(name, 0) + 1
+        columns.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+
+    index_name = rows[0][0] or "项目"
+    if index_name in columns:
+        index_name = f"{index_name}_行"
+    frame = pd.DataFrame([row[1:] for row in rows[1:]], columns=columns)
+    frame.index = pd.Index([row[0] for row in rows[1:]], name=index_name)
+    frame.attrs["scale"] = _declared_scale(" ".join(rows[0]))
+    return frame
+
+
+def normalize_cells(long: pd.DataFrame) -> pd.DataFrame:
+    """
+    向量化解析单元格数值与单位
+
+    Args:
+        long: 至少包含 raw / row_scale / table_scale / row_percent 列的长表
+
+    Returns:
+        增加 value（规整后数值，无法解析为 NaN）和 unit 列
+    """
+    raw = long["raw"].astype(str).str.strip()
+    text = raw.str.replace(r"[,，\s]", "", regex=True)
+
+    negative = text.str.match(r"^[（(].+[)）]$") | text.str.startswith("-")
+    text = text.str.replace(r"^[（(](.+)[)）]$", r"\1", regex=True)
+
+    parts = text.str.extract(_CELL_PATTERN)
+    number = pd.to_numeric(parts["num"], errors="coerce").abs()
+
+    percent = parts["suffix"].isin(["%", "％"]) | (long["row_percent"] & number.notna())
+    multiple = parts["suffix"].isin(["倍", "x", "X"])
+    cell_scale = parts["unit"].map(UNIT_SCALES)
+    has_cell_unit = parts["unit"].notna() | parts["yuan"].notna()
+    scale = cell_scale.fillna(long["row_scale"]).fillna(long["table_scale"])
+    is_amount = number.notna() & ~percent & ~multiple & (has_cell_unit | scale.notna())
+
+    # 倍数是无量纲的，不套用表头/行的金额单位
+    value = np.where(percent, number / 100, np.where(multiple, number, number * scale.fillna(1.0)))
+    long = long.assign(value=np.where(negative, -value, value))
+    long["unit"] = np.select([percent, multiple, is_amount], ["ratio", "倍", "元"], default="")
+    return long
+
+
+def tables_to_cells(tables: List[List[List[Any]]]) -> pd.DataFrame:
+    """
+    一组表格（通常是同一页）→ 规整后的长表
+
+    Returns:
+        列：table_idx, row_label, row_key, col_label, year, raw, value, unit
+    """
+    longs = []
+    for table_idx, table in enumerate(tables):
+        frame = table_to_frame(table)
+        if frame is None:
+            continue
+        long = frame.reset_index().melt(id_vars=frame.index.name, var_name="col_label", value_name="raw")
+        long = long.rename(columns={frame.index.name: "row_label"})
+        long["table_idx"] = table_idx
+        long["table_scale"] = frame.attrs["scale"]
+        longs.append(long)
+
+    if not longs:
+        return pd.DataFrame(columns=["table_idx", "row_label", "row_key", "col_label",
+                                     "year", "raw", "value", "unit"])
+
+    cells = pd.concat(longs, ignore_index=True)
+    cells = cells[(cells["row_label"] != "") & (cells["raw"] != "")]
+
+    labels = cells["row_label"].astype(str)
+    cells = cells.assign(
+        row_key=labels.map(_row_key),
+        row_scale=labels.map(_declared_scale),
+        row_percent=labels.str.contains(r"[（(]\s*[%％]\s*[)）]", regex=True),
+        year=cells["col_label"].astype(str).map(_year_of)
+    )
+    cells["table_scale"] = pd.to_numeric(cells["table_scale"], errors="coerce")
+    cells["row_scale"] = pd.to_numeric(cells["row_scale"], errors="coerce")
+    return normalize_cells(cells)
+
+
+def table_to_values(table: List[List[Any]]) -> Optional[pd.DataFrame]:
+    """表格 → 数值宽表（float，单位已规整；无法解析的单元格为 NaN）"""
+    cells = tables_to_cells([table])
+    if cells.empty:
+        return None
+    return cells.pivot_table(index="row_label", columns="col_label", values="value",
+                             aggfunc="first", sort=False, dropna=False)
+
+
+class TableIndex:
+    """
+    表格数值索引（SQLite）
+    单个文件，多线程共享一个连接（加锁串行化）
+    """
+
+    def __init__(self, db_path: str = TABLE_INDEX_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ------------------ 内部工具 ------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时建库建表"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cells (
+                    file_key TEXT,
+                    source TEXT,
+                    content_hash TEXT,
+                    page INTEGER,
+                    table_idx INTEGER,
+                    row_label TEXT,
+                    row_key TEXT,
+                    col_label TEXT,
+                    year INTEGER,
+                    raw TEXT,
+                    value REAL,
+                    unit TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cells_row ON cells(row_key, year)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cells_file ON cells(file_key, content_hash)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # ------------------ 写入 ------------------
+
+    def add_tables(self, file_path: str, content_hash: str, page: int,
+                   tables: List[List[List[Any]]]) -> int:
+        """
+        写入一页的表格
+
+        Returns:
+            int: 写入的单元格数
+        """
+        if not tables:
+            return 0
+        cells = tables_to_cells(tables)
+        if cells.empty:
+            return 0
+
+        file_key = os.path.abspath(file_path)
+        source = os.path.basename(file_path)
+        rows = [
+            (file_key, source, content_hash, page, int(c["table_idx"]), c["row_label"], c["row_key"],
+             c["col_label"], None if pd.isna(c["year"]) else int(c["year"]), c["raw"],
+             None if pd.isna(c["value"]) else float(c["value"]), c["unit"])
+            for c in cells.to_dict("records")
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+    def remove_file(self, file_path: str, content_hash: Optional[str] = None,
+                    keep_hash: Optional[str] = None):
+        """
+        删除文件的索引记录
+
+        Args:
+            file_path: 文件路径
+            content_hash: 只删除该内容版本（入库失败回滚时使用）
+            keep_hash: 保留该内容版本、删除其他版本（入库成功后清理旧版本）
+        """
+        sql, params = "DELETE FROM cells WHERE file_key = ?", [os.path.abspath(file_path)]
+        if content_hash:
+            sql, params = sql + " AND content_hash = ?", params + [content_hash]
+        if keep_hash:
+            sql, params = sql + " AND content_hash != ?", params + [keep_hash]
+        with self._lock:
+            conn = self._connect()
+            conn.execute(sql, params)
+            conn.commit()
+
+    def remove_missing(self, folder: Optional[str] = None) -> int:
+        """删除磁盘上已不存在的文件的索引记录"""
+        prefix = os.path.join(os.path.abspath(folder), "") if folder else ""
+        with self._lock:
+            conn = self._connect()
+            keys = [row[0] for row in conn.execute("SELECT DISTINCT file_key FROM cells")]
+            missing = [(k,) for k in keys if k.startswith(prefix) and not os.path.exists(k)]
+            conn.executemany("DELETE FROM cells WHERE file_key = ?", missing)
+            conn.commit()
+        return len(missing)
+
+    # ------------------ 查询 ------------------
+
+    def lookup(self, metric: str, year: Optional[int] = None, source: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        按指标（行标签）和年份查询
+
+        Args:
+            metric: 指标名，如 "营收"、"营业收入"（自动扩展常见别名，子串匹配）
+            year: 年份
+            source: 文件名关键词
+            limit: 最多返回条数
+
+        Returns:
+            List[Dict]: 行标签精确匹配的排在前面
+        """
+        key = _row_key(metric)
+        if not key:
+            return []
+        candidates = [key] + [a for a in METRIC_ALIASES.get(key, []) if a != key]
+
+        where = ["(" + " OR ".join("row_key LIKE ?" for _ in candidates) + ")"]
+        params: List[Any] = [f"%{c}%" for c in candidates]
+        if year:
+            where.append("year = ?")
+            params.append(int(year))
+        if source:
+            where.append("source LIKE ?")
+            params.append(f"%{source}%")
+
+        exact = " OR ".join("row_key = ?" for _ in candidates)
+        sql = (
+            "SELECT source, page, table_idx, row_label, col_label, year, raw, value, unit FROM cells "
+            f"WHERE {' AND '.join(where)} "
+            f"ORDER BY ({exact}) DESC, LENGTH(row_key), year DESC, source, page LIMIT ?"
+        )
+        params = params + candidates + [limit]
+
+        with self._lock:
+            cursor = self._connect().execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def format_value(row: Dict[str, Any]) -> str:
+        """规整后数值的可读形式"""
+        value, unit = row.get("value"), row.get("unit")
+        if value is None:
+            return row.get("raw", "")
+        if unit == "ratio":
+            return f"{value * 100:.2f}%"
+        if unit == "元":
+            if abs(value) >= 1e8:
+                return f"{value / 1e8:,.2f}亿元"
+            if abs(value) >= 1e4:
+                return f"{value / 1e4:,.2f}万元"
+            return f"{value:,.2f}元"
+        return f"{value:,.4g}{unit}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        with self._lock:
+            cells, files = self._connect().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT file_key) FROM cells"
+            ).fetchone()
+        return {"cells": cells, "files": files}
+
+
+# 全局实例
+table_index = TableIndex()
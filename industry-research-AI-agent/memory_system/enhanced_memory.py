@@ -58,9 +58,9 @@ class EnhancedMemoryManager:
         初始化增强记忆管理器
         
         Args:
-            base_memory_manager: 基础记忆管理器实例
+            base_memory_manager: 基础记忆管理器实例，或返回实例的函数（首次使用时才创建）
         """
-        self.base_manager = base_memory_manager
+        self._base_manager = base_memory_manager
         self.ctx_manager = global_context_manager
         self.fact_checker = fact_checker
         
@@ -73,6 +73,17 @@ class EnhancedMemoryManager:
         # 学习记录
         self.learning_records: List[Dict] = []
     
+    @property
+    def base_manager(self):
+        """基础记忆管理器（传入的是函数时首次访问才创建）"""
+        if callable(self._base_manager):
+            try:
+                self._base_manager = self._base_manager()
+            except ImportError as e:
+                print(f"⚠️ [EnhancedMemory] 基础记忆系统不可用: {e}")
+                self._base_manager = None
+        return self._base_manager
+    
     def start_session(self, industry: str, province: str, 
                       target_year: str, focus: str) -> ResearchSession:
         """
@@ -469,8 +480,8 @@ class FactValidationMiddleware:
 
 # 全局实例
 try:
-    from memory_system.memory_manager import memory_manager as base_memory
-    enhanced_memory = EnhancedMemoryManager(base_memory)
+    from memory_system.memory_manager import get_memory_manager
+    enhanced_memory = EnhancedMemoryManager(get_memory_manager)
 except ImportError:
     enhanced_memory = EnhancedMemoryManager(None)
 
@@ -11,13 +11,88 @@
 import datetime
 import json
 import hashlib
+import os
+import threading
+import time
 from typing import Dict, List, Optional, Any, Tuple
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from ingestion.pdf_ingest import PDFIngestor
-from memory_system.vector_store.chroma_client import ChromaVectorStore
-from rag.retriever import VectorRetriever
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ingestion.ingest_manifest import IngestManifest, chunk_ids
+
+# PDF 入库时每批写入向量库的切片数（与知识库入库共用同一环境变量）
+PDF_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+
+# 召回缓存：条目数上限与有效期（秒）
+RECALL_CACHE_SIZE = int(os.getenv("MEMORY_RECALL_CACHE_SIZE", "256"))
+RECALL_CACHE_TTL = float(os.getenv("MEMORY_RECALL_CACHE_TTL", "3600"))
+
+
+class RecallCache:
+    """
+    召回结果缓存（LRU + TTL，线程安全）
+    - 超过条目数上限时淘汰最久未使用的条目，过期条目在访问时删除
+    - invalidate() 清空缓存并递增版本号：写入新记忆后，
+      写入前开始、写入后才完成的召回不会把旧结果放回缓存
+    """
+
+    def __init__(self, max_entries: int = RECALL_CACHE_SIZE, ttl: float = RECALL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._version = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: tuple) -> Optional[List[Dict]]:
+        """命中返回结果副本，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(entry[1])
+
+    def put(self, key: tuple, data: List[Dict], version: int):
+        """写入结果；version 与当前版本不一致（期间有新记忆写入）时丢弃"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic(), list(data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """清空缓存（记忆有写入时调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        return stats
 
 
 class IndustryKnowledgeGraph:
@@ -197,14 +272,23 @@ class MemoryManager:
     """
 
     def __init__(self, persist_dir: str):
+        # 向量库与 langchain 在创建实例时才导入（导入本模块不加载）
+        from memory_system.vector_store.chroma_client import ChromaVectorStore
+        from rag.retriever import VectorRetriever
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        
         self.vector_store = ChromaVectorStore(persist_dir)
         self.retriever = VectorRetriever(self.vector_store)
         self.pdf_ingestor = PDFIngestor()
         
+        # PDF入库清单（内容哈希去重、变更替换）
+        self.ingest_manifest = IngestManifest(os.path.join(persist_dir, "ingest_manifest.json"))
+        
         # 文本切分器
+        self.chunk_overlap = 50
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=500, 
-            chunk_overlap=50,
+            chunk_overlap=self.chunk_overlap,
             separators=["\n\n", "\n", "。", "；", " ", ""]
         )
         
@@ -212,9 +296,9 @@ class MemoryManager:
         self.knowledge_graph = IndustryKnowledgeGraph()
         self.experience = ResearchExperience()
         
-        # 缓存
-        self._cache: Dict[str, Any] = {}
-        self._cache_ttl = 3600  # 缓存有效期（秒）
+        # 召回缓存（有新记忆写入时失效）
+        self._cache = RecallCache()
+        self._stats_lock = threading.Lock()
         
         # 统计信息
         self.stats = {
@@ -253,12 +337,14 @@ class MemoryManager:
             
         metadatas = [meta for _ in chunks]
         self.vector_store.add_texts(chunks, metadatas)
+        self._cache.invalidate()
         
         # 更新统计
-        self.stats["total_insights"] += len(chunks)
-        if metadata.get("industry"):
-            self.stats["industries_covered"].add(metadata["industry"])
-        self.stats["last_update"] = datetime.datetime.now().isoformat()
+        with self._stats_lock:
+            self.stats["total_insights"] += len(chunks)
+            if metadata.get("industry"):
+                self.stats["industries_covered"].add(metadata["industry"])
+            self.stats["last_update"] = datetime.datetime.now().isoformat()
         
         print(f"🧠 [Memory] 已存储 {len(chunks)} 条 {category} 记忆")
 
@@ -293,75 +379,99 @@ class MemoryManager:
             }
         )
 
-    def ingest_pdf(self, file_path: str, metadata: dict):
-        """导入PDF文档"""
-        raw_text = self.pdf_ingestor.ingest(file_path)
-        chunks = self.splitter.split_text(raw_text)
+    def ingest_pdf(self, file_path: str, metadata: dict) -> Dict[str, Any]:
+        """
+        导入PDF文档（按内容哈希增量入库）
+        内容未变化的文件直接跳过；内容变化时新切片写入后删除旧切片
+        """
+        plan = self.ingest_manifest.plan(file_path, id_namespace="pdf")
+        if not plan.needs_ingest:
+            self.vector_store.delete(plan.stale_ids)
+            if plan.stale_ids:
+                self._cache.invalidate()
+            self.ingest_manifest.commit(plan)
+            print(f"📄 [Memory] PDF内容未变化，跳过: {file_path} ({plan.status})")
+            return {"file": file_path, "status": plan.status, "chunks": 0}
         
         # 增强元数据
         enhanced_meta = metadata.copy()
         enhanced_meta["source_type"] = "pdf"
         enhanced_meta["file_path"] = file_path
+        enhanced_meta["content_hash"] = plan.content_hash[:12]
         
-        metadatas = [enhanced_meta for _ in chunks]
-        self.vector_store.add_texts(chunks, metadatas)
+        # 逐页切分、分批写入，不拼接全文（大部头招股书内存占用与页数无关）
+        chunk_count = 0
+        batch: List[str] = []
+        batch_ids: List[str] = []
+        carry = ""
+        overlap = self.chunk_overlap
         
-        print(f"📄 [Memory] 已导入PDF: {file_path}, {len(chunks)} 个片段")
+        def flush():
+            nonlocal batch, batch_ids
+            if batch:
+                self.vector_store.add_texts(batch, [enhanced_meta] * len(batch), ids=batch_ids)
+                batch, batch_ids = [], []
+        
+        try:
+            for _, page_text in self.pdf_ingestor.iter_pages(file_path, content_hash=plan.content_hash):
+                for chunk in self.splitter.split_text(carry + page_text):
+                    batch.append(chunk)
+                    batch_ids.append(f"{plan.id_prefix}_{chunk_count}")
+                    chunk_count += 1
+                    if len(batch) >= PDF_EMBED_BATCH_SIZE:
+                        flush()
+                carry = page_text[-overlap:] if overlap else ""
+            flush()
+        except Exception:
+            # 回滚已写入的新切片，旧切片保持不动
+            self.vector_store.delete(chunk_ids(plan.id_prefix, chunk_count - len(batch)))
+            self._cache.invalidate()
+            self.ingest_manifest.release(plan)
+            raise
+        
+        self.vector_store.delete(plan.stale_ids)
+        self._cache.invalidate()
+        self.ingest_manifest.commit(plan, chunk_count)
+        
+        print(f"📄 [Memory] 已导入PDF: {file_path}, {chunk_count} 个片段")
+        return {"file": file_path, "status": plan.status, "chunks": chunk_count}
 
     # ------------------ 召回 (Read) ------------------
 
     def recall_memory(self, query: str, category: str = None, 
-                      k: int = 5, industry: str = None) -> List[Dict]:
+                      k: int = 5, industry: str = None,
+                      year: str = None, source: str = None) -> List[Dict]:
         """
-        精准召回：支持按 category 和 industry 过滤
+        精准召回：支持按 category / industry / year / source（产出该记忆的 Agent）过滤
+        过滤条件作为 where 子句下推到向量库，一次查询直接返回过滤后的 top-k
         """
         # 检查缓存
-        cache_key = f"{query}_{category}_{k}_{industry}"
-        if cache_key in self._cache:
-            cached = self._cache[cache_key]
-            if (datetime.datetime.now() - cached["time"]).seconds < self._cache_ttl:
-                return cached["data"]
-        
-        # 召回更多结果以便过滤
-        results = self.retriever.retrieve(query, k=k * 3)
-        
-        # 过滤
-        filtered_results = []
-        for doc in results:
-            # 兼容不同的返回格式
-            if hasattr(doc, 'metadata'):
-                meta = doc.metadata
-                content = doc.page_content
-            elif isinstance(doc, dict):
-                meta = doc.get('metadata', {})
-                content = doc.get('content', doc.get('page_content', ''))
-            else:
-                continue
-            
-            # 按category过滤
-            if category and meta.get('category') != category:
-                continue
-            
-            # 按industry过滤
-            if industry and meta.get('industry') != industry:
-                continue
-            
-            filtered_results.append({
-                "content": content,
-                "metadata": meta
-            })
-            
-            if len(filtered_results) >= k:
-                break
+        cache_key = (query, category, k, industry, year, source)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        cache_version = self._cache.version
+        
+        from memory_system.vector_store.chroma_client import build_where
+        # 入库时 year 统一存为字符串
+        where = build_where(
+            category=category or None,
+            industry=industry or None,
+            year=str(year) if year else None,
+            source_agent=source or None
+        )
+        docs = self.retriever.retrieve_documents(query, k=k, where=where)
+        filtered_results = [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in docs
+        ]
         
         # 更新缓存
-        self._cache[cache_key] = {
-            "data": filtered_results,
-            "time": datetime.datetime.now()
-        }
+        self._cache.put(cache_key, filtered_results, cache_version)
         
         # 更新统计
-        self.stats["total_recalls"] += 1
+        with self._stats_lock:
+            self.stats["total_recalls"] += 1
         
         return filtered_results
 
@@ -455,18 +565,23 @@ class MemoryManager:
 
     def get_stats(self) -> Dict[str, Any]:
         """获取记忆系统统计信息"""
-        return {
-            "total_insights": self.stats["total_insights"],
-            "total_recalls": self.stats["total_recalls"],
-            "industries_covered": list(self.stats["industries_covered"]),
-            "last_update": self.stats["last_update"],
+        with self._stats_lock:
+            stats = {
+                "total_insights": self.stats["total_insights"],
+                "total_recalls": self.stats["total_recalls"],
+                "industries_covered": list(self.stats["industries_covered"]),
+                "last_update": self.stats["last_update"],
+            }
+        stats.update({
             "successful_patterns": len(self.experience.successful_patterns),
-            "failed_patterns": len(self.experience.failed_patterns)
-        }
+            "failed_patterns": len(self.experience.failed_patterns),
+            "recall_cache": self._cache.get_stats()
+        })
+        return stats
 
     def clear_cache(self):
         """清理缓存"""
-        self._cache.clear()
+        self._cache.invalidate()
         print("🧹 [Memory] 缓存已清理")
 
     def export_knowledge(self, output_path: str):
@@ -519,5 +634,23 @@ class MemoryManager:
             print(f"⚠️ [Memory] 知识库导入失败: {e}")
 
 
-# 全局单例
-memory_manager = MemoryManager(persist_dir="./knowledge_base/vector_store")
+# 全局单例（首次使用时创建）
+MEMORY_PERSIST_DIR = "./knowledge_base/vector_store"
+_memory_manager: Optional[MemoryManager] = None
+_memory_lock = threading.Lock()
+
+
+def get_memory_manager() -> MemoryManager:
+    """记忆系统单例"""
+    global _memory_manager
+    with _memory_lock:
+        if _memory_manager is None:
+            _memory_manager = MemoryManager(persist_dir=MEMORY_PERSIST_DIR)
+        return _memory_manager
+
+
+def __getattr__(name):
+    # 兼容 from memory_manager import memory_manager（导入时才创建）
+    if name == "memory_manager":
+        return get_memory_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,51 @@
 # memory_system/vector_store/chroma_client.py
 # 封装 Chroma + embedding，不让 Agent 知道底层细节
+from typing import Any, Dict, List, Optional
+
 from langchain_chroma import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from config.embedding import embedding_service
+
+
+def build_where(**conditions: Any) -> Optional[Dict[str, Any]]:
+    """
+    把元数据过滤条件拼成 Chroma where 子句（值为 None 的条件忽略）
+
+    Examples:
+        build_where(category="fact", industry=None) -> {"category": "fact"}
+        build_where(category="fact", year=["2024", "2025"])
+            -> {"$and": [{"category": "fact"}, {"year": {"$in": ["2024", "2025"]}}]}
+    """
+    clauses = []
+    for field, value in conditions.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            clauses.append({field: {"$in": list(value)}})
+        else:
+            clauses.append({field: value})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    LangChain 向量接口适配器：推理转给共享的 embedding_service（与知识库共用同一个模型）
+    与原 HuggingFaceEmbeddings 一致，编码前把换行替换为空格，已入库的向量无需重建
+    查询向量走 encode_queries，与知识库共用同一份查询向量缓存
+    """
+
+    def __init__(self, service=embedding_service):
+        self.service = service
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.service.encode([t.replace("\n", " ") for t in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.service.encode_queries([text.replace("\n", " ")])[0]
+
 
 class ChromaVectorStore:
     """
@@ -9,24 +53,30 @@ class ChromaVectorStore:
     """
 
     def __init__(self, persist_dir: str):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-m3"
-        )
+        self.embeddings = SharedEmbeddings()
 
         self.db = Chroma(
             persist_directory=persist_dir,
             embedding_function=self.embeddings
         )
 
-    def add_texts(self, texts, metadatas):
+    def add_texts(self, texts, metadatas, ids=None):
         self.db.add_texts(
             texts=texts,
-            metadatas=metadatas
+            metadatas=metadatas,
+            ids=ids
         )
         # self.db.persist()  # 新版会自动保存，调用它会报错，所以这里注销调
 
-    def similarity_search_with_score(self, query, k=5):
+    def delete(self, ids):
+        """按ID删除切片（增量入库时替换旧版本文档）"""
+        if ids:
+            self.db.delete(ids=ids)
+
+    def similarity_search_with_score(self, query, k=5, where: Optional[Dict[str, Any]] = None):
+        """向量检索；where 为 Chroma 元数据过滤条件，在向量库内过滤后再取 top-k"""
         return self.db.similarity_search_with_score(
             query=query,
-            k=k
+            k=k,
+            filter=where
         )
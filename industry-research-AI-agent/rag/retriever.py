@@ -1,6 +1,6 @@
 # rag/retriever.py
 
-from typing import List
+from typing import Any, Dict, List, Optional
 from memory_system.vector_store.chroma_client import ChromaVectorStore
 
 
@@ -12,10 +12,21 @@ class VectorRetriever:
     def __init__(self, vector_store: ChromaVectorStore):
         self.vector_store = vector_store
 
-    def retrieve(self, query: str, k: int = 5) -> List[str]:
+    def retrieve_documents(self, query: str, k: int = 5,
+                           where: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """按相似度返回 Document（带 metadata），where 过滤在向量库内完成"""
         results = self.vector_store.similarity_search_with_score(
             query=query,
-            k=k
+            k=k,
+            where=where
+        )
+        return [doc for doc, _ in results]
+
+    def retrieve(self, query: str, k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        results = self.vector_store.similarity_search_with_score(
+            query=query,
+            k=k,
+            where=where
         )
 
         filtered_docs = []